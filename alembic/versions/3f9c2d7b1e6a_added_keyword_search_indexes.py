@@ -0,0 +1,42 @@
+"""added keyword search indexes
+
+Revision ID: 3f9c2d7b1e6a
+Revises: a4837e7fc4b8
+Create Date: 2025-03-02 18:12:09.431207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7b1e6a'
+down_revision: Union[str, None] = 'a4837e7fc4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Full-text search: stored tsvector kept in sync by Postgres, GIN indexed
+    op.add_column('nodes', sa.Column(
+        'text_tsv',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', text)", persisted=True),
+        nullable=True
+    ))
+    op.create_index('ix_nodes_text_tsv', 'nodes', ['text_tsv'], unique=False, postgresql_using='gin')
+    # Trigram index: fuzzy keyword matches and indexed ILIKE '%...%'
+    op.create_index(
+        'ix_nodes_text_trgm', 'nodes', ['text'], unique=False,
+        postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_nodes_text_trgm', table_name='nodes')
+    op.drop_index('ix_nodes_text_tsv', table_name='nodes')
+    op.drop_column('nodes', 'text_tsv')
@@ -0,0 +1,105 @@
+"""Benchmark: per-memory write cost, one memory at a time vs the bulk APIs.
+
+Writes --n memories, each with --edges edges to earlier memories of the run, into
+the configured Postgres, Milvus and MongoDB twice:
+    single   postgres.insert_memory + milvus.insert_node (sent right away) + mongodb.make_edge per edge
+    bulk     postgres.insert_memories + milvus.insert_nodes + mongodb.make_edges
+and reports milliseconds per memory for each store. Everything written is
+deleted again afterwards.
+
+Usage:
+    poetry run python -m benchmarks.bulk_writes --n 100 --edges 3
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from typing import Dict, List, Tuple
+from config import get_settings
+from utils import milvus, mongodb, postgres
+from utils.milvus.base import collection as milvus_collection, write_buffer
+from utils.mongodb.base import collection as mongo_collection
+from utils.mongodb.utils import DOC_ID
+from utils.postgres.base import get_db
+from utils.postgres.schemas import NodesDb
+
+settings = get_settings()
+
+def make_run(n: int, edges: int, rng: random.Random) -> Tuple[List[str], List[List[float]], List[List[int]]]:
+    run_id = uuid.uuid4().hex[:8]
+    texts = [f"Benchmark memory {i} of run {run_id}." for i in range(n)]
+    dim = settings.embedding_model.n_dim
+    vectors = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(n)]
+    # Edges point at earlier memories of the same run
+    related = [rng.sample(range(i), min(edges, i)) for i in range(n)]
+    return texts, vectors, related
+
+def single(texts: List[str], vectors: List[List[float]], related: List[List[int]]) -> Tuple[List[str], Dict[str, float]]:
+    times = {"postgres": 0.0, "milvus": 0.0, "mongodb": 0.0}
+    ids: List[str] = []
+    for text, vector, targets in zip(texts, vectors, related):
+        start = time.perf_counter()
+        node_id = postgres.insert_memory(text)
+        times["postgres"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        milvus.insert_node(node_id, [vector])
+        # One request per memory, as before the write buffer
+        write_buffer.sync()
+        times["milvus"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for target in targets:
+            mongodb.make_edge(ids[target], node_id)
+        times["mongodb"] += time.perf_counter() - start
+        ids.append(node_id)
+    return ids, times
+
+def bulk(texts: List[str], vectors: List[List[float]], related: List[List[int]]) -> Tuple[List[str], Dict[str, float]]:
+    times = {}
+    start = time.perf_counter()
+    inserted = postgres.insert_memories(texts)
+    ids = [inserted[text] for text in texts]
+    times["postgres"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    milvus.insert_nodes(ids, vectors)
+    write_buffer.sync()
+    times["milvus"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mongodb.make_edges([(ids[target], node_id) for node_id, targets in zip(ids, related) for target in targets])
+    times["mongodb"] = time.perf_counter() - start
+    return ids, times
+
+def cleanup(ids: List[str]) -> None:
+    db = next(get_db())
+    db.query(NodesDb).filter(NodesDb.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    milvus_collection.delete(f"node_id in {json.dumps(ids)}")
+    mongo_collection.update_one({"_id": DOC_ID}, {"$unset": {f"adjacency_list.{node_id}": "" for node_id in ids}})
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100, help="Memories written per run")
+    parser.add_argument("--edges", type=int, default=3, help="Edges per memory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'write path':<10} {'postgres':>10} {'milvus':>10} {'mongodb':>10} {'total':>10}   (ms per memory)")
+    for name, write in (("single", single), ("bulk", bulk)):
+        texts, vectors, related = make_run(args.n, args.edges, rng)
+        ids, times = write(texts, vectors, related)
+        try:
+            per_memory = {store: seconds * 1000 / args.n for store, seconds in times.items()}
+            print(
+                f"{name:<10} {per_memory['postgres']:>10.2f} {per_memory['milvus']:>10.2f} "
+                f"{per_memory['mongodb']:>10.2f} {sum(per_memory.values()):>10.2f}"
+            )
+        finally:
+            cleanup(ids)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: N concurrent decision-sized LLM calls vs a single call.
+
+With a non-blocking provider the concurrent batch should finish in roughly
+the time of one call; a provider that blocks the event loop scales linearly.
+
+Usage:
+    poetry run python -m benchmarks.concurrent_decisions --n 8
+"""
+import argparse
+import asyncio
+import time
+from chat.constants import DEFAULT_CONFIGS
+from config import get_settings
+from utils.llm import LLMFactory, LLMProvider
+
+settings = get_settings()
+
+PROMPT = (
+    "You maintain a memory store about a user. A new memory arrived: "
+    "\"{memory}\". Decide whether to INSERT or IGNORE it and reply with a "
+    "short ```json block containing the action."
+)
+
+MEMORIES = [
+    "User lives in Bangalore.",
+    "User's sister is called Ananya.",
+    "User prefers tea over coffee.",
+    "User is learning to play the guitar.",
+    "User works as a backend engineer.",
+    "User is allergic to peanuts.",
+    "User runs 5km every morning.",
+    "User's birthday is on 14th March.",
+]
+
+async def run_decision(provider: LLMProvider, memory: str, temperature: float) -> float:
+    """Stream one completion to the end and return its wall-clock duration"""
+    start = time.perf_counter()
+    async for _ in provider.stream_completion(
+        [{"role": "user", "content": PROMPT.format(memory=memory)}],
+        temperature
+    ):
+        pass
+    return time.perf_counter() - start
+
+async def main(n: int, stage: str) -> None:
+    stage_config = DEFAULT_CONFIGS[stage]
+    provider = LLMFactory.create_provider(settings.get_llm_config(stage_config["model"]))
+    memories = [MEMORIES[i % len(MEMORIES)] for i in range(n)]
+
+    # Warm up connection so the handshake is not attributed to either run
+    await run_decision(provider, memories[0], stage_config["temperature"])
+
+    single = await run_decision(provider, memories[0], stage_config["temperature"])
+
+    start = time.perf_counter()
+    durations = await asyncio.gather(*[
+        run_decision(provider, memory, stage_config["temperature"])
+        for memory in memories
+    ])
+    concurrent = time.perf_counter() - start
+
+    print(f"Provider:           {stage_config['provider']} / {stage_config['model']}")
+    print(f"Single call:        {single:.2f}s")
+    print(f"{n} concurrent calls: {concurrent:.2f}s (slowest {max(durations):.2f}s)")
+    print(f"Serial estimate:    {sum(durations):.2f}s")
+    print(f"Concurrent / single ratio: {concurrent / single:.2f}x (1.0x is ideal, {n}.0x means serialised)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=8, help="Number of concurrent decisions")
+    parser.add_argument("--stage", default="decision", choices=list(DEFAULT_CONFIGS.keys()))
+    args = parser.parse_args()
+    asyncio.run(main(args.n, args.stage))
@@ -0,0 +1,120 @@
+"""Benchmark: chat context assembly with every memory vs the token-budgeted builder.
+
+For each memory-store size, times building the chat context the old way (read
+every memory, put all of it in the system prompt) against the budgeted way
+(read only the retrieved memories by id, keep what fits the token budget), and
+reports the prompt tokens and input cost each adds to a turn. The store is an
+in-memory SQLite table standing in for Postgres, so no database is needed.
+
+With --live the system prompt is also sent to the chat model to measure time to
+first token and total turn latency (skipped when the prompt exceeds --max-live-tokens).
+
+Usage:
+    poetry run python -m benchmarks.context_builder --sizes 100,10000,100000
+    poetry run python -m benchmarks.context_builder --sizes 100,10000 --live
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from chat.constants import DEFAULT_CONFIGS
+from config import get_settings
+from utils.llm import LLMFactory
+from utils.tokenizer import count_tokens, fit_to_budget
+
+settings = get_settings()
+
+TEMPLATES = [
+    "User lives in {city} and moved there in {year}.",
+    "User's friend {name} works as a {job} in {city}.",
+    "User prefers {drink} over coffee, especially in the evening.",
+    "User went on a trip to {city} with {name} in {year}.",
+    "User is learning {skill} and practises on weekends.",
+    "User's sister {name} is a {job} and likes {drink}.",
+]
+FILLS = {
+    "city": ["Pune", "Bangalore", "Delhi", "Goa", "Jaipur", "Kochi"],
+    "year": [str(year) for year in range(2010, 2025)],
+    "name": ["Ananya", "Rohan", "Priya", "Kabir", "Meera", "Arjun"],
+    "job": ["doctor", "designer", "teacher", "lawyer", "engineer"],
+    "drink": ["tea", "lassi", "coconut water", "filter coffee"],
+    "skill": ["the guitar", "Spanish", "pottery", "chess", "swimming"],
+}
+QUESTION = "What should I get my sister for her birthday?"
+
+def make_store(n: int, rng: random.Random) -> Tuple[sqlite3.Connection, List[str]]:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE nodes (id TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    rows = []
+    for i in range(n):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        text = template.format(**{key: rng.choice(values) for key, values in FILLS.items()})
+        rows.append((str(uuid.UUID(int=rng.getrandbits(128))), f"{text} (#{i})"))
+    conn.executemany("INSERT INTO nodes VALUES (?, ?)", rows)
+    return conn, [row[0] for row in rows]
+
+def render(memories: List[str]) -> str:
+    # Same shape as the chat prompt's memory section
+    return "You are a helpful assistant with memories about the user.\n\n" + "\n".join(f"- {m}" for m in memories)
+
+def all_memories_context(conn: sqlite3.Connection) -> str:
+    return render([row[0] for row in conn.execute("SELECT text FROM nodes")])
+
+def budgeted_context(conn: sqlite3.Connection, retrieved: List[str], budget: int, model: str) -> str:
+    placeholders = ",".join("?" * len(retrieved))
+    by_id = dict(conn.execute(f"SELECT id, text FROM nodes WHERE id IN ({placeholders})", retrieved).fetchall())
+    texts, _ = fit_to_budget((by_id[i] for i in retrieved if i in by_id), budget, model)
+    return render(texts)
+
+async def live_turn(model: str, system_prompt: str) -> Tuple[float, float]:
+    provider = LLMFactory.create_provider(settings.get_llm_config(model))
+    messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": QUESTION}]
+    start = time.perf_counter()
+    ttft: Optional[float] = None
+    async for _ in provider.stream_completion(messages, 0.2, stage="benchmark"):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+    return ttft or 0.0, time.perf_counter() - start
+
+def measure(label: str, build, model: str, args) -> Dict[str, object]:
+    start = time.perf_counter()
+    system_prompt = build()
+    build_ms = (time.perf_counter() - start) * 1000
+    tokens = count_tokens(system_prompt, model)
+    result = {"label": label, "build_ms": build_ms, "tokens": tokens, "ttft": None, "total": None}
+    if args.live and tokens <= args.max_live_tokens:
+        result["ttft"], result["total"] = asyncio.run(live_turn(model, system_prompt))
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000,100000", help="Memory store sizes")
+    parser.add_argument("--retrieved", type=int, default=DEFAULT_CONFIGS["retrieval"]["top_k"], help="Memories returned by retrieval")
+    parser.add_argument("--budget", type=int, default=DEFAULT_CONFIGS["chat"]["context_token_budget"])
+    parser.add_argument("--model", default=DEFAULT_CONFIGS["chat"]["model"])
+    parser.add_argument("--live", action="store_true", help="Also send each prompt to the chat model")
+    parser.add_argument("--max-live-tokens", type=int, default=120_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cost = settings.get_llm_config(args.model).cost.input
+    rng = random.Random(args.seed)
+    print(f"{'memories':>9} {'context':<10} {'build ms':>9} {'tokens':>9} {'cost INR':>9} {'ttft s':>7} {'turn s':>7}")
+    for n in (int(size) for size in args.sizes.split(",")):
+        conn, ids = make_store(n, rng)
+        retrieved = rng.sample(ids, min(args.retrieved, n))
+        for result in (
+            measure("all", lambda: all_memories_context(conn), args.model, args),
+            measure("budgeted", lambda: budgeted_context(conn, retrieved, args.budget, args.model), args.model, args),
+        ):
+            inr = result["tokens"] * cost / 1_000_000 * settings.DOLLAR_TO_INR
+            ttft = f"{result['ttft']:>7.2f}" if result["ttft"] is not None else f"{'-':>7}"
+            total = f"{result['total']:>7.2f}" if result["total"] is not None else f"{'-':>7}"
+            print(f"{n:>9} {result['label']:<10} {result['build_ms']:>9.1f} {result['tokens']:>9} {inr:>9.4f} {ttft} {total}")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: local ONNX embedding provider vs the configured remote provider.
+
+Reports single-text latency (p50/p99) and batch throughput for each provider.
+Calls go straight to the provider, bypassing the embedding cache, so every
+text is really embedded.
+
+Usage:
+    poetry run python -m benchmarks.embeddings --local-model all-MiniLM-L6-v2 --local-dim 384
+    poetry run python -m benchmarks.embeddings --skip-remote --n 200 --batch 1024
+"""
+import argparse
+import os
+import time
+from typing import Dict, List
+from config import EmbeddingConfig, get_settings
+from utils.embeddings import EmbeddingsFactory, EmbeddingsProvider
+from utils.embeddings.onnx import ONNXProvider
+
+settings = get_settings()
+
+MEMORIES = [
+    "User lives in Bangalore.",
+    "User's sister is called Ananya and she studies medicine in Pune.",
+    "User prefers tea over coffee.",
+    "User is learning to play the guitar and practises on weekends.",
+    "User works as a backend engineer at a fintech startup.",
+    "User is allergic to peanuts.",
+    "User runs 5km every morning before work.",
+    "User's birthday is on 14th March.",
+]
+
+def make_texts(n: int, offset: int = 0) -> List[str]:
+    # Unique texts so nothing can be served from a provider-side cache
+    return [f"{MEMORIES[i % len(MEMORIES)]} (note {offset + i})" for i in range(n)]
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def bench(provider: EmbeddingsProvider, n: int, batch: int) -> Dict[str, float]:
+    # Warm up (connection / session initialisation)
+    provider._get_embeddings(make_texts(2, offset=-2))
+
+    latencies = []
+    for text in make_texts(n):
+        start = time.perf_counter()
+        provider._get_embeddings([text])
+        latencies.append(time.perf_counter() - start)
+
+    texts = make_texts(batch, offset=n)
+    start = time.perf_counter()
+    # Same request split as embed_batch, without its cache lookups
+    for i in range(0, batch, provider.max_batch_items):
+        provider._get_embeddings(texts[i:i + provider.max_batch_items])
+    batch_time = time.perf_counter() - start
+
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "batch_s": batch_time,
+        "texts_per_s": batch / batch_time,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50, help="Single-text calls used for latency percentiles")
+    parser.add_argument("--batch", type=int, default=256, help="Texts embedded for the throughput run")
+    parser.add_argument("--local-model", default="all-MiniLM-L6-v2", help="Model directory name under data/models")
+    parser.add_argument("--local-path", default=None, help="Explicit model directory (overrides --local-model)")
+    parser.add_argument("--local-dim", type=int, default=384)
+    parser.add_argument("--skip-remote", action="store_true")
+    args = parser.parse_args()
+
+    local_name = os.path.basename(os.path.normpath(args.local_path)) if args.local_path else args.local_model
+    providers: Dict[str, EmbeddingsProvider] = {}
+    providers[f"local / {local_name} ({args.local_dim}d)"] = ONNXProvider(EmbeddingConfig(
+        provider="Local",
+        name=local_name,
+        n_dim=args.local_dim,
+        api_key="",
+        cost={"input": 0.0},
+        model_path=args.local_path,
+    ))
+    if not args.skip_remote:
+        remote = settings.embedding_model
+        providers[f"{remote.provider} / {remote.name} ({remote.n_dim}d)"] = EmbeddingsFactory.create_provider(remote)
+
+    print(f"{'provider':<50} {'p50 ms':>8} {'p99 ms':>8} {'batch s':>8} {'texts/s':>9}")
+    for name, provider in providers.items():
+        result = bench(provider, args.n, args.batch)
+        print(
+            f"{name:<50} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['batch_s']:>8.2f} {result['texts_per_s']:>9.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
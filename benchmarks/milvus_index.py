@@ -0,0 +1,123 @@
+"""Benchmark: recall@10 and search latency of Milvus index types by corpus size.
+
+For each corpus size, a scratch collection is filled with synthetic unit vectors
+and searched with FLAT, IVF_FLAT and HNSW (nprobe / ef tuned for --target-recall
+the way the index manager does), one query per request. Recall is measured
+against exact NumPy search. The index utils.milvus.index_manager would pick for
+that size is marked with *. The scratch collection is dropped afterwards.
+
+Needs a running Milvus (MILVUS_HOST / MILVUS_PORT).
+
+Usage:
+    poetry run python -m benchmarks.milvus_index --sizes 1000,10000,100000 --dim 768
+    poetry run python -m benchmarks.milvus_index --sizes 1000000 --queries 200 --target-recall 0.99
+"""
+import argparse
+import time
+from typing import Dict, List
+import numpy as np
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, utility
+from config import get_settings
+from utils.milvus.index_manager import plan_index, search_params_for
+from utils.vector_quantization import normalize
+
+settings = get_settings()
+
+INSERT_BATCH = 10_000
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def exact_top_k(base: np.ndarray, queries: np.ndarray, k: int, chunk: int = 64) -> np.ndarray:
+    """Ground truth ids, a few queries at a time to bound memory on large corpora"""
+    truth = []
+    for i in range(0, len(queries), chunk):
+        scores = queries[i:i + chunk] @ base.T
+        truth.append(np.argpartition(-scores, k, axis=1)[:, :k])
+    return np.concatenate(truth)
+
+def candidate_indexes(n: int) -> Dict[str, Dict]:
+    # Force each index type regardless of size by moving the thresholds
+    return {
+        "FLAT": plan_index(n, "float32", "IP", policy={"flat_max": n + 1}),
+        "IVF_FLAT": plan_index(n, "float32", "IP", policy={"flat_max": 0, "hnsw_min": n + 1}),
+        "HNSW": plan_index(n, "float32", "IP", policy={"flat_max": 0, "hnsw_min": 0}),
+    }
+
+def make_collection(name: str, dim: int) -> Collection:
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="node_id", dtype=DataType.VARCHAR, max_length=200, is_primary=True),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
+    ])
+    return Collection(name=name, schema=schema)
+
+def bench(collection: Collection, index: Dict, queries: np.ndarray, truth: np.ndarray, k: int, target_recall: float) -> Dict[str, float]:
+    collection.release()
+    if collection.indexes:
+        collection.drop_index()
+    start = time.perf_counter()
+    collection.create_index(field_name="embedding", index_params=index)
+    collection.load()
+    build_s = time.perf_counter() - start
+
+    params = {"metric_type": "IP", "params": search_params_for(index, target_recall, k)}
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = collection.search([query.tolist()], "embedding", params, limit=k, output_fields=[])[0]
+        latencies.append(time.perf_counter() - start)
+        found.append([int(hit.id) for hit in hits])
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        "recall": float(recall),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "build_s": build_s,
+        "search_params": params["params"],
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Corpus sizes")
+    parser.add_argument("--dim", type=int, default=settings.embedding_model.n_dim)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, default=settings.MILVUS_TARGET_RECALL)
+    parser.add_argument("--collection", default=f"{settings.MILVUS_COLLECTION}_index_bench")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    connections.connect(alias="default", host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+    rng = np.random.default_rng(args.seed)
+    print(f"{'size':>9} {'index':<10} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}  search params")
+    try:
+        for n in (int(size) for size in args.sizes.split(",")):
+            # Clustered vectors, so approximate indexes have structure to exploit
+            centers = rng.standard_normal((max(8, n // 500), args.dim))
+            base = normalize(centers[rng.integers(0, len(centers), n)] + rng.standard_normal((n, args.dim)))
+            queries = normalize(base[rng.integers(0, n, args.queries)] + 0.3 * rng.standard_normal((args.queries, args.dim)))
+            truth = exact_top_k(base, queries, args.k)
+
+            collection = make_collection(args.collection, args.dim)
+            for i in range(0, n, INSERT_BATCH):
+                batch = base[i:i + INSERT_BATCH]
+                collection.insert([[str(j) for j in range(i, i + len(batch))], batch.tolist()])
+            collection.flush()
+
+            chosen = plan_index(n, "float32", "IP")["index_type"]
+            for name, index in candidate_indexes(n).items():
+                result = bench(collection, index, queries, truth, args.k, args.target_recall)
+                label = f"{name}{'*' if name == chosen else ''}"
+                print(
+                    f"{n:>9} {label:<10} {result['recall']:>10.3f} {result['p50_ms']:>8.2f} "
+                    f"{result['p99_ms']:>8.2f} {result['build_s']:>8.1f}  {result['search_params']}"
+                )
+    finally:
+        if utility.has_collection(args.collection):
+            utility.drop_collection(args.collection)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark: per-write latency of Milvus updates, flush+load per write vs buffered.
+
+Upserts --n embeddings into a scratch collection three ways:
+    flush+load   upsert, then flush() and load() on every write (the old update path)
+    upsert       one upsert request per write, no flush
+    buffered     utils.milvus.write_buffer.WriteBuffer, sent in batches
+and reports p50 / p99 per-write latency and the total time including the final
+sync. Each run ends with a Session-consistency search for the last written
+vector, to check the writer reads its own writes without a flush. The scratch
+collection is dropped afterwards.
+
+Needs a running Milvus (MILVUS_HOST / MILVUS_PORT).
+
+Usage:
+    poetry run python -m benchmarks.milvus_writes --n 200
+    poetry run python -m benchmarks.milvus_writes --n 2000 --skip-flush --buffer-rows 512
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, utility
+from config import get_settings
+from utils.milvus.write_buffer import WriteBuffer
+from utils.vector_quantization import normalize
+
+settings = get_settings()
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def make_collection(name: str, dim: int) -> Collection:
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="node_id", dtype=DataType.VARCHAR, max_length=200, is_primary=True),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
+    ])
+    collection = Collection(name=name, schema=schema, consistency_level="Bounded")
+    collection.create_index(field_name="embedding", index_params={"metric_type": "IP", "index_type": "FLAT", "params": {}})
+    collection.load()
+    return collection
+
+def run(
+    collection: Collection,
+    vectors: np.ndarray,
+    write: Callable[[Dict], None],
+    finish: Callable[[], None],
+) -> Dict[str, float]:
+    latencies = []
+    start = time.perf_counter()
+    for i, vector in enumerate(vectors):
+        row = {"node_id": f"node_{i % 50}", "embedding": vector.tolist()}
+        write_start = time.perf_counter()
+        write(row)
+        latencies.append(time.perf_counter() - write_start)
+    finish()
+    total = time.perf_counter() - start
+
+    hits = collection.search(
+        [vectors[-1].tolist()], "embedding", {"metric_type": "IP", "params": {}},
+        limit=1, output_fields=[], consistency_level="Session",
+    )[0]
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "total_s": total,
+        "read_own_write": bool(len(hits)) and hits[0].id == f"node_{(len(vectors) - 1) % 50}",
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200, help="Writes per run (updates spread over 50 nodes)")
+    parser.add_argument("--dim", type=int, default=settings.embedding_model.n_dim)
+    parser.add_argument("--buffer-rows", type=int, default=settings.MILVUS_WRITE_BUFFER_ROWS)
+    parser.add_argument("--buffer-seconds", type=float, default=settings.MILVUS_WRITE_BUFFER_SECONDS)
+    parser.add_argument("--skip-flush", action="store_true", help="Skip the (slow) flush+load run")
+    parser.add_argument("--collection", default=f"{settings.MILVUS_COLLECTION}_write_bench")
+    args = parser.parse_args()
+
+    connections.connect(alias="default", host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+    vectors = normalize(np.random.default_rng(0).standard_normal((args.n, args.dim)))
+
+    runs = {}
+    if not args.skip_flush:
+        runs["flush+load"] = lambda c: (
+            lambda row: (c.upsert([row]), c.flush(), c.load()),
+            lambda: None,
+        )
+    runs["upsert"] = lambda c: (lambda row: c.upsert([row]), lambda: None)
+
+    def buffered(c: Collection):
+        buffer = WriteBuffer(c, args.buffer_rows, args.buffer_seconds)
+        return buffer.upsert, buffer.sync
+    runs["buffered"] = buffered
+
+    print(f"{'write path':<12} {'p50 ms':>8} {'p99 ms':>8} {'total s':>8} {'read own write':>15}")
+    try:
+        for name, make in runs.items():
+            collection = make_collection(args.collection, args.dim)
+            write, finish = make(collection)
+            result = run(collection, vectors, write, finish)
+            print(
+                f"{name:<12} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                f"{result['total_s']:>8.2f} {str(result['read_own_write']):>15}"
+            )
+    finally:
+        if utility.has_collection(args.collection):
+            utility.drop_collection(args.collection)
+
+if __name__ == "__main__":
+    main()
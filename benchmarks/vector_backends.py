@@ -0,0 +1,135 @@
+"""Benchmark: search latency and recall, in-process NumPy backend vs Milvus.
+
+For each corpus size, synthetic unit vectors are loaded into
+    numpy/float32   utils.numpy_vectors NumpyVectorStore (memory-mapped, brute force)
+    numpy/float16   the same, stored as float16
+    milvus          a scratch collection indexed the way utils.milvus.index_manager would
+and --queries single-vector top-k searches are timed one at a time, as the chat
+and ingestion paths issue them. Recall@k is measured against exact float32
+search. Load time covers inserting every vector (and building the Milvus index).
+The scratch collection and store directories are removed afterwards.
+
+Milvus needs a running server (MILVUS_HOST / MILVUS_PORT); pass --skip-milvus
+to compare the NumPy formats only.
+
+Usage:
+    poetry run python -m benchmarks.vector_backends --sizes 1000,5000,20000
+    poetry run python -m benchmarks.vector_backends --sizes 100000 --skip-milvus
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from config import get_settings
+from utils.numpy_vectors.store import NumpyVectorStore
+from utils.vector_quantization import normalize
+
+settings = get_settings()
+
+INSERT_BATCH = 10_000
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def exact_top_k(base: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ base.T
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+def bench(search: Callable[[np.ndarray], List[str]], queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, float]:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({int(node_id) for node_id in found} & set(expected.tolist())) / k)
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+def numpy_backend(base: np.ndarray, dtype: str, k: int, directory: str):
+    start = time.perf_counter()
+    store = NumpyVectorStore(directory, base.shape[1], dtype)
+    for i in range(0, len(base), INSERT_BATCH):
+        batch = base[i:i + INSERT_BATCH]
+        store.add([str(j) for j in range(i, i + len(batch))], batch)
+    load_s = time.perf_counter() - start
+    return load_s, lambda query: [node_id for node_id, _ in store.search([query], k)[0]]
+
+def milvus_backend(base: np.ndarray, k: int, name: str):
+    from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+    from utils.milvus.index_manager import plan_index, search_params_for
+
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="node_id", dtype=DataType.VARCHAR, max_length=200, is_primary=True),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=base.shape[1]),
+    ])
+    start = time.perf_counter()
+    collection = Collection(name=name, schema=schema)
+    for i in range(0, len(base), INSERT_BATCH):
+        batch = base[i:i + INSERT_BATCH]
+        collection.insert([[str(j) for j in range(i, i + len(batch))], batch.tolist()])
+    collection.flush()
+    index = plan_index(len(base), "float32", "IP")
+    collection.create_index(field_name="embedding", index_params=index)
+    collection.load()
+    load_s = time.perf_counter() - start
+
+    params = {"metric_type": "IP", "params": search_params_for(index, settings.MILVUS_TARGET_RECALL, k)}
+    def search(query: np.ndarray) -> List[str]:
+        hits = collection.search([query.tolist()], "embedding", params, limit=k, output_fields=[])[0]
+        return [hit.id for hit in hits]
+    return load_s, search, index["index_type"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Corpus sizes")
+    parser.add_argument("--dim", type=int, default=settings.embedding_model.n_dim)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--skip-milvus", action="store_true", help="Compare the NumPy formats only")
+    parser.add_argument("--collection", default=f"{settings.MILVUS_COLLECTION}_backend_bench")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.skip_milvus:
+        from pymilvus import connections
+        connections.connect(alias="default", host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix="vector_backends_")
+    print(f"{'size':>8} {'backend':<16} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p99 ms':>8} {'load s':>8}")
+    try:
+        for n in (int(size) for size in args.sizes.split(",")):
+            base = normalize(rng.standard_normal((n, args.dim)))
+            queries = normalize(base[rng.integers(0, n, args.queries)] + 0.5 * rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim))
+            truth = exact_top_k(base, queries, args.k)
+
+            backends = {}
+            for dtype in ("float32", "float16"):
+                backends[f"numpy/{dtype}"] = numpy_backend(base, dtype, args.k, f"{workdir}/{n}_{dtype}")
+            if not args.skip_milvus:
+                load_s, search, index_type = milvus_backend(base, args.k, args.collection)
+                backends[f"milvus/{index_type}"] = (load_s, search)
+
+            for name, (load_s, search) in backends.items():
+                result = bench(search, queries, truth, args.k)
+                print(
+                    f"{n:>8} {name:<16} {result['recall']:>10.3f} {result['p50_ms']:>8.2f} "
+                    f"{result['p99_ms']:>8.2f} {load_s:>8.2f}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not args.skip_milvus:
+            from pymilvus import utility
+            if utility.has_collection(args.collection):
+                utility.drop_collection(args.collection)
+
+if __name__ == "__main__":
+    main()
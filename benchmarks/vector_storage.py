@@ -0,0 +1,133 @@
+"""Benchmark: footprint and recall@k of the Milvus vector storage formats.
+
+For each dimension (Matryoshka truncation of the full vectors) and each
+MILVUS_VECTOR_TYPE, reports the index size per vector, the index footprint at
+several tenant sizes, and recall@k against exact float32 search on the full
+vectors, with and without the full-precision re-rank of the top candidates.
+Scoring mirrors what Milvus does for each format (SQ8 is simulated with
+per-dimension min/max 8-bit quantization), in NumPy, so no Milvus is needed.
+
+By default vectors are synthetic, with variance decaying over dimensions like a
+Matryoshka-trained model; --from-cache uses real vectors from the embedding cache.
+
+Usage:
+    poetry run python -m benchmarks.vector_storage --n 20000 --dim 1536 --dims 1536,768,512,256
+    poetry run python -m benchmarks.vector_storage --from-cache --k 10 --rerank 50
+"""
+import argparse
+import sqlite3
+import numpy as np
+from config import get_settings
+from utils.vector_quantization import VECTOR_TYPES, bytes_per_vector, normalize
+
+settings = get_settings()
+
+def synthetic_vectors(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    # Clustered data, with earlier dimensions carrying more of the signal
+    scale = 1.0 / np.sqrt(1.0 + np.arange(dim) / 32.0)
+    centers = rng.standard_normal((clusters, dim)) * scale
+    points = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)) * scale
+    return normalize(points)
+
+def cached_vectors(n: int) -> np.ndarray:
+    """Up to n vectors of the configured embedding model from the embedding cache"""
+    model = settings.embedding_model
+    conn = sqlite3.connect(settings.EMBEDDING_CACHE_PATH)
+    rows = conn.execute(
+        "SELECT value FROM entries WHERE key LIKE ? LIMIT ?",
+        (f"{model.name}:{model.n_dim}:%", n),
+    ).fetchall()
+    conn.close()
+    if not rows:
+        raise SystemExit(f"No cached vectors for {model.name} in {settings.EMBEDDING_CACHE_PATH}")
+    return normalize(np.stack([np.frombuffer(row[0], dtype=np.float64) for row in rows]))
+
+def make_queries(base: np.ndarray, n_queries: int, rng: np.random.Generator) -> np.ndarray:
+    # Paraphrase-like queries: perturbed copies of stored vectors
+    picks = base[rng.integers(0, len(base), n_queries)]
+    return normalize(picks + 0.5 * rng.standard_normal(picks.shape) / np.sqrt(base.shape[1]))
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    idx = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+def sq8(base: np.ndarray) -> np.ndarray:
+    """Round trip through IVF_SQ8-style per-dimension 8-bit quantization"""
+    low, high = base.min(axis=0), base.max(axis=0)
+    step = np.where(high > low, (high - low) / 255.0, 1.0)
+    return (np.round((base - low) / step) * step + low).astype(np.float32)
+
+def approximate_scores(vector_type: str, base: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """What the index ranks by for each storage format (higher is better)"""
+    if vector_type == "float16":
+        return queries.astype(np.float16).astype(np.float32) @ base.astype(np.float16).astype(np.float32).T
+    if vector_type == "int8":
+        return queries @ sq8(base).T
+    if vector_type == "binary":
+        # Matching sign bits, i.e. dim minus the Hamming distance
+        return (queries > 0).astype(np.float32) @ (base > 0).T.astype(np.float32) \
+            + (queries <= 0).astype(np.float32) @ (base <= 0).T.astype(np.float32)
+    return queries @ base.T
+
+def stored_vectors(vector_type: str, base: np.ndarray) -> np.ndarray:
+    """Vectors the re-rank reads back from Milvus, as decoded by utils.vector_quantization"""
+    if vector_type == "float16":
+        return base.astype(np.float16).astype(np.float32)
+    if vector_type == "binary":
+        return np.where(base > 0, 1.0, -1.0).astype(np.float32) / np.sqrt(base.shape[1])
+    # int8 keeps the raw float32 vectors next to the SQ8 index
+    return base
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000, help="Stored vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536, help="Full dimension of synthetic vectors")
+    parser.add_argument("--dims", default="1536,1024,768,512,256", help="Truncated dimensions to evaluate")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=50, help="Candidates re-scored at full precision")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Tenant sizes for the footprint columns")
+    parser.add_argument("--from-cache", action="store_true", help="Use real vectors from the embedding cache")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.from_cache:
+        full = cached_vectors(args.n)
+    else:
+        full = synthetic_vectors(args.n, args.dim, clusters=max(8, args.n // 200), rng=rng)
+    queries_full = make_queries(full, args.queries, rng)
+    truth = top_k(queries_full @ full.T, args.k)
+
+    dims = [d for d in (int(d) for d in args.dims.split(",")) if d <= full.shape[1]]
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"{len(full)} vectors, {len(queries_full)} queries, recall@{args.k} vs exact float32 at {full.shape[1]}d\n")
+    size_header = " ".join(f"{f'MB@{s:,}':>12}" for s in sizes)
+    print(f"{'dim':>5} {'type':<8} {'B/vec':>6} {size_header} {f'recall@{args.k}':>10} {f'+rerank{args.rerank}':>11}")
+
+    for dim in dims:
+        base = normalize(full[:, :dim])
+        queries = normalize(queries_full[:, :dim])
+        for vector_type in VECTOR_TYPES:
+            if vector_type == "binary" and dim % 8:
+                continue
+            approx = approximate_scores(vector_type, base, queries)
+            plain = recall(top_k(approx, args.k), truth)
+
+            candidates = top_k(approx, args.rerank)
+            stored = stored_vectors(vector_type, base)
+            rescored = np.einsum("qd,qcd->qc", queries, stored[candidates])
+            reranked = np.take_along_axis(candidates, rescored.argsort(axis=1)[:, ::-1], axis=1)
+            with_rerank = recall(reranked, truth)
+
+            per_vector = bytes_per_vector(vector_type, dim)
+            footprint = " ".join(f"{per_vector * s / 2**20:>12.1f}" for s in sizes)
+            print(f"{dim:>5} {vector_type:<8} {per_vector:>6} {footprint} {plain:>10.3f} {with_rerank:>11.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import streamlit as st
+import asyncio
+import logging
+import time
+from contextlib import suppress
 from datetime import datetime
+from typing import Any, Dict, Tuple
 from prompts.chat import (
     get_chat_prompt,
     get_classifier_prompt_reasoning,
@@ -8,11 +13,58 @@ from prompts.chat import (
 from .constants import DEFAULT_CONFIGS
 from config import get_settings
 from utils.llm import LLMFactory, LLMProvider
-from utils import postgres, mongodb, milvus
+from utils import mongodb
+from utils.prompt import volatile
+from utils.tokenizer import count_tokens
+from utils.fast_classifier import DEFAULT_LOG_MAX_BYTES, get_fast_classifier, log_classification
 from .models import ClassifierOutput, QueryKeywordsGeneratorOutput
-from .utils import process_thinking_response
+from .retrieval import retrieve_memories
+from .context import build_context_memories
+from .utils import ThinkingStreamParser, process_thinking_stream
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+async def generate_queries_keywords(
+    conversation: list,
+    stats: Dict[str, Any],
+) -> Tuple[str, QueryKeywordsGeneratorOutput]:
+    """Run the query/keyword generator, recording its duration and output size in stats"""
+    start = time.perf_counter()
+
+    # Use queries_keywords_generator-specific model
+    query_keywords_generator_config = settings.get_llm_config(DEFAULT_CONFIGS["query_keywords_generator"]["model"])
+    query_keywords_generator_provider = LLMFactory.create_provider(query_keywords_generator_config)
+
+    queries_keywords_generator_prompt = get_queries_keywords_generator_prompt_reasoning(
+        day=datetime.now().strftime("%A"),
+        date=datetime.now().strftime("%dth %B %Y"),
+        time=datetime.now().strftime("%I:%M %p"),
+        conversation=conversation
+    )
+    queries_keywords_generator_messages = [{"role": "user", "content": queries_keywords_generator_prompt}]
+    stats["model"] = query_keywords_generator_config.name
+    stats["prompt_tokens"] = count_tokens(queries_keywords_generator_prompt, stats["model"])
+
+    # The parser tracks consumed output so a cancelled speculative run can still report its cost
+    stats["parser"] = ThinkingStreamParser()
+    result = await process_thinking_stream(
+        query_keywords_generator_provider.stream_completion(
+            queries_keywords_generator_messages, 
+            DEFAULT_CONFIGS["query_keywords_generator"]["temperature"],
+            cache=DEFAULT_CONFIGS["query_keywords_generator"].get("cache", False),
+            stage="query_keywords_generator",
+        ),
+        QueryKeywordsGeneratorOutput,
+        parser=stats["parser"],
+    )
+    stats["duration"] = time.perf_counter() - start
+    return result
+
+def show_turn_timings(timings: Dict[str, Any]):
+    """Show per-turn stage latencies and what speculation saved or wasted"""
+    with st.expander("Turn timings", expanded=False):
+        st.json(timings)
 
 async def show_chat(selected_model, temperature):
     # Show existing messages
@@ -41,18 +93,16 @@ async def show_chat(selected_model, temperature):
                         st.write("Keyword Search Terms:")
                         for k in message["memory_queries"]["queries"].data.bm25_keywords:
                             st.write(f"- {k}")
+                if "retrieved_memories" in message:
+                    with st.status("Retrieving memories...", expanded=False):
+                        for memory_id, score in message["retrieved_memories"]:
+                            st.write(f"- `{memory_id}` ({score:.4f})")
                 st.write(message["content"])
+                if "timings" in message:
+                    show_turn_timings(message["timings"])
 
     user_input = st.chat_input("What's on your mind?", key="chat_input")
     if user_input:
-        system_prompt = get_chat_prompt(
-            day=datetime.now().strftime("%A"),
-            date=datetime.now().strftime("%dth %B %Y"),
-            time=datetime.now().strftime("%I:%M %p"),
-            # memories=st.session_state.assistant_context_memories
-            memories=[node.text for node in postgres.get_all_nodes()]
-        )
-
         # Add user message to session state
         st.session_state.messages.append({"role": "user", "content": user_input})
 
@@ -62,22 +112,77 @@ async def show_chat(selected_model, temperature):
 
         # Assistant response
         with st.chat_message("assistant"):
-            # Use classifier-specific model
-            classifier_config = settings.get_llm_config(DEFAULT_CONFIGS["classifier"]["model"])
-            classifier_provider = LLMFactory.create_provider(classifier_config)
-
-            # Run classifier before showing chat response
-            classifier_prompt = get_classifier_prompt_reasoning(conversation=st.session_state.messages)
-            classifier_messages = [{"role": "user", "content": classifier_prompt}]
-
-            classifier_response = ""
-            async for chunk in classifier_provider.stream_completion(
-                classifier_messages, 
-                DEFAULT_CONFIGS["classifier"]["temperature"]
-            ):
-                classifier_response += chunk
-
-            thinking, classification = await process_thinking_response(classifier_response, ClassifierOutput)
+            turn_start = time.perf_counter()
+            timings: Dict[str, Any] = {}
+            query_keywords_stats: Dict[str, Any] = {"prompt_tokens": 0}
+
+            # Speculatively start query/keyword generation alongside the classifier
+            speculative = DEFAULT_CONFIGS["query_keywords_generator"].get("speculative", False)
+            query_keywords_task = None
+            if speculative:
+                query_keywords_task = asyncio.create_task(
+                    generate_queries_keywords(list(st.session_state.messages), query_keywords_stats)
+                )
+
+            # Try the local fast-path classifier first
+            classification = None
+            fast_path = DEFAULT_CONFIGS["classifier"].get("fast_path", {})
+            if fast_path.get("enabled"):
+                fast_classifier = get_fast_classifier(fast_path["model_path"], fast_path["confidence_threshold"])
+                if fast_classifier is not None:
+                    memory_usage, confidence = fast_classifier.predict_if_confident(st.session_state.messages)
+                    timings["local_classifier_confidence"] = confidence
+                    if memory_usage is not None:
+                        classification = ClassifierOutput(memory_usage=memory_usage)
+                        thinking = f"Answered by the local classifier (confidence {confidence:.2f})."
+                        timings["classifier_source"] = "local"
+
+            if classification is None:
+                # Run classifier before showing chat response
+                classifier_prompt = get_classifier_prompt_reasoning(conversation=st.session_state.messages)
+                classifier_messages = [{"role": "user", "content": classifier_prompt}]
+                structured = DEFAULT_CONFIGS["classifier"].get("structured")
+
+                try:
+                    if structured:
+                        # Constrained decoding returns the JSON directly, no reasoning to parse
+                        classifier_provider = LLMFactory.create_provider(settings.get_llm_config(structured["model"]))
+                        classification = await classifier_provider.generate_structured_output(
+                            classifier_messages,
+                            ClassifierOutput,
+                            DEFAULT_CONFIGS["classifier"]["temperature"],
+                            stage="classifier",
+                        )
+                        thinking = f"Answered by {structured['model']} with structured output."
+                    else:
+                        # Use classifier-specific model
+                        classifier_config = settings.get_llm_config(DEFAULT_CONFIGS["classifier"]["model"])
+                        classifier_provider = LLMFactory.create_provider(classifier_config)
+                        thinking, classification = await process_thinking_stream(
+                            classifier_provider.stream_completion(
+                                classifier_messages, 
+                                DEFAULT_CONFIGS["classifier"]["temperature"],
+                                cache=DEFAULT_CONFIGS["classifier"].get("cache", False),
+                                stage="classifier",
+                            ),
+                            ClassifierOutput,
+                        )
+                except BaseException:
+                    if query_keywords_task is not None:
+                        query_keywords_task.cancel()
+                    raise
+                timings["classifier_source"] = "llm"
+
+                # Log the LLM decision as training data for the local classifier
+                if fast_path.get("log_path"):
+                    log_classification(
+                        st.session_state.messages,
+                        classification.memory_usage,
+                        llm_latency=time.perf_counter() - turn_start,
+                        log_path=fast_path["log_path"],
+                        max_bytes=fast_path.get("log_max_bytes", DEFAULT_LOG_MAX_BYTES),
+                    )
+            timings["classifier"] = time.perf_counter() - turn_start
             with st.status("Analyzing memory needs...", expanded=False):
                 st.write("**Model Reasoning:**")
                 st.text(thinking)
@@ -86,27 +191,20 @@ async def show_chat(selected_model, temperature):
 
             # Generate subqueries and keywords if memory_usage is True
             if classification.memory_usage:
-                # Use queries_keywords_generator-specific model
-                query_keywords_generator_config = settings.get_llm_config(DEFAULT_CONFIGS["query_keywords_generator"]["model"])
-                query_keywords_generator_provider = LLMFactory.create_provider(query_keywords_generator_config)
-
-                # Run queries_keywords_generator before showing chat response
-                queries_keywords_generator_prompt = get_queries_keywords_generator_prompt_reasoning(
-                    day=datetime.now().strftime("%A"),
-                    date=datetime.now().strftime("%dth %B %Y"),
-                    time=datetime.now().strftime("%I:%M %p"),
-                    conversation=st.session_state.messages
-                )
-                queries_keywords_generator_messages = [{"role": "user", "content": queries_keywords_generator_prompt}]
+                wait_start = time.perf_counter()
+                if query_keywords_task is None:
+                    query_keywords_task = asyncio.create_task(
+                        generate_queries_keywords(st.session_state.messages, query_keywords_stats)
+                    )
+                queries_keywords_generator_thinking, queries_keywords_generator_result = await query_keywords_task
+                waited = time.perf_counter() - wait_start
 
-                queries_keywords_generator_response = ""
-                async for chunk in query_keywords_generator_provider.stream_completion(
-                    queries_keywords_generator_messages, 
-                    DEFAULT_CONFIGS["query_keywords_generator"]["temperature"]
-                ):
-                    queries_keywords_generator_response += chunk
+                timings["query_keywords_generator"] = query_keywords_stats["duration"]
+                timings["query_keywords_generator_wait"] = waited
+                if speculative:
+                    # Without speculation the generator would only have started now
+                    timings["speculative_latency_saved"] = query_keywords_stats["duration"] - waited
 
-                queries_keywords_generator_thinking, queries_keywords_generator_result = await process_thinking_response(queries_keywords_generator_response, QueryKeywordsGeneratorOutput)
                 with st.status("Generating Memory Queries...", expanded=False):
                     st.write("**Query Generation Reasoning:**")
                     st.text(queries_keywords_generator_thinking)
@@ -118,10 +216,51 @@ async def show_chat(selected_model, temperature):
                     for k in queries_keywords_generator_result.data.bm25_keywords:
                         st.write(f"- {k}")
 
-            # TODO: P1 - update the model context based on new generated queries and keywords
-            # currenly i'm just putting all available memories in the context
-            # available_nodes = postgres.get_all_nodes()
-            # st.session_state.assistant_context_memories = [node.text for node in available_nodes]
+                retrieval_stats: Dict[str, Any] = {}
+                try:
+                    retrieved_memories = await retrieve_memories(
+                        queries_keywords_generator_result.data.vector_search_queries,
+                        queries_keywords_generator_result.data.bm25_keywords,
+                        retrieval_stats,
+                    )
+                except Exception:
+                    # A store outage shouldn't cost the turn: answer without memories
+                    logger.exception("Memory retrieval failed, answering without memories")
+                    st.warning("Memory retrieval failed, answering without memories")
+                    retrieved_memories = []
+                timings["retrieval"] = retrieval_stats
+                with st.status("Retrieving memories...", expanded=False):
+                    for memory_id, score in retrieved_memories:
+                        st.write(f"- `{memory_id}` ({score:.4f})")
+
+            elif query_keywords_task is not None:
+                # Memory not needed: discard the speculative run and record what it cost
+                query_keywords_task.cancel()
+                with suppress(asyncio.CancelledError, Exception):
+                    await query_keywords_task
+                parser = query_keywords_stats.get("parser")
+                timings["speculative_discarded"] = {
+                    "prompt_tokens": query_keywords_stats["prompt_tokens"],
+                    "output_tokens": count_tokens(parser.text, query_keywords_stats["model"]) if parser else 0,
+                }
+
+            # Only retrieved memories go in the context, and the store isn't read when none are needed
+            context_memories = []
+            if classification.memory_usage:
+                context_stats: Dict[str, Any] = {}
+                try:
+                    context_memories = await build_context_memories(retrieved_memories, selected_model, context_stats)
+                except Exception:
+                    logger.exception("Building the memory context failed, answering without memories")
+                    st.warning("Loading memories failed, answering without memories")
+                timings["context"] = context_stats
+            # Date and time go last so the instructions and memories form a cacheable prefix
+            system_prompt = get_chat_prompt(
+                day=volatile(datetime.now().strftime("%A")),
+                date=volatile(datetime.now().strftime("%dth %B %Y")),
+                time=volatile(datetime.now().strftime("%I:%M %p")),
+                memories=context_memories
+            )
 
             # Stream the assistant response directly to the chat interface
             model_config = settings.get_llm_config(selected_model)
@@ -135,11 +274,14 @@ async def show_chat(selected_model, temperature):
 
             assistant_response_container = st.empty()
             assistant_response_text = ""
-            async for chunk in provider.stream_completion(messages, temperature):
+            async for chunk in provider.stream_completion(messages, temperature, stage="chat"):
                 assistant_response_text += chunk
                 assistant_response_container.markdown(assistant_response_text + "▌")
             assistant_response_container.markdown(assistant_response_text)
 
+            timings["total"] = time.perf_counter() - turn_start
+            show_turn_timings(timings)
+
         # Store assistant response in session state
         message_data = {
             "role": "assistant", 
@@ -147,7 +289,8 @@ async def show_chat(selected_model, temperature):
             "classification": {
                 "thinking": thinking,
                 "classification": classification,
-            }
+            },
+            "timings": timings,
         }
 
         if classification.memory_usage:
@@ -155,6 +298,7 @@ async def show_chat(selected_model, temperature):
                 "thinking": queries_keywords_generator_thinking,
                 "data": queries_keywords_generator_result
             }
+            message_data["retrieved_memories"] = retrieved_memories
         st.session_state.messages.append(message_data)
 
         # rerun after 1st chat as we need to force reload to enable "Extract and Save Memories" button
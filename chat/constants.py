@@ -1,3 +1,6 @@
+# "cache": replay identical completions from the persistent completion cache (utils.llm.cache)
+# "fallbacks": equivalent deployments that LLMRouter hedges to / fails over to (utils.llm.router)
+# "hedge": optional overrides of utils.llm.router.DEFAULT_HEDGE
 DEFAULT_CONFIGS = {
     # "query_hyperparmeters": {
     #     "subquery_cand_nodes_w8": 0.5,
@@ -8,6 +11,22 @@ DEFAULT_CONFIGS = {
         "provider": "Together AI",
         "model": "deepseek-ai/DeepSeek-R1-Distill-Qwen-14B",
         "temperature": 0.1,
+        "cache": True,
+        # non-reasoning model answering with schema-constrained JSON (generate_structured_output)
+        # instead of the reasoning stream above; remove to use the reasoning model
+        "structured": {
+            "provider": "OpenAI",
+            "model": "gpt-4o-mini",
+        },
+        # local model trained on logged LLM decisions, LLM is only called below the threshold
+        "fast_path": {
+            "enabled": True,
+            "model_path": "data/fast_classifier.joblib",
+            "log_path": "data/classifier_log.jsonl",
+            # the log is rotated to <log_path>.1 at this size (see utils.fast_classifier)
+            "log_max_bytes": 10_000_000,
+            "confidence_threshold": 0.9,
+        },
     },
     "query_keywords_generator": {
         # "provider": "Samba Nova",
@@ -15,46 +34,75 @@ DEFAULT_CONFIGS = {
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
         "temperature": 0.1,
+        "cache": True,
+        # start alongside the classifier and discard the result if no memory is needed
+        "speculative": True,
+    },
+    # multi-query memory retrieval over the generated vector_search_queries and bm25_keywords (chat.retrieval)
+    "retrieval": {
+        # hits fetched per vector query / by the keyword search, reciprocal rank fusion constant, memories kept after fusion
+        "per_query_k": 20,
+        "keyword_k": 20,
+        "rrf_k": 60,
+        "top_k": 20,
     },
     "chat": {
         "provider": "OpenAI",
         "model": "gpt-4o-mini",
         "temperature": 0.2,
+        # tokens of retrieved memories put in the system prompt, most relevant first
+        "context_token_budget": 1500,
     },
     "memory_generation": {
-        # "provider": "Samba Nova",
-        # "model": "DeepSeek-R1-Distill-Llama-70B",
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
+        "fallbacks": [
+            {"provider": "Samba Nova", "model": "DeepSeek-R1-Distill-Llama-70B"},
+        ],
         "temperature": 0.2,
+        "cache": True,
     },
     "decision": {
-        # "provider": "Samba Nova",
-        # "model": "DeepSeek-R1-Distill-Llama-70B",
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
+        "fallbacks": [
+            {"provider": "Samba Nova", "model": "DeepSeek-R1-Distill-Llama-70B"},
+        ],
         "temperature": 0.2,
+        "cache": True,
+        # new memories decided per LLM call over the union of their relevant memories, 1 decides each alone
+        "batch_size": 5,
+        # decided without the LLM (see chat/decision_rules.py): INSERT when no existing memory
+        # scores at least insert_below, IGNORE when one scores at least ignore_at; None disables a rule
+        "insert_below": 0.5,
+        "ignore_at": 0.98,
     },
     "insertion": {
-        # "provider": "Samba Nova",
-        # "model": "DeepSeek-R1-Distill-Llama-70B",
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
+        "fallbacks": [
+            {"provider": "Samba Nova", "model": "DeepSeek-R1-Distill-Llama-70B"},
+        ],
         "temperature": 0.2,
+        "cache": True,
     },
     "addition": {
-        # "provider": "Samba Nova",
-        # "model": "DeepSeek-R1-Distill-Llama-70B",
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
+        "fallbacks": [
+            {"provider": "Samba Nova", "model": "DeepSeek-R1-Distill-Llama-70B"},
+        ],
         "temperature": 0.2,
+        "cache": True,
     },
     "merge_conflict": {
-        # "provider": "Samba Nova",
-        # "model": "DeepSeek-R1-Distill-Llama-70B",
         "provider": "Groq",
         "model": "deepseek-r1-distill-llama-70b",
+        "fallbacks": [
+            {"provider": "Samba Nova", "model": "DeepSeek-R1-Distill-Llama-70B"},
+        ],
         "temperature": 0.2,
+        "cache": True,
     },
 }
 
@@ -0,0 +1,34 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+from .constants import DEFAULT_CONFIGS
+from utils import postgres
+from utils.tokenizer import fit_to_budget
+
+async def build_context_memories(
+    retrieved: List[Tuple[str, float]],
+    model: str,
+    stats: Dict[str, Any],
+) -> List[str]:
+    """
+    Memory texts for the chat system prompt, most relevant first, within the token budget
+
+    Only the retrieved memories are read from the store, in one query, and counted
+    with model's tokenizer against DEFAULT_CONFIGS["chat"]["context_token_budget"].
+    The number of memories considered / kept, tokens used and seconds taken are
+    recorded in stats.
+    """
+    start = time.perf_counter()
+    memories = await asyncio.to_thread(postgres.get_memories_by_ids, [memory_id for memory_id, _ in retrieved])
+    texts, tokens = fit_to_budget(
+        (memory.content for memory in memories),
+        budget_tokens=DEFAULT_CONFIGS["chat"]["context_token_budget"],
+        model=model,
+    )
+    stats.update({
+        "candidates": len(retrieved),
+        "memories": len(texts),
+        "tokens": tokens,
+        "duration": time.perf_counter() - start,
+    })
+    return texts
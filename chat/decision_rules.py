@@ -0,0 +1,41 @@
+import math
+from typing import Any, Dict, Optional, Tuple
+from .models import DecisionOutputType, IgnoreAction, InsertAction, ModelResponseDecision
+
+def pre_decide(
+    new_memory_text: str,
+    similar_nodes: Dict[str, float],
+    config: Dict[str, Any],
+) -> Optional[Tuple[ModelResponseDecision, str]]:
+    """
+    Decision for a new memory that follows from similarity scores alone, with the reason
+
+    INSERT when no existing memory scores at least config["insert_below"] (nothing
+    it could add to, conflict with or duplicate; always the case for an empty
+    store) and IGNORE when one scores at least config["ignore_at"] (a near-exact
+    duplicate). Returns None when the LLM has to decide.
+
+    Example:
+        >>> pre_decide("User likes tea", {}, {"insert_below": 0.5, "ignore_at": 0.98})
+        (ModelResponseDecision(action=<DecisionOutputType.INSERT: 'INSERT'>, ...), 'No existing memory ...')
+    """
+    best_id, best_score = max(similar_nodes.items(), key=lambda item: item[1], default=(None, -math.inf))
+
+    ignore_at = config.get("ignore_at")
+    if best_id is not None and ignore_at is not None and best_score >= ignore_at:
+        reason = f"Near-duplicate of existing memory {best_id} (similarity {best_score:.3f} >= {ignore_at})"
+        return ModelResponseDecision(action=DecisionOutputType.IGNORE, data=IgnoreAction(reason=reason)), reason
+
+    insert_below = config.get("insert_below")
+    if insert_below is not None and best_score < insert_below:
+        if best_id is None:
+            reason = "No existing memories to compare with"
+        else:
+            reason = f"No existing memory is similar (best similarity {best_score:.3f} < {insert_below})"
+        return ModelResponseDecision(action=DecisionOutputType.INSERT, data=InsertAction(content=new_memory_text)), reason
+
+    return None
+
+def llm_calls(memory_count: int, batch_size: int) -> int:
+    """Decision LLM calls made for memory_count memories at batch_size memories per call"""
+    return math.ceil(memory_count / max(1, batch_size))
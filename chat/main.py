@@ -1,6 +1,8 @@
 import streamlit as st
 from .constants import DEFAULT_CONFIGS
 from config import get_settings
+from utils.llm import get_completion_cache
+from utils.embeddings import get_embedding_cache
 from .chat import show_chat
 from .memories_extraction import show_memory_extraction
 
@@ -79,11 +81,17 @@ async def show_chat_interface():
     with st.sidebar:
         st.subheader("Model Settings")
         selected_model, temperature = show_model_settings()
+        cache_stats = get_completion_cache().stats()
+        st.caption(f"Completion cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        embedding_cache_stats = get_embedding_cache().stats()
+        st.caption(f"Embedding cache: {embedding_cache_stats['hits']} hits / {embedding_cache_stats['misses']} misses")
 
         if st.session_state.messages:
             if st.session_state.current_step:
                 if st.button("Back to Chat"):
                     st.session_state.current_step = 0
+                    st.session_state.pop("extraction_started_at", None)
+                    st.session_state.pop("memory_embeddings", None)
                     st.rerun()
             else:
                 if st.button("Extract and Save Memories"):
@@ -95,6 +103,8 @@ async def show_chat_interface():
             st.session_state.current_step = 0
             st.session_state.generated_memories = []
             st.session_state.decision_results = []
+            st.session_state.pop("extraction_started_at", None)
+            st.session_state.pop("memory_embeddings", None)
             # st.session_state.assistant_context_memories = []
             st.rerun()
 
@@ -1,7 +1,8 @@
 import streamlit as st
 import asyncio
+import time
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from utils.models import GeneratedMemories, Memory, ConflictingMemory, QuestionAnswer, QuestionResponse
 from utils.normalize_uuid import normalize_memories
 from .models import (
@@ -12,28 +13,110 @@ from .models import (
     InsertAction, 
     MergeConflictAction, 
     ModelResponseDecision, 
+    ModelResponseDecisionBatch,
     ModelResponseGeneration, 
     ResolveTemporalConflictAction,
     ModelResponseAddition,
     ModelResponseInsertion,
 )
 from .constants import DEFAULT_CONFIGS, MONTHS
+from .decision_rules import llm_calls, pre_decide
 from config import get_settings
-from utils.llm import LLMFactory, LLMProvider
-from utils.embeddings import EmbeddingsFactory, EmbeddingsProvider
+from utils.llm import LLMRouter, Priority
+from utils.embeddings import EmbeddingsFactory
 from prompts.ingestion.decision import get_decision_prompt_reasoning
 from prompts.ingestion.insertion import get_insertion_reasoning_prompt
 from prompts.ingestion.merge_conflict import (
     get_merge_conflict_generate_questions_prompt, 
     get_merge_conflict_generate_new_memories_prompt,
 )
-from .utils import process_thinking_response
+from .utils import ThinkingStreamParser, process_thinking_stream
 from prompts.ingestion.generation import get_memory_generation_prompt_reasoning
 from tools import get_calendar_for_any_month
-from utils import postgres, milvus, mongodb
+from utils import postgres, vector_db, mongodb
 
 settings = get_settings()
 
+# How long ingestion waits out a Milvus index rebuild (searches fail fast during one) before giving up
+INDEX_REBUILD_WAIT_SECONDS = 180.0
+
+async def search_similar_nodes(embeddings: List[List[float]], **kwargs: Any) -> Dict[str, float]:
+    """vector_db.search_relevent_nodes_by_embeddings, retrying while the vector index is being rebuilt"""
+    deadline = time.monotonic() + INDEX_REBUILD_WAIT_SECONDS
+    while True:
+        try:
+            return await asyncio.to_thread(vector_db.search_relevent_nodes_by_embeddings, embeddings, **kwargs)
+        except TimeoutError:
+            # utils.milvus.index_manager.IndexRebuildingError, raised after waiting search_timeout
+            if time.monotonic() >= deadline:
+                st.error("The vector index is still being rebuilt, try again in a few minutes")
+                st.stop()
+            st.info("Waiting for the vector index rebuild to finish...")
+
+BATCH_DECISION_INSTRUCTIONS = """
+
+## Batch mode
+You are deciding for {count} new memories at once, listed below with their index. The existing memories above are shared between them; each new memory lists the ids of the existing memories found relevant to it, but you may use any of them.
+
+{new_memories}
+
+Make the decision for each new memory independently, exactly as described above for a single new memory. Think about all of them in one <think> block, then answer with a single ```json block of the form:
+{{"decisions": [{{"memory_index": <index>, "action": <ACTION>, "data": <data for the action>}}, ...]}}
+with exactly one entry per new memory index."""
+
+def get_batch_decision_prompt(
+    date: str,
+    time: str,
+    existing_memories: List[Memory],
+    new_memories: List[str],
+    candidate_ids: List[List[str]],
+) -> str:
+    """Decision prompt for several new memories over the union of their relevant existing memories"""
+    listing = "\n".join(
+        f"[{idx}] {memory} (relevant existing memory ids: {', '.join(ids) or 'none'})"
+        for idx, (memory, ids) in enumerate(zip(new_memories, candidate_ids))
+    )
+    prompt = get_decision_prompt_reasoning(
+        date=date,
+        time=time,
+        existing_memories=existing_memories,
+        new_memory=f"See the {len(new_memories)} new memories under Batch mode below",
+    )
+    return prompt + BATCH_DECISION_INSTRUCTIONS.format(count=len(new_memories), new_memories=listing)
+
+def denormalize_decision(decision: ModelResponseDecision, uuid_mapping: Dict[str, str]) -> None:
+    """Convert normalized memory IDs in a decision back to UUIDs, dropping IDs the model made up"""
+    if decision.action == DecisionOutputType.INSERT:
+        pass
+        # decision.data.content = new_memory_text
+        # decision.data.related_memory_ids = [
+        #     uuid_mapping[id] for id in decision.data.related_memory_ids
+        #     if id in uuid_mapping
+        # ]
+    elif decision.action == DecisionOutputType.MERGE_CONFLICT:
+        decision.data.conflicting_memories = [
+            memory for memory in decision.data.conflicting_memories 
+            if memory.memory_id in uuid_mapping
+        ]
+        for memory in decision.data.conflicting_memories:
+            memory.memory_id = uuid_mapping[memory.memory_id]
+    elif decision.action == DecisionOutputType.RESOLVE_TEMPORAL_CONFLICT:
+        decision.data.memory_ids = [
+            uuid_mapping[id] for id in decision.data.memory_ids
+            if id in uuid_mapping 
+        ]
+    elif decision.action == DecisionOutputType.ADDITION_TO_EXISTING_MEMORY:
+        decision.data.updated_memories = [
+            memory for memory in decision.data.updated_memories
+            if memory.memory_id in uuid_mapping
+        ]
+        for memory in decision.data.updated_memories:
+            memory.memory_id = uuid_mapping[memory.memory_id]
+    elif decision.action == DecisionOutputType.IGNORE:
+        pass
+    else:
+        raise ValueError(f"Unknown action type: {decision.action}")
+
 async def show_memory_extraction():
     # clear generated memories if user goes back to chat
     if st.session_state.current_step == 0:
@@ -42,37 +125,56 @@ async def show_memory_extraction():
 
     st.title("Update Assistant's Knowledge")
 
+    # Pin "now" for the whole extraction so prompts are identical across reruns (and hit the completion cache)
+    if "extraction_started_at" not in st.session_state:
+        st.session_state.extraction_started_at = datetime.now(timezone.utc)
+    extraction_time: datetime = st.session_state.extraction_started_at
+
+    # Vectors for every memory text embedded during this extraction, so each text is embedded once
+    memory_embeddings: Dict[str, List[float]] = st.session_state.setdefault("memory_embeddings", {})
+
+    async def embed_missing(texts: List[str], stage: str) -> None:
+        """Embed all of a stage's texts not embedded yet, batched into as few requests as possible"""
+        missing = [text for text in dict.fromkeys(texts) if text not in memory_embeddings]
+        if missing:
+            provider = EmbeddingsFactory.create_provider(settings.embedding_model)
+            vectors = await asyncio.to_thread(provider.embed_batch, missing, stage=stage)
+            memory_embeddings.update(zip(missing, vectors))
+
     if st.session_state.current_step >= 1:
         st.header("Step 1: Generate Memories")
 
     with st.spinner("Generating memories..."):
         generate_memories_prompt = get_memory_generation_prompt_reasoning(
-            day=datetime.now(timezone.utc).strftime("%A"),
-            date=datetime.now(timezone.utc).strftime("%dth %B %Y"),
-            time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+            day=extraction_time.strftime("%A"),
+            date=extraction_time.strftime("%dth %B %Y"),
+            time=extraction_time.strftime("%H:%M:%S"),
             conversation=st.session_state.messages,
         )
 
-        model_config = settings.get_llm_config(DEFAULT_CONFIGS["memory_generation"]["model"])
-        provider: LLMProvider = LLMFactory.create_provider(model_config)
+        provider = LLMRouter.from_stage_config(DEFAULT_CONFIGS["memory_generation"])
 
         call_count = 0
         max_recursive_calls = 2
         messages = [{"role": "user", "content": generate_memories_prompt}]
 
         while call_count <= max_recursive_calls:
-            # generate memories
-            memories_response = ""
-            async for chunk in provider.stream_completion(
-                messages, DEFAULT_CONFIGS["memory_generation"]["temperature"]
-            ):
-                memories_response += chunk
+            # generate memories and process the response as it streams
+            parser = ThinkingStreamParser()
+            thinking, memories = await process_thinking_stream(
+                provider.stream_completion(
+                    messages,
+                    DEFAULT_CONFIGS["memory_generation"]["temperature"],
+                    cache=DEFAULT_CONFIGS["memory_generation"].get("cache", False),
+                    stage="memory_generation",
+                    priority=Priority.BACKGROUND,
+                ),
+                ModelResponseGeneration,
+                parser=parser,
+            )
 
             # add that to messages dict
-            messages.append({"role": "assistant", "content": memories_response})
-
-            # process the response
-            thinking, memories = await process_thinking_response(memories_response, ModelResponseGeneration)
+            messages.append({"role": "assistant", "content": parser.text})
 
             st.subheader(f"**Thinking (Step {call_count + 1}):**")
             st.text(thinking)
@@ -118,19 +220,16 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
         st.markdown("---")
         st.header("Step 2: Decision Making")
 
-        async def handle_decision(
-            new_memory_text: str,
-        ) -> Dict[str, Any]:
-            """Process a single memory through the decision making pipeline"""
-            # Get embeddings for new memory
-            provider = EmbeddingsFactory.create_provider(settings.embedding_model)
-            embeddings = provider.get_embeddings(new_memory_text)
+        async def get_relevant_memories(new_memory_text: str) -> Tuple[List[Memory], Dict[str, float]]:
+            """Fetch existing memories semantically similar to a new memory, with their similarity scores"""
+            # Embedded up front for the whole stage (see embed_missing)
+            embeddings = [memory_embeddings[new_memory_text]]
 
             # Get relevant memories
             # {'node_123': 0.8, 'node_456': 0.7, 'node_789': 0.6}
             # print("embeddings: ", embeddings)
-            similar_nodes = milvus.search_relevent_nodes_by_embeddings(
-                embeddings=embeddings,
+            similar_nodes = await search_similar_nodes(
+                embeddings,
                 min_top_k=10,
                 # max_top_k=max_top_k,
                 threshold=0.75
@@ -144,64 +243,45 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
             for node_id, similarity in similar_nodes.items():
                 memory = postgres.get_memory_details(node_id)
                 relevant_memories.append(memory)
-            
-            # Normalize memory IDs
-            normalized_memories, uuid_mapping = normalize_memories(relevant_memories)
+            return relevant_memories, similar_nodes
+
+        async def stream_decision(decision_prompt: str, response_model):
+            provider = LLMRouter.from_stage_config(DEFAULT_CONFIGS["decision"])
+            messages = [{"role": "user", "content": decision_prompt}]
+
+            # Parse response into response_model as it streams
+            return await process_thinking_stream(
+                provider.stream_completion(
+                    messages,
+                    DEFAULT_CONFIGS["decision"]["temperature"],
+                    cache=DEFAULT_CONFIGS["decision"].get("cache", False),
+                    stage="decision",
+                    priority=Priority.BACKGROUND,
+                ),
+                response_model,
+            )
+
+        async def handle_decision(
+            new_memory_text: str,
+            relevant_memories: List[Memory],
+        ) -> Dict[str, Any]:
+            """Process a single memory through the decision making pipeline"""
+            # Normalize memory IDs (on copies, the originals are shown with their UUIDs)
+            normalized_memories, uuid_mapping = normalize_memories(
+                [memory.model_copy() for memory in relevant_memories]
+            )
             
             # Create decision prompt with normalized memories
             decision_prompt = get_decision_prompt_reasoning(
-                date=datetime.now(timezone.utc).strftime("%dth %B %Y"),
-                time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+                date=extraction_time.strftime("%dth %B %Y"),
+                time=extraction_time.strftime("%H:%M:%S"),
                 existing_memories=normalized_memories,
                 new_memory=new_memory_text
             )
-            
-            # Get model and provider
-            model_config = settings.get_llm_config(DEFAULT_CONFIGS["decision"]["model"])
-            provider = LLMFactory.create_provider(model_config)
-            
-            messages = [{"role": "user", "content": decision_prompt}]
-            
-            # Get full response
-            full_response = ""
-            async for chunk in provider.stream_completion(messages, DEFAULT_CONFIGS["decision"]["temperature"]):
-                full_response += chunk
-            
-            # Parse response into ModelResponseDecision
-            thinking, decision = await process_thinking_response(full_response, ModelResponseDecision)
+            thinking, decision = await stream_decision(decision_prompt, ModelResponseDecision)
             
             # Convert normalized IDs back to UUIDs
-            if decision.action == DecisionOutputType.INSERT:
-                pass
-                # decision.data.content = new_memory_text
-                # decision.data.related_memory_ids = [
-                #     uuid_mapping[id] for id in decision.data.related_memory_ids
-                #     if id in uuid_mapping
-                # ]
-            elif decision.action == DecisionOutputType.MERGE_CONFLICT:
-                decision.data.conflicting_memories = [
-                    memory for memory in decision.data.conflicting_memories 
-                    if memory.memory_id in uuid_mapping
-                ]
-                for memory in decision.data.conflicting_memories:
-                    memory.memory_id = uuid_mapping[memory.memory_id]
-            elif decision.action == DecisionOutputType.RESOLVE_TEMPORAL_CONFLICT:
-                decision.data.memory_ids = [
-                    uuid_mapping[id] for id in decision.data.memory_ids
-                    if id in uuid_mapping 
-                ]
-            elif decision.action == DecisionOutputType.ADDITION_TO_EXISTING_MEMORY:
-                decision.data.updated_memories = [
-                    memory for memory in decision.data.updated_memories
-                    if memory.memory_id in uuid_mapping
-                ]
-                for memory in decision.data.updated_memories:
-                    memory.memory_id = uuid_mapping[memory.memory_id]
-            elif decision.action == DecisionOutputType.IGNORE:
-                pass
-            else:
-                raise ValueError(f"Unknown action type: {decision.action}")
-
+            denormalize_decision(decision, uuid_mapping)
 
             return {
                 "thinking": thinking,
@@ -209,15 +289,107 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                 "relevant_memories": relevant_memories,
             }
 
+        async def handle_decision_batch(
+            new_memory_texts: List[str],
+            relevant_per_memory: List[List[Memory]],
+        ) -> List[Dict[str, Any]]:
+            """Decide several memories in one call over the union of their relevant memories"""
+            if len(new_memory_texts) == 1:
+                return [await handle_decision(new_memory_texts[0], relevant_per_memory[0])]
+
+            # Each existing memory appears once in the prompt however many new memories it is relevant to
+            union: Dict[str, Memory] = {}
+            for relevant_memories in relevant_per_memory:
+                for memory in relevant_memories:
+                    union.setdefault(memory.id, memory.model_copy())
+            uuids = list(union)
+            normalized_memories, uuid_mapping = normalize_memories(list(union.values()))
+            normalized_ids = {uuid: str(idx) for idx, uuid in enumerate(uuids)}
+
+            decision_prompt = get_batch_decision_prompt(
+                date=extraction_time.strftime("%dth %B %Y"),
+                time=extraction_time.strftime("%H:%M:%S"),
+                existing_memories=normalized_memories,
+                new_memories=new_memory_texts,
+                candidate_ids=[
+                    [normalized_ids[memory.id] for memory in relevant_memories]
+                    for relevant_memories in relevant_per_memory
+                ],
+            )
+            thinking, batch = await stream_decision(decision_prompt, ModelResponseDecisionBatch)
+
+            decisions: Dict[int, ModelResponseDecision] = {}
+            for item in batch.decisions:
+                if 0 <= item.memory_index < len(new_memory_texts) and item.memory_index not in decisions:
+                    decision = ModelResponseDecision(action=item.action, data=item.data)
+                    denormalize_decision(decision, uuid_mapping)
+                    decisions[item.memory_index] = decision
+
+            results: List[Dict[str, Any]] = []
+            for idx, (text, relevant_memories) in enumerate(zip(new_memory_texts, relevant_per_memory)):
+                if idx not in decisions:
+                    # Missing or malformed in the batch answer (see ModelResponseDecisionBatch): decide it on its own
+                    results.append(await handle_decision(text, relevant_memories))
+                    continue
+                results.append({
+                    "thinking": thinking,
+                    "response": decisions[idx],
+                    "relevant_memories": relevant_memories,
+                })
+            return results
+
         with st.spinner("Making decisions..."):
-            # Process multiple memories in parallel
-            tasks = [
-                handle_decision(
-                    new_memory_text=memory,
-                )
-                for memory in st.session_state.generated_memories
-            ]
-            results = await asyncio.gather(*tasks)
+            # Process multiple memories in parallel, batch_size memories per LLM call
+            memories = st.session_state.generated_memories
+            await embed_missing(memories, stage="decision")
+            batch_size = max(1, DEFAULT_CONFIGS["decision"].get("batch_size", 1))
+            searched = await asyncio.gather(*(get_relevant_memories(memory) for memory in memories))
+
+            # Memories whose similarity scores settle the decision skip the LLM
+            results: List[Optional[Dict[str, Any]]] = [None] * len(memories)
+            for idx, (memory, (relevant_memories, similar_nodes)) in enumerate(zip(memories, searched)):
+                rule = pre_decide(memory, similar_nodes, DEFAULT_CONFIGS["decision"])
+                if rule is not None:
+                    decision, reason = rule
+                    results[idx] = {
+                        "thinking": f"Decided without the LLM: {reason}",
+                        "response": decision,
+                        "relevant_memories": relevant_memories,
+                    }
+            undecided = [idx for idx, result in enumerate(results) if result is None]
+
+            if batch_size == 1:
+                tasks = [
+                    handle_decision(
+                        new_memory_text=memories[idx],
+                        relevant_memories=searched[idx][0],
+                    )
+                    for idx in undecided
+                ]
+                llm_results = await asyncio.gather(*tasks)
+            else:
+                tasks = [
+                    handle_decision_batch(
+                        [memories[idx] for idx in undecided[i:i + batch_size]],
+                        [searched[idx][0] for idx in undecided[i:i + batch_size]],
+                    )
+                    for i in range(0, len(undecided), batch_size)
+                ]
+                llm_results = [result for batch in await asyncio.gather(*tasks) for result in batch]
+            for idx, result in zip(undecided, llm_results):
+                results[idx] = result
+
+            decision_stats = {
+                "memories": len(memories),
+                "rule_decided": len(memories) - len(undecided),
+                "llm_calls": llm_calls(len(undecided), batch_size),
+                "llm_calls_saved": llm_calls(len(memories), batch_size) - llm_calls(len(undecided), batch_size),
+            }
+            st.session_state.decision_stats = decision_stats
+            st.info(
+                f"Decided {decision_stats['rule_decided']} of {decision_stats['memories']} memories without the LLM "
+                f"({decision_stats['llm_calls_saved']} decision calls saved, {decision_stats['llm_calls']} made)"
+            )
 
             # Display results
             for idx, (memory, result) in enumerate(zip(st.session_state.generated_memories, results)):
@@ -240,6 +412,28 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
 
         with st.spinner("Performing database operations..."):
             decisions: List[ModelResponseDecision] = [resp["response"] for resp in st.session_state.decision_results]
+
+            # Embed every inserted / updated memory in one request per stage; inserted memories
+            # usually match the new memory text embedded for the decision step and are reused
+            await embed_missing(
+                [dec.data.content for dec in decisions if dec.action == DecisionOutputType.INSERT],
+                stage="insertion",
+            )
+            await embed_missing(
+                [
+                    updated_memory.content
+                    for dec in decisions if dec.action == DecisionOutputType.ADDITION_TO_EXISTING_MEMORY
+                    for updated_memory in dec.data.updated_memories
+                ],
+                stage="addition",
+            )
+
+            # New memories (content -> related memory ids), updated memories (id -> content)
+            # and edges of the whole run, written in bulk once every decision is processed
+            pending_memories: Dict[str, List[str]] = {}
+            pending_updates: Dict[str, str] = {}
+            pending_edges: List[Tuple[str, str]] = []
+
             for idx, dec in enumerate(decisions, 1):
                 st.subheader(f"Processing Memory {idx}")
                 st.write(f"**Action Type:** {dec.action}")
@@ -250,9 +444,8 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                     st.write("**Getting related memories...**")
 
                     # Get related memories
-                    provider: EmbeddingsProvider = EmbeddingsFactory.create_provider(settings.embedding_model)
-                    embeddings = provider.get_embeddings(data.content)
-                    rel_memories_ids = milvus.search_relevent_nodes_by_embeddings(embeddings)
+                    embeddings = [memory_embeddings[data.content]]
+                    rel_memories_ids = await search_similar_nodes(embeddings)
                     rel_memories: List[Memory] = []
                     for id in rel_memories_ids.keys():
                         memory = postgres.get_memory_details(id)
@@ -281,24 +474,24 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
 
                     st.write("**Getting LLM response...**")
                     # Get response from llm
-                    llm_provider: LLMProvider = LLMFactory.create_provider(
-                        settings.get_llm_config(DEFAULT_CONFIGS["insertion"]["model"])
-                    )
+                    llm_provider = LLMRouter.from_stage_config(DEFAULT_CONFIGS["insertion"])
                     messages = [{"role": "user", "content": prompt}]
-                    full_resp = ""
-                    async for chunk in llm_provider.stream_completion(
-                        messages, 
-                        DEFAULT_CONFIGS["insertion"]["temperature"]
-                    ):
-                        full_resp += chunk
-                    thinking_resp, json_resp = await process_thinking_response(full_resp, ModelResponseInsertion)
+                    thinking_resp, json_resp = await process_thinking_stream(
+                        llm_provider.stream_completion(
+                            messages, 
+                            DEFAULT_CONFIGS["insertion"]["temperature"],
+                            cache=DEFAULT_CONFIGS["insertion"].get("cache", False),
+                            stage="insertion",
+                            priority=Priority.BACKGROUND,
+                        ),
+                        ModelResponseInsertion,
+                    )
 
                     st.write("**Model Thinking:**")
                     st.text(thinking_resp)
                     st.write("**Final Action:**")
                     st.json(json_resp.model_dump_json())
 
-                    st.write("**Saving to databases...**")
                     # Convert int back to uuid using mappings if we have related memories
                     if len(rel_memories) > 0:
                         json_resp.related_memory_ids = [
@@ -306,20 +499,9 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                             if id in uuid_mapping
                         ]
 
-                    # Insert node in postgres
-                    new_mem_id = postgres.insert_memory(data.content)
-                    st.write("✓ Saved to PostgreSQL")
-
-                    # Insert node in milvus
-                    milvus.insert_node(new_mem_id, embeddings)
-                    st.write("✓ Saved to Milvus")
-
-                    # Update mongodb adjacency list
-                    for id in json_resp.related_memory_ids:
-                        mongodb.make_edge(id, new_mem_id)
-                    st.write(f"✓ Created {len(json_resp.related_memory_ids)} edges in MongoDB")
-                    
-                    st.success("Insert action completed successfully")
+                    # Saved with the rest of the run's memories below
+                    pending_memories.setdefault(data.content, []).extend(json_resp.related_memory_ids)
+                    st.success("Insert action queued, saved with the other new memories")
 
                 elif dec.action == DecisionOutputType.MERGE_CONFLICT:
                     data: MergeConflictAction = dec.data
@@ -328,25 +510,25 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                     # Generate questions
                     st.write("**Generating clarifying questions...**")
                     prompt = get_merge_conflict_generate_questions_prompt(
-                        date=datetime.now(timezone.utc).strftime("%dth %B %Y"),
-                        time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+                        date=extraction_time.strftime("%dth %B %Y"),
+                        time=extraction_time.strftime("%H:%M:%S"),
                         conflicting_memories=data.conflicting_memories,
                         new_memory=st.session_state.generated_memories[idx-1]
                     )
 
                     # Get questions from LLM
-                    llm_provider = LLMFactory.create_provider(
-                        settings.get_llm_config(DEFAULT_CONFIGS["merge_conflict"]["model"])
-                    )
+                    llm_provider = LLMRouter.from_stage_config(DEFAULT_CONFIGS["merge_conflict"])
                     messages = [{"role": "user", "content": prompt}]
-                    questions_response = ""
-                    async for chunk in llm_provider.stream_completion(
-                        messages,
-                        DEFAULT_CONFIGS["merge_conflict"]["temperature"]
-                    ):
-                        questions_response += chunk
-                    
-                    thinking, questions = await process_thinking_response(questions_response, QuestionResponse)
+                    thinking, questions = await process_thinking_stream(
+                        llm_provider.stream_completion(
+                            messages,
+                            DEFAULT_CONFIGS["merge_conflict"]["temperature"],
+                            cache=DEFAULT_CONFIGS["merge_conflict"].get("cache", False),
+                            stage="merge_conflict",
+                            priority=Priority.BACKGROUND,
+                        ),
+                        QuestionResponse,
+                    )
                     
                     st.write("**Model Thinking:**")
                     st.text(thinking)
@@ -374,14 +556,16 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                             message=st.session_state.generated_memories[idx]
                         )
                         
-                        memories_response = ""
-                        async for chunk in llm_provider.stream_completion(
-                            [{"role": "user", "content": prompt}],
-                            DEFAULT_CONFIGS["merge_conflict"]["temperature"]
-                        ):
-                            memories_response += chunk
-                            
-                        thinking, new_memories = await process_thinking_response(memories_response, GeneratedMemories)
+                        thinking, new_memories = await process_thinking_stream(
+                            llm_provider.stream_completion(
+                                [{"role": "user", "content": prompt}],
+                                DEFAULT_CONFIGS["merge_conflict"]["temperature"],
+                                cache=DEFAULT_CONFIGS["merge_conflict"].get("cache", False),
+                                stage="merge_conflict",
+                                priority=Priority.BACKGROUND,
+                            ),
+                            GeneratedMemories,
+                        )
                         
                         st.write("**Model Thinking:**")
                         st.text(thinking)
@@ -389,19 +573,19 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                         for memory in new_memories.memories:
                             st.write(f"- {memory}")
                             
-                        # Update databases with new memories
-                        for memory in new_memories.memories:
-                            # Get embeddings
-                            provider = EmbeddingsFactory.create_provider(settings.embedding_model)
-                            embeddings = provider.get_embeddings(memory)
-                            
-                            # Insert into databases
-                            new_mem_id = postgres.insert_memory(memory)
-                            milvus.insert_node(new_mem_id, embeddings)
-                            
-                            # Update edges
-                            for conf_mem in data.conflicting_memories:
-                                mongodb.make_edge(new_mem_id, conf_mem.memory_id)
+                        # Update databases with new memories: one transaction, one vector store insert, one edge update
+                        await embed_missing(new_memories.memories, stage="merge_conflict")
+                        # Memories already stored come back without an id and are skipped
+                        new_mem_ids = postgres.insert_memories(new_memories.memories)
+                        vector_db.insert_nodes(
+                            list(new_mem_ids.values()),
+                            [memory_embeddings[memory] for memory in new_mem_ids],
+                        )
+                        mongodb.make_edges([
+                            (new_mem_id, conf_mem.memory_id)
+                            for new_mem_id in new_mem_ids.values()
+                            for conf_mem in data.conflicting_memories
+                        ])
                                 
                         st.success("Merge conflict resolved successfully")
 
@@ -418,10 +602,9 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                         st.write(f"**Updating Memory {updated_memory.memory_id}**")
                         st.write("**Getting related memories...**")
 
-                        # Get embeddings for updated content
-                        provider: EmbeddingsProvider = EmbeddingsFactory.create_provider(settings.embedding_model)
-                        embeddings = provider.get_embeddings(updated_memory.content)
-                        rel_memories_ids = milvus.search_relevent_nodes_by_embeddings(embeddings)
+                        # Embeddings for updated content (embedded with the rest of the stage above)
+                        embeddings = [memory_embeddings[updated_memory.content]]
+                        rel_memories_ids = await search_similar_nodes(embeddings)
                         rel_memories: List[Memory] = []
                         for id in rel_memories_ids.keys():
                             memory = postgres.get_memory_details(id)
@@ -448,17 +631,18 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
 
                         st.write("**Getting LLM response...**")
                         # Get response from llm
-                        llm_provider: LLMProvider = LLMFactory.create_provider(
-                            settings.get_llm_config(DEFAULT_CONFIGS["addition"]["model"])
-                        )
+                        llm_provider = LLMRouter.from_stage_config(DEFAULT_CONFIGS["addition"])
                         messages = [{"role": "user", "content": prompt}]
-                        full_resp = ""
-                        async for chunk in llm_provider.stream_completion(
-                            messages,
-                            DEFAULT_CONFIGS["addition"]["temperature"]
-                        ):
-                            full_resp += chunk
-                        thinking_resp, json_resp = await process_thinking_response(full_resp, ModelResponseAddition)
+                        thinking_resp, json_resp = await process_thinking_stream(
+                            llm_provider.stream_completion(
+                                messages,
+                                DEFAULT_CONFIGS["addition"]["temperature"],
+                                cache=DEFAULT_CONFIGS["addition"].get("cache", False),
+                                stage="addition",
+                                priority=Priority.BACKGROUND,
+                            ),
+                            ModelResponseAddition,
+                        )
 
                         st.write("**Model Thinking:**")
                         st.text(thinking_resp)
@@ -473,21 +657,11 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                                 if id in uuid_mapping
                             ]
 
-                        # Update memory in postgres
-                        postgres.update_memory(updated_memory.memory_id, updated_memory.content)
-                        st.write("✓ Updated in PostgreSQL")
-
-                        # Update embeddings in milvus
-                        milvus.update_embeddings(updated_memory.memory_id, embeddings)
-                        st.write("✓ Updated in Milvus")
+                        # Postgres, vector store and mongodb are updated with the rest of the run's writes
+                        pending_updates[updated_memory.memory_id] = updated_memory.content
+                        pending_edges.extend((updated_memory.memory_id, id) for id in json_resp.related_memory_ids)
 
-                        # Update mongodb adjacency list
-                        # Add new edges
-                        for id in json_resp.related_memory_ids:
-                            mongodb.make_edge(updated_memory.memory_id, id)
-                        st.write(f"✓ Updated {len(json_resp.related_memory_ids)} edges in MongoDB")
-
-                        st.success(f"Memory {updated_memory.memory_id} updated successfully")
+                        st.success(f"Memory {updated_memory.memory_id} queued for update")
 
                 elif dec.action == DecisionOutputType.IGNORE:
                     data: IgnoreAction = dec.data
@@ -496,4 +670,27 @@ Below is the calendar for the month of {MONTHS[month - 1]} and year {year} in CS
                 else:
                     st.error(f"Unknown action type - {dec.action}")
 
+            if pending_memories or pending_updates or pending_edges:
+                st.subheader("Saving to databases")
+                contents = list(pending_memories)
+                # Insert and update nodes in postgres (one transaction) and the vector store (one insert)
+                # Texts that are already stored are skipped rather than failing the whole run
+                new_mem_ids = postgres.insert_memories(contents, pending_updates)
+                st.write(f"✓ Saved {len(new_mem_ids)} memories and updated {len(pending_updates)} in PostgreSQL")
+                if len(new_mem_ids) < len(contents):
+                    st.warning(f"Skipped {len(contents) - len(new_mem_ids)} memories that are already stored")
+                for memory_id, content in pending_updates.items():
+                    vector_db.update_embeddings(memory_id, [memory_embeddings[content]])
+                vector_db.insert_nodes(
+                    list(new_mem_ids.values()),
+                    [memory_embeddings[content] for content in new_mem_ids],
+                )
+                st.write(f"✓ Saved {len(new_mem_ids)} memories to {settings.VECTOR_BACKEND.capitalize()}")
+
+                # Update mongodb adjacency list in one write
+                for content, new_mem_id in new_mem_ids.items():
+                    pending_edges.extend((id, new_mem_id) for id in pending_memories[content])
+                mongodb.make_edges(pending_edges)
+                st.write(f"✓ Created {len(pending_edges)} edges in MongoDB")
+
             st.success("All memories processed successfully")
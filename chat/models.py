@@ -1,5 +1,5 @@
-from pydantic import BaseModel, field_validator
-from typing import List, Dict, Union
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import Any, List, Dict, Union
 from enum import Enum
 
 ##* CLASSIFIER
@@ -94,6 +94,27 @@ class ModelResponseDecision(BaseModel):
             raise ValueError('data must be IgnoreAction when action is IGNORE')
         return v
 
+class ModelResponseDecisionBatchItem(ModelResponseDecision):
+    # position of the new memory in the batch the decision is for
+    memory_index: int
+
+class ModelResponseDecisionBatch(BaseModel):
+    decisions: List[ModelResponseDecisionBatchItem]
+
+    @field_validator('decisions', mode='before')
+    def drop_invalid_decisions(cls, v: Any) -> Any:
+        # One malformed decision shouldn't void the others: invalid items are dropped,
+        # and the memories they were for are decided on their own
+        if not isinstance(v, list):
+            return v
+        decisions = []
+        for item in v:
+            try:
+                decisions.append(ModelResponseDecisionBatchItem.model_validate(item))
+            except ValidationError:
+                continue
+        return decisions
+
 ##* INSERTION PROMPT
 class ModelResponseInsertion(BaseModel):
     related_memory_ids: List[Union[str, int]]
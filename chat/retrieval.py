@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+from .constants import DEFAULT_CONFIGS
+from config import get_settings
+from utils import postgres, vector_db
+from utils.embeddings import EmbeddingsFactory
+
+settings = get_settings()
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[str, float]]],
+    k: int = 60,
+) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked result lists: each id scores sum(1 / (k + rank)) over the lists it appears in
+
+    Only ranks matter, so lists scored on different scales fuse fairly. Returns
+    deduplicated (id, fused score) pairs, best first.
+
+    Example:
+        >>> reciprocal_rank_fusion([[("a", 0.9), ("b", 0.8)], [("b", 0.7)]])
+        [('b', 0.0325...), ('a', 0.0163...)]
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (item_id, _) in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+async def retrieve_memories(
+    queries: List[str],
+    keywords: List[str],
+    stats: Dict[str, Any],
+) -> List[Tuple[str, float]]:
+    """
+    Memory ids relevant to the generated search queries and keywords, with their fused scores
+
+    All queries are embedded in one batch and searched in one multi-vector
+    request, while the keywords run as one full-text search in Postgres; the
+    per-query and keyword rankings are merged with reciprocal rank fusion.
+    Seconds spent in each step are recorded in stats.
+    """
+    config = DEFAULT_CONFIGS["retrieval"]
+    queries = list(dict.fromkeys(query for query in queries if query.strip()))
+
+    async def vector_rankings() -> List[List[Tuple[str, float]]]:
+        if not queries:
+            return []
+        start = time.perf_counter()
+        provider = EmbeddingsFactory.create_provider(settings.embedding_model)
+        embeddings = await asyncio.to_thread(provider.embed_batch, queries, stage="retrieval")
+        stats["embedding"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rankings = await asyncio.to_thread(vector_db.search_nodes_multi_query, embeddings, config["per_query_k"])
+        stats["search"] = time.perf_counter() - start
+        return rankings
+
+    async def keyword_ranking() -> List[Tuple[str, float]]:
+        start = time.perf_counter()
+        ranking = await asyncio.to_thread(postgres.keyword_search, keywords, config["keyword_k"])
+        stats["keyword_search"] = time.perf_counter() - start
+        return ranking
+
+    rankings, keyword_hits = await asyncio.gather(vector_rankings(), keyword_ranking())
+
+    start = time.perf_counter()
+    fused = reciprocal_rank_fusion([*rankings, keyword_hits], k=config["rrf_k"])[:config["top_k"]]
+    stats["fusion"] = time.perf_counter() - start
+    stats["queries"] = len(queries)
+    stats["keywords"] = len(keywords)
+    return fused
@@ -1,6 +1,8 @@
 import re
-from typing import TypeVar, Tuple, Type
+from typing import AsyncIterator, Callable, List, Optional, TypeVar, Tuple, Type
 from pydantic import BaseModel
+from utils.json_repair import parse_json_model
+from utils.llm import complete_stream
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -15,12 +17,135 @@ async def process_thinking_response(response_text: str, model_type: Type[T]) ->
     Returns:
         Tuple of (thinking_text, validated_model_instance)
     """
-    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    if not json_match:
-        raise ValueError("No valid JSON found in response")
-    
     thinking_match = re.search(r'<think>(.*?)</think>', response_text, re.DOTALL)
     if not thinking_match:
         raise ValueError("No valid thinking found in response")
-        
-    return thinking_match.group(1).strip(), model_type.model_validate_json(json_match.group(1))
+
+    json_match = re.search(r'```json\s*(.*?)\s*(?:```|$)', response_text, re.DOTALL)
+    if json_match:
+        json_text = json_match.group(1)
+    else:
+        # No fenced block: take whatever follows the thinking and let the repair pass find the JSON
+        json_text = response_text[thinking_match.end():]
+        if "{" not in json_text and "[" not in json_text:
+            raise ValueError("No valid JSON found in response")
+
+    return thinking_match.group(1).strip(), parse_json_model(json_text, model_type)
+
+class ThinkingStreamParser:
+    """
+    Incrementally split a streamed reasoning response into its <think> and ```json blocks
+
+    Chunks are scanned once as they arrive (markers may straddle chunk boundaries),
+    so no response-sized string is rebuilt per chunk. Each block is emitted through
+    its callback as soon as its closing marker arrives, and `done` turns true once
+    the JSON block is closed so the caller can stop reading the stream.
+    """
+    # (marker that ends the state, next state)
+    _TRANSITIONS = {
+        "before_think": ("<think>", "thinking"),
+        "thinking": ("</think>", "before_json"),
+        "before_json": ("```json", "json"),
+        "json": ("```", "done"),
+    }
+
+    def __init__(
+        self,
+        on_thinking: Optional[Callable[[str], None]] = None,
+        on_json: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.on_thinking = on_thinking
+        self.on_json = on_json
+        self.state = "before_think"
+        self.thinking: Optional[str] = None
+        self.json_text: Optional[str] = None
+        self.chars = 0
+        self._chunks: List[str] = []
+        self._parts: List[str] = []
+        self._tail = ""
+
+    @property
+    def done(self) -> bool:
+        return self.state == "done"
+
+    @property
+    def text(self) -> str:
+        """Raw text consumed so far"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        self._chunks.append(chunk)
+        self.chars += len(chunk)
+        text = chunk
+        while text and not self.done:
+            marker, next_state = self._TRANSITIONS[self.state]
+            window = self._tail + text
+            idx = window.find(marker)
+            if idx == -1:
+                self._parts.append(text)
+                self._tail = window[-(len(marker) - 1):]
+                return
+
+            # Marker may start inside the tail carried over from earlier chunks
+            cut = idx - len(self._tail)
+            if cut >= 0:
+                self._parts.append(text[:cut])
+                segment = "".join(self._parts)
+            else:
+                segment = "".join(self._parts)[:cut]
+            text = text[cut + len(marker):]
+            self._parts = []
+            self._tail = ""
+            self._close_block(segment)
+            self.state = next_state
+
+    def _close_block(self, segment: str) -> None:
+        if self.state == "thinking":
+            self.thinking = segment.strip()
+            if self.on_thinking:
+                self.on_thinking(self.thinking)
+        elif self.state == "json":
+            self.json_text = segment.strip()
+            if self.on_json:
+                self.on_json(self.json_text)
+
+async def process_thinking_stream(
+    stream: AsyncIterator[str],
+    model_type: Type[T],
+    parser: Optional[ThinkingStreamParser] = None,
+) -> Tuple[str, T]:
+    """
+    Consume a streamed model response and validate its JSON block against provided Pydantic model
+
+    Stops reading (and closes the stream) as soon as the JSON block is closed. Falls back
+    to process_thinking_response on the full text when the blocks don't arrive in the
+    expected <think> then ```json order. Near-valid JSON is repaired before validation
+    (utils.json_repair) instead of failing the stage; truncated JSON (an unterminated
+    block cut off mid-value) raises TruncatedJSONError rather than being written as if whole.
+
+    Args:
+        stream: Async iterator of response chunks, e.g. LLMProvider.stream_completion(...)
+        model_type: Pydantic model class to validate JSON against
+        parser: Optional parser to use, to read its callbacks or raw text afterwards
+
+    Returns:
+        Tuple of (thinking_text, validated_model_instance)
+    """
+    parser = parser or ThinkingStreamParser()
+    try:
+        async for chunk in stream:
+            parser.feed(chunk)
+            if parser.done:
+                break
+    finally:
+        if parser.done:
+            # The whole answer was read: let a cached completion be stored
+            await complete_stream(stream)
+        else:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    if not parser.done:
+        return await process_thinking_response(parser.text, model_type)
+    return parser.thinking, parse_json_model(parser.json_text, model_type)
@@ -1,5 +1,5 @@
 import json
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic_settings import BaseSettings
 from pathlib import Path
 from pydantic import BaseModel, field_validator
@@ -17,11 +17,22 @@ class LLMCost(BaseModel):
 class EmbeddingCost(BaseModel):
     input: float
 
+class RateLimitConfig(BaseModel):
+    """Provider quota for one deployment, enforced by utils.llm.scheduler (defaults apply when unset)"""
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_concurrency: int = 8
+    # concurrency slots that background calls may never take, kept free for interactive calls
+    reserved_interactive: int = 1
+    # retries of a call rejected with 429 before any token was streamed
+    max_retries: int = 3
+
 class BaseLLMConfig(BaseModel):
     provider: str
     name: str
     api_key: str
     cost: LLMCost
+    rate_limit: Optional[RateLimitConfig] = None
 
 class EmbeddingConfig(BaseModel):
     provider: str
@@ -29,6 +40,10 @@ class EmbeddingConfig(BaseModel):
     n_dim: int
     api_key: str
     cost: EmbeddingCost
+    # local providers only: directory holding the exported model (default data/models/<name>)
+    model_path: Optional[str] = None
+    # local providers only: the model is Matryoshka-trained, so its vectors may be truncated to n_dim
+    matryoshka: bool = False
 
 class ModelsConfig(BaseModel):
     llms: List[BaseLLMConfig]
@@ -50,12 +65,28 @@ class Settings(BaseSettings):
     MONGO_DB: str
     MONGO_COLLECTION: str
 
+    # Vector Backend Configuration: "milvus" or "numpy" (in-process, see utils.vector_db)
+    VECTOR_BACKEND: str = "milvus"
+    # numpy backend: directory of the memory-mapped matrix and its storage dtype; float16
+    # halves memory and disk but is slower to search (NumPy upcasts it to float32 per query)
+    NUMPY_VECTORS_PATH: str = "data/vectors"
+    NUMPY_VECTORS_DTYPE: str = "float32"
+
     # Milvus Configuration
     # MILVUS_USER: str
     # MILVUS_PASSWORD: str
     MILVUS_HOST: str
     MILVUS_PORT: str
     MILVUS_COLLECTION: str
+    # Vector storage for new collections: float32, float16, int8 (IVF_SQ8) or binary
+    MILVUS_VECTOR_TYPE: str = "float32"
+    # Re-score this many top candidates against the stored vectors at full precision (0 = off)
+    MILVUS_RERANK_CANDIDATES: int = 0
+    # Recall the index manager tunes index choice and nprobe / ef for
+    MILVUS_TARGET_RECALL: float = 0.95
+    # Inserts / upserts are sent in batches of this many rows, or this long after the first one
+    MILVUS_WRITE_BUFFER_ROWS: int = 256
+    MILVUS_WRITE_BUFFER_SECONDS: float = 1.0
 
     # LLM Configuration
     MODELS_CONFIG_PATH: str
@@ -63,6 +94,23 @@ class Settings(BaseSettings):
     # Pricing Configuration
     DOLLAR_TO_INR: float
 
+    # HTTP Connection Pool Configuration (shared by pooled LLM / embeddings clients)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+
+    # LLM Completion Cache Configuration (stages opt in via DEFAULT_CONFIGS)
+    LLM_CACHE_PATH: str = "data/llm_cache.sqlite"
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    LLM_CACHE_TTL_SECONDS: Optional[float] = 7 * 24 * 60 * 60
+
+    # Embedding Cache Configuration (content-addressed, shared by all stages)
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite"
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Metrics Configuration (per-call tokens, latency and cost)
+    METRICS_DB_PATH: str = "data/metrics.sqlite"
+
     @field_validator('MODELS_CONFIG_PATH')
     def check_models_config_path(cls, value):
         if not Path(value).exists():
@@ -1,19 +1,22 @@
 import streamlit as st
-from utils import mongodb, postgres, milvus
+from config import get_settings
+from utils import mongodb, postgres, vector_db
+
+settings = get_settings()
 
 def get_database_counts():
     """Get count of items in each database"""
     pg_count = postgres.get_node_count()
     mongo_count = sum([len(mongodb.get_adjacency_list()[node_adj_list]) for node_adj_list in mongodb.get_adjacency_list().keys()])
-    milvus_count = milvus.get_node_count()
-    return pg_count, mongo_count, milvus_count
+    vector_count = vector_db.get_node_count()
+    return pg_count, mongo_count, vector_count
 
 def show_reset_database():
     st.title("⚠️ Danger Zone ⚠️")
     st.warning("Warning: These actions are irreversible!")
 
     # Get current counts
-    pg_count, mongo_count, milvus_count = get_database_counts()
+    pg_count, mongo_count, vector_count = get_database_counts()
     
     col1, col2, col3 = st.columns(3)
 
@@ -38,11 +41,11 @@ def show_reset_database():
                 st.error("Please confirm deletion by checking the box")
 
     with col3:
-        st.metric("Milvus Vectors", milvus_count)
-        milvus_confirm = st.checkbox(f"Confirm deletion of {milvus_count} Milvus vectors")
-        if st.button("Clear Milvus"):
-            if milvus_confirm:
-                milvus.clear_all_nodes()
-                st.success(f"Milvus database cleared! Deleted {milvus_count} vectors.")
+        st.metric(f"{settings.VECTOR_BACKEND.capitalize()} Vectors", vector_count)
+        vector_confirm = st.checkbox(f"Confirm deletion of {vector_count} vectors")
+        if st.button("Clear Vectors"):
+            if vector_confirm:
+                vector_db.clear_all_nodes()
+                st.success(f"Vector store cleared! Deleted {vector_count} vectors.")
             else:
                 st.error("Please confirm deletion by checking the box")
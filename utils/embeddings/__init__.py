@@ -1,7 +1,9 @@
 from .factory import EmbeddingsFactory
 from .base import EmbeddingsProvider
+from .cache import get_embedding_cache
 
 __all__ = [
     "EmbeddingsFactory",
     "EmbeddingsProvider",
+    "get_embedding_cache",
 ]
@@ -1,20 +1,158 @@
+import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+from config import get_settings
+from utils.metrics import TokenUsage, estimate_tokens, record_call
+from .cache import decode_vector, embedding_cache_key, encode_vector, get_embedding_cache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Shared by every provider for sending batches in parallel
+_batch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embeddings-batch")
 
 class EmbeddingsProvider(ABC):
+    # Request limits of the provider's embeddings endpoint, used to split embed_batch input
+    max_batch_items: int = 256
+    max_batch_tokens: int = 100_000
+
     def __init__(self, model_config: Dict[str, Any]):
         self.model_config = model_config
 
-    @abstractmethod
     def get_embeddings(
         self,
         texts: Union[str, List[str]],
         # dimensions: int = None
+        stage: Optional[str] = None,
+    ) -> List[List[float]]:
+        """Generate embeddings for input texts, recording tokens, latency and cost under stage
+
+        Vectors are served from the persistent embedding cache (keyed by model, n_dim
+        and sha256 of the text) where possible; only cache misses reach the provider.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+
+        start = time.perf_counter()
+        cache = get_embedding_cache()
+        keys = [embedding_cache_key(self.model_config, text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        for key in dict.fromkeys(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                vectors[key] = decode_vector(cached)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if not missing:
+            self._record_metrics(stage, [], TokenUsage(input_tokens=0), time.perf_counter() - start, "ok", cache_hit=True)
+            return [vectors[key] for key in keys]
+
+        usage = TokenUsage()
+        status = "error"
+        try:
+            embeddings = self._get_embeddings(list(missing.values()), usage)
+            status = "ok"
+        finally:
+            self._record_metrics(stage, list(missing.values()), usage, time.perf_counter() - start, status)
+
+        for key, vector in zip(missing, embeddings):
+            cache.set(key, encode_vector(vector))
+            vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        stage: Optional[str] = None,
     ) -> List[List[float]]:
-        """Generate embeddings for input texts"""
+        """
+        Embed every text a pipeline stage needs in as few requests as possible
+
+        Duplicate texts are embedded once, the rest are split into requests that
+        respect max_batch_items and max_batch_tokens, and those requests are sent in
+        parallel. Vectors are returned in input order.
+
+        Example:
+            >>> provider.embed_batch(["likes tea", "lives in Pune", "likes tea"], stage="decision")
+            [[...], [...], [...]]
+        """
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return []
+
+        batches: List[List[str]] = [[]]
+        batch_tokens = 0
+        for text in unique:
+            tokens = estimate_tokens(text)
+            if batches[-1] and (
+                len(batches[-1]) >= self.max_batch_items
+                or batch_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append([])
+                batch_tokens = 0
+            batches[-1].append(text)
+            batch_tokens += tokens
+
+        if len(batches) == 1:
+            results = [self.get_embeddings(batches[0], stage=stage)]
+        else:
+            results = list(_batch_executor.map(lambda batch: self.get_embeddings(batch, stage=stage), batches))
+
+        vectors = {
+            text: vector
+            for batch, embeddings in zip(batches, results)
+            for text, vector in zip(batch, embeddings)
+        }
+        return [vectors[text] for text in texts]
+
+    @abstractmethod
+    def _get_embeddings(
+        self,
+        texts: List[str],
+        usage: Optional[TokenUsage] = None,
+    ) -> List[List[float]]:
+        """Generate embeddings from the provider, filling usage when the provider reports it"""
         pass
 
+    def _record_metrics(
+        self,
+        stage: Optional[str],
+        texts: List[str],
+        usage: TokenUsage,
+        latency: float,
+        status: str,
+        cache_hit: bool = False,
+    ) -> None:
+        input_tokens = usage.input_tokens
+        if input_tokens is None:
+            input_tokens = sum(estimate_tokens(text) for text in texts)
+        try:
+            record_call(
+                kind="embedding",
+                stage=stage,
+                provider=self.model_config.provider,
+                model=self.model_config.name,
+                input_tokens=input_tokens,
+                output_tokens=0,
+                usage_estimated=int(usage.input_tokens is None),
+                latency=latency,
+                cost=self.get_token_cost(input_tokens),
+                cache_hit=int(cache_hit),
+                status=status,
+            )
+        except Exception:
+            # Metrics must never fail the call they describe
+            logger.exception("Failed to record embedding call metrics")
+
+    def close(self) -> None:
+        """Close the SDK client and release its pooled connections"""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+
     def get_token_cost(self, num_tokens: int) -> float:
         """Calculate cost in USD per 1M tokens"""
-        cost = self.model_config['cost']
-        return (num_tokens * cost['input']) / 1_000_000
+        cost = self.model_config.cost
+        return (num_tokens * cost.input) / 1_000_000 * settings.DOLLAR_TO_INR
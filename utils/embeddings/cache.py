@@ -0,0 +1,34 @@
+import hashlib
+import threading
+from array import array
+from typing import List, Optional
+from config import EmbeddingConfig, get_settings
+from utils.disk_cache import DiskLRUCache
+
+settings = get_settings()
+
+_cache: Optional[DiskLRUCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> DiskLRUCache:
+    """Process-wide embedding cache, opened lazily on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskLRUCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            )
+    return _cache
+
+def embedding_cache_key(model_config: EmbeddingConfig, text: str) -> str:
+    """Content address of a text's vector: model, dimensions and sha256 of the text"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_config.name}:{model_config.n_dim}:{digest}"
+
+def encode_vector(vector: List[float]) -> bytes:
+    # float64 so cached vectors are bit-identical to freshly fetched ones
+    return array("d", vector).tobytes()
+
+def decode_vector(value: bytes) -> List[float]:
+    return array("d", value).tolist()
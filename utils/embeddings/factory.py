@@ -1,13 +1,54 @@
-from typing import Dict, Any
+import threading
+from typing import Dict, Optional, Tuple
 from .base import EmbeddingsProvider
 from .openai import OpenAIProvider
+from .onnx import ONNXProvider
 from config import EmbeddingConfig
 
 class EmbeddingsFactory:
-    @staticmethod 
-    def create_provider(model_config: EmbeddingConfig) -> EmbeddingsProvider:
+    # Long-lived providers keyed by (provider, model, api_key), reused across calls and reruns
+    _providers: Dict[Tuple[str, str, str], EmbeddingsProvider] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _registry_key(model_config: EmbeddingConfig) -> Tuple[str, str, str]:
+        return (model_config.provider.lower(), model_config.name, model_config.api_key)
+
+    @staticmethod
+    def _build_provider(model_config: EmbeddingConfig) -> EmbeddingsProvider:
         provider = model_config.provider.lower()
         if provider == 'openai':
             return OpenAIProvider(model_config)
+        elif provider in ('local', 'onnx'):
+            return ONNXProvider(model_config)
         else:
             raise ValueError(f"Unknown embeddings provider: {provider}")
+
+    @classmethod
+    def create_provider(cls, model_config: EmbeddingConfig) -> EmbeddingsProvider:
+        """Return the pooled provider for this config, creating it on first use"""
+        key = cls._registry_key(model_config)
+        with cls._lock:
+            provider = cls._providers.get(key)
+            if provider is None:
+                provider = cls._build_provider(model_config)
+                cls._providers[key] = provider
+        return provider
+
+    @classmethod
+    def refresh(cls, model_config: Optional[EmbeddingConfig] = None) -> None:
+        """Drop pooled providers (one, or all when model_config is None) so they are rebuilt"""
+        with cls._lock:
+            if model_config is None:
+                cls._providers.clear()
+            else:
+                cls._providers.pop(cls._registry_key(model_config), None)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Close every pooled provider's client and empty the registry"""
+        with cls._lock:
+            providers = list(cls._providers.values())
+            cls._providers.clear()
+        for provider in providers:
+            provider.close()
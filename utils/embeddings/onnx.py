@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from .base import EmbeddingsProvider
+from utils.metrics import TokenUsage
+from config import EmbeddingConfig
+
+DEFAULT_MODELS_DIR = "data/models"
+
+class ONNXProvider(EmbeddingsProvider):
+    """
+    Sentence-embedding model run in-process on CPU with ONNX Runtime
+
+    Expects a directory with an exported `model.onnx` and its `tokenizer.json`
+    (e.g. sentence-transformers/all-MiniLM-L6-v2 exported with optimum), at
+    `model_path` or data/models/<name>. Outputs are mean-pooled and
+    L2-normalised. n_dim must match the model's output dimension, unless the
+    model is Matryoshka-trained (`"matryoshka": true`), in which case vectors are
+    truncated to n_dim first. Texts are split into inference batches that run in
+    parallel on a thread pool (ONNX Runtime releases the GIL).
+
+    Needs the optional `onnxruntime` and `tokenizers` packages
+    (poetry install --extras local-embeddings).
+
+    Example models.json entry:
+        "embedding": {
+            "provider": "Local",
+            "name": "all-MiniLM-L6-v2",
+            "n_dim": 384,
+            "api_key": "",
+            "cost": {"input": 0.0}
+        }
+    """
+    # No request limits in-process; large inputs are split into inference batches instead
+    max_batch_items = 4096
+    max_batch_tokens = 4096 * 256
+
+    def __init__(
+        self,
+        model_config: EmbeddingConfig,
+        inference_batch_size: int = 32,
+        workers: Optional[int] = None,
+        max_length: int = 256,
+    ):
+        super().__init__(model_config)
+        try:
+            import numpy as np
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The local embeddings provider needs onnxruntime and tokenizers: "
+                "poetry install --extras local-embeddings"
+            ) from e
+        self._np = np
+
+        model_dir = model_config.model_path or os.path.join(DEFAULT_MODELS_DIR, model_config.name)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        self.inference_batch_size = inference_batch_size
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 1) // 2))
+        options = ort.SessionOptions()
+        # Split the cores between the parallel batches instead of oversubscribing them
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onnx-embeddings")
+
+        # Truncating a model that wasn't trained for it scrambles its embeddings
+        model_dim = self._run(["dimension probe"])[0].shape[-1]
+        if model_config.n_dim > model_dim or (model_config.n_dim < model_dim and not model_config.matryoshka):
+            raise ValueError(
+                f"{model_config.name} produces {model_dim}-dim vectors but n_dim is {model_config.n_dim}; "
+                f"set n_dim to {model_dim}, or set matryoshka to true if the model supports truncation"
+            )
+
+    def _run(self, texts: List[str]):
+        """Return (pooled model outputs, attention mask) for one inference batch"""
+        np = self._np
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        output = self.session.run(None, {name: value for name, value in feed.items() if name in self.input_names})[0]
+        if output.ndim == 3:
+            # Token embeddings: mean-pool over real (unpadded) tokens
+            mask = attention_mask[..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return output, attention_mask
+
+    def _encode(self, texts: List[str]):
+        """Return (L2-normalised vectors, number of tokens) for one inference batch"""
+        np = self._np
+        output, attention_mask = self._run(texts)
+        vectors = output[:, :self.model_config.n_dim]
+        vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors, int(attention_mask.sum())
+
+    def _get_embeddings(
+        self,
+        texts: List[str],
+        usage: Optional[TokenUsage] = None,
+    ) -> List[List[float]]:
+        batches = [
+            texts[i:i + self.inference_batch_size]
+            for i in range(0, len(texts), self.inference_batch_size)
+        ]
+        if len(batches) == 1:
+            results = [self._encode(batches[0])]
+        else:
+            results = list(self.executor.map(self._encode, batches))
+
+        if usage is not None:
+            usage.input_tokens = sum(tokens for _, tokens in results)
+        return [vector.tolist() for vectors, _ in results for vector in vectors]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
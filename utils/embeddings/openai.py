@@ -1,29 +1,39 @@
 import openai
 from openai.types import CreateEmbeddingResponse
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 from .base import EmbeddingsProvider
+from utils.metrics import TokenUsage
 from config import BaseLLMConfig
+from utils.http_pool import create_http_client
 
 class OpenAIProvider(EmbeddingsProvider):
+    # 2048 inputs / 300k tokens per request, with headroom for the ~4 chars/token estimate
+    max_batch_items = 2048
+    max_batch_tokens = 250_000
+
     def __init__(self, model_config: BaseLLMConfig):
         super().__init__(model_config)
         self.client = openai.OpenAI(
             api_key=model_config.api_key,
+            http_client=create_http_client(),
         )
 
-    def get_embeddings(
+    def _get_embeddings(
         self,
-        texts: Union[str, List[str]],
-        # dimensions: int = None
+        texts: List[str],
+        usage: Optional[TokenUsage] = None,
     ) -> List[List[float]]:
-        if isinstance(texts, str):
-            texts = [texts]
-        
+        kwargs = {}
+        if self.model_config.name.startswith("text-embedding-3"):
+            # Matryoshka models: request vectors truncated (and re-normalised) to n_dim
+            kwargs["dimensions"] = self.model_config.n_dim
         response: CreateEmbeddingResponse = self.client.embeddings.create(
             input=texts,
             model=self.model_config.name,
-            # dimensions=dimensions
+            **kwargs,
         )
+        if response.usage and usage is not None:
+            usage.input_tokens = response.usage.prompt_tokens
         return [embedding.embedding for embedding in response.data]
 
 if __name__ == '__main__':
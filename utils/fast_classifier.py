@@ -0,0 +1,229 @@
+"""Local fast-path classifier for the chat memory-usage decision.
+
+Trained on (conversation, decision) pairs logged from the LLM classifier, it
+answers in milliseconds on CPU. Callers fall back to the LLM classifier when
+the local prediction's confidence is below a threshold.
+
+The log keeps only what the features use: the last CONTEXT_MESSAGES messages of
+each classified conversation, the decision and the LLM latency. It is rotated to
+`<log_path>.1` (replacing the previous rotation) once it reaches max_bytes, so at
+most about twice that is kept on disk; both files are used for training.
+
+`evaluate` only refits on a split of the log and scores the held-out part; it does
+not load the saved model, which was trained on the whole log and so can't be scored
+against it fairly. `train` prints the same metrics and then saves the model.
+
+Usage:
+    poetry run python -m utils.fast_classifier train
+    poetry run python -m utils.fast_classifier evaluate
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LOG_PATH = "data/classifier_log.jsonl"
+DEFAULT_MODEL_PATH = "data/fast_classifier.joblib"
+DEFAULT_CONFIDENCE_THRESHOLD = 0.9
+DEFAULT_LOG_MAX_BYTES = 10_000_000
+# Number of trailing messages used as features; the latest user message dominates the decision
+CONTEXT_MESSAGES = 4
+# Fewest logged decisions, and fewest of each decision, the CLI will train / evaluate on
+MIN_LOG_RECORDS = 10
+MIN_CLASS_RECORDS = 2
+
+_log_lock = threading.Lock()
+
+def conversation_to_text(conversation: List[Dict]) -> str:
+    """Flatten the tail of a conversation into the classifier's input text"""
+    tail = conversation[-CONTEXT_MESSAGES:]
+    lines = [f"{message['role']}: {message['content']}" for message in tail]
+    # Repeat the latest message so it outweighs the context
+    if tail:
+        lines.append(f"latest: {tail[-1]['content']}")
+    return "\n".join(lines)
+
+def log_classification(
+    conversation: List[Dict],
+    memory_usage: bool,
+    llm_latency: Optional[float] = None,
+    log_path: str = DEFAULT_LOG_PATH,
+    max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+) -> None:
+    """Append an LLM classifier decision to the training log, rotating it once it reaches max_bytes"""
+    record = {
+        # Only the messages conversation_to_text reads
+        "conversation": [
+            {"role": message["role"], "content": message["content"]}
+            for message in conversation[-CONTEXT_MESSAGES:]
+        ],
+        "memory_usage": memory_usage,
+        "llm_latency": llm_latency,
+    }
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with _log_lock:
+        if os.path.exists(log_path) and os.path.getsize(log_path) >= max_bytes:
+            os.replace(log_path, log_path + ".1")
+        with open(log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+def load_log(log_path: str = DEFAULT_LOG_PATH) -> List[Dict]:
+    """Load logged (conversation, decision) pairs, oldest first, including the rotated log"""
+    records = []
+    for path in (log_path + ".1", log_path):
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+def split_records(records: List[Dict], test_size: float) -> Tuple[List[Dict], List[Dict]]:
+    """Deterministic (train, held-out) split, stratified by decision when both classes allow it"""
+    from sklearn.model_selection import train_test_split
+
+    labels = [bool(record["memory_usage"]) for record in records]
+    return train_test_split(
+        records, test_size=test_size, random_state=0,
+        stratify=labels if min(labels.count(True), labels.count(False)) >= 2 else None,
+    )
+
+class FastClassifier:
+    def __init__(self, pipeline, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> None:
+        self.pipeline = pipeline
+        self.confidence_threshold = confidence_threshold
+
+    @classmethod
+    def train(cls, records: List[Dict], confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> "FastClassifier":
+        """Fit a TF-IDF + logistic regression model on logged records"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        labels = [bool(record["memory_usage"]) for record in records]
+        if len(set(labels)) < 2:
+            raise ValueError("Training data must contain both memory_usage=true and memory_usage=false examples")
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1),
+            LogisticRegression(class_weight="balanced", max_iter=1000),
+        )
+        pipeline.fit([conversation_to_text(record["conversation"]) for record in records], labels)
+        return cls(pipeline, confidence_threshold)
+
+    @classmethod
+    def load(cls, model_path: str = DEFAULT_MODEL_PATH, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> "FastClassifier":
+        import joblib
+        return cls(joblib.load(model_path), confidence_threshold)
+
+    def save(self, model_path: str = DEFAULT_MODEL_PATH) -> None:
+        import joblib
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+        joblib.dump(self.pipeline, model_path)
+
+    def predict(self, conversation: List[Dict]) -> Tuple[bool, float]:
+        """Return (memory_usage, confidence) for a conversation"""
+        probabilities = self.pipeline.predict_proba([conversation_to_text(conversation)])[0]
+        classes = list(self.pipeline.classes_)
+        confidence = float(max(probabilities))
+        return bool(classes[int(probabilities.argmax())]), confidence
+
+    def predict_if_confident(self, conversation: List[Dict]) -> Tuple[Optional[bool], float]:
+        """Return (memory_usage, confidence), with memory_usage None when the LLM should decide"""
+        memory_usage, confidence = self.predict(conversation)
+        if confidence < self.confidence_threshold:
+            return None, confidence
+        return memory_usage, confidence
+
+_cached: Dict[str, Tuple[float, FastClassifier]] = {}
+
+def get_fast_classifier(
+    model_path: str = DEFAULT_MODEL_PATH,
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+) -> Optional[FastClassifier]:
+    """Load the trained classifier once (reloading when the file changes), or None if untrained"""
+    if not os.path.exists(model_path):
+        return None
+    mtime = os.path.getmtime(model_path)
+    cached = _cached.get(model_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, FastClassifier.load(model_path, confidence_threshold))
+        _cached[model_path] = cached
+    classifier = cached[1]
+    classifier.confidence_threshold = confidence_threshold
+    return classifier
+
+def evaluate(classifier: FastClassifier, records: List[Dict]) -> Dict[str, float]:
+    """Agreement and latency of the local classifier against logged LLM decisions"""
+    if not records:
+        raise ValueError("No records to evaluate against")
+    latencies = []
+    agree = confident = confident_agree = 0
+    true_total = true_caught = 0
+    for record in records:
+        start = time.perf_counter()
+        memory_usage, confidence = classifier.predict(record["conversation"])
+        latencies.append(time.perf_counter() - start)
+
+        expected = bool(record["memory_usage"])
+        agree += memory_usage == expected
+        if confidence >= classifier.confidence_threshold:
+            confident += 1
+            confident_agree += memory_usage == expected
+            if expected:
+                true_caught += memory_usage
+        if expected:
+            true_total += 1
+
+    latencies.sort()
+    llm_latencies = sorted(r["llm_latency"] for r in records if r.get("llm_latency"))
+    n = len(records)
+    return {
+        "samples": n,
+        "agreement": agree / n,
+        # share of turns answered locally at the configured threshold
+        "coverage": confident / n,
+        "agreement_when_confident": confident_agree / confident if confident else 0.0,
+        # memory-needing turns that the fast path answers correctly without the LLM
+        "memory_usage_recall_when_confident": true_caught / true_total if true_total else 0.0,
+        "local_latency_p50_ms": latencies[n // 2] * 1000,
+        "local_latency_p99_ms": latencies[min(n - 1, int(n * 0.99))] * 1000,
+        "llm_latency_p50_ms": llm_latencies[len(llm_latencies) // 2] * 1000 if llm_latencies else 0.0,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--log-path", default=DEFAULT_LOG_PATH)
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, help="Where train saves the model (unused by evaluate)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out fraction used for metrics")
+    args = parser.parse_args()
+
+    # The shipped model is trained on the whole log, so scoring it against the log would
+    # only measure how well it memorised it: both commands refit on a split and score the rest
+    records = load_log(args.log_path)
+    counts = [sum(bool(record["memory_usage"]) == value for record in records) for value in (True, False)]
+    if len(records) < MIN_LOG_RECORDS:
+        parser.error(f"{args.log_path} has {len(records)} logged decisions, at least {MIN_LOG_RECORDS} are needed")
+    if min(counts) < MIN_CLASS_RECORDS:
+        parser.error(
+            f"{args.log_path} has {counts[0]} memory_usage=true and {counts[1]} memory_usage=false decisions, "
+            f"at least {MIN_CLASS_RECORDS} of each are needed"
+        )
+    try:
+        train_records, test_records = split_records(records, args.test_size)
+    except ValueError as e:
+        parser.error(f"Can't hold out --test-size {args.test_size} of {len(records)} decisions: {e}")
+    metrics = evaluate(FastClassifier.train(train_records, args.threshold), test_records)
+    print(f"Held-out metrics ({len(test_records)} samples):")
+    print(json.dumps(metrics, indent=2))
+
+    if args.command == "train":
+        # Ship the model trained on everything we have
+        classifier = FastClassifier.train(records, args.threshold)
+        classifier.save(args.model_path)
+        print(f"Saved model trained on {len(records)} samples to {args.model_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import httpx
+from config import get_settings
+
+settings = get_settings()
+
+def get_pool_limits() -> httpx.Limits:
+    """Connection pool limits shared by every pooled SDK client"""
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+def create_http_client() -> httpx.Client:
+    """Create a keep-alive HTTP client for sync SDK clients.
+
+    SDKs pass their own timeout on every request, so only the pool is configured here.
+    """
+    return httpx.Client(limits=get_pool_limits(), follow_redirects=True)
+
+def create_async_http_client() -> httpx.AsyncClient:
+    """Create a keep-alive HTTP client for async SDK clients.
+
+    An async client's connections are bound to the event loop that opened them,
+    so LLM providers only use theirs on the shared I/O loop (utils.llm.io_loop).
+    """
+    return httpx.AsyncClient(limits=get_pool_limits(), follow_redirects=True)
@@ -0,0 +1,136 @@
+import json
+import re
+from typing import List, Tuple, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar('T', bound=BaseModel)
+
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+class TruncatedJSONError(ValueError):
+    """The JSON only validates once its truncated end is closed, so its last values may be cut short"""
+
+def repair_json(text: str) -> str:
+    """
+    Cheaply fix the usual ways LLM output misses valid JSON, in a single pass
+
+    Handles surrounding prose or code fences, trailing commas, raw newlines inside
+    strings, Python True/False/None literals and output truncated mid-object
+    (unterminated strings and brackets are closed, an incomplete last member such
+    as a key without its value is dropped). Text that is valid JSON comes back
+    unchanged.
+
+    Example:
+        >>> repair_json('Sure! {"ids": [1, 2,], "ok": True')
+        '{"ids": [1, 2], "ok": true}'
+    """
+    return _repair(text)[0]
+
+def _repair(text: str) -> Tuple[str, bool]:
+    """Repaired text, and whether it had to be closed because it was truncated"""
+    text = _FENCE.sub("", text.strip())
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text, False
+    text = text[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []
+    # per open container, where its current member starts in out
+    member_starts: List[int] = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            out.append(char)
+            member_starts.append(len(out))
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if stack and stack[-1] == char:
+                stack.pop()
+                member_starts.pop()
+            out.append(char)
+            if not stack:
+                # Anything after the top-level value is prose
+                break
+        elif char == "," and stack:
+            out.append(char)
+            member_starts[-1] = len(out)
+        elif char.isalpha():
+            word = re.match(r'[A-Za-z]+', text[i:]).group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    if not in_string and not stack:
+        return "".join(out), False
+
+    # Truncated output: close whatever is still open
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    closed = _close(out, stack)
+    try:
+        json.loads(closed)
+    except ValueError:
+        # The last member is incomplete (a key without its value, a cut-off literal): drop it
+        closed = _close(out[:member_starts[-1]], stack)
+    return closed, True
+
+def _close(out: List[str], stack: List[str]) -> str:
+    out = list(out)
+    while out and out[-1].strip() in ("", ",", ":"):
+        out.pop()
+    for closer in reversed(stack):
+        _strip_trailing_comma(out)
+        out.append(closer)
+    return "".join(out)
+
+def _strip_trailing_comma(out: list) -> None:
+    idx = len(out) - 1
+    while idx >= 0 and out[idx].isspace():
+        idx -= 1
+    if idx >= 0 and out[idx] == ",":
+        del out[idx]
+
+def parse_json_model(text: str, model_type: Type[T]) -> T:
+    """
+    Validate JSON text against a Pydantic model, retrying once on the repaired text
+
+    Truncated output (e.g. cut off by max_tokens) is not accepted: closing it would
+    turn a cut-short value into one that looks complete, so TruncatedJSONError is
+    raised instead.
+    """
+    try:
+        return model_type.model_validate_json(text)
+    except ValidationError as error:
+        repaired, truncated = _repair(text)
+        if truncated:
+            raise TruncatedJSONError(f"Truncated JSON output ({len(text)} chars), not repairing it") from error
+        if repaired == text:
+            raise
+        try:
+            return model_type.model_validate_json(repaired)
+        except ValidationError:
+            raise error
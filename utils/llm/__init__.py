@@ -1,7 +1,16 @@
 from .factory import LLMFactory
-from .base import LLMProvider
+from .base import LLMProvider, StreamComplete, complete_stream
+from .cache import get_completion_cache
+from .router import CircuitBreaker, LLMRouter
+from .scheduler import Priority
 
 __all__ = [
     "LLMFactory",
-    "LLMProvider"
+    "LLMProvider",
+    "StreamComplete",
+    "complete_stream",
+    "get_completion_cache",
+    "CircuitBreaker",
+    "LLMRouter",
+    "Priority",
 ]
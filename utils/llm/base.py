@@ -1,12 +1,40 @@
+import asyncio
+import json
+import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Dict, Generic, List, Optional, Tuple, TypeVar
+from contextlib import suppress
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Generic, List, Optional, Tuple, TypeVar
 from pydantic import BaseModel
 from config import BaseLLMConfig, get_settings
+from utils.metrics import TokenUsage, estimate_tokens, record_call
+from .cache import completion_cache_key, decode_chunks, encode_chunks, get_completion_cache
+from .io_loop import get_io_loop, run_on_io_loop, stream_on_io_loop, submit
+from .scheduler import Priority, get_scheduler, rate_limit_retry_after
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
+class StreamComplete(Exception):
+    """Thrown into a completion stream by a consumer that stops reading because it has the whole answer"""
+
+async def complete_stream(stream: AsyncIterator[str]) -> None:
+    """
+    Stop reading a stream whose answer is complete (see StreamComplete)
+
+    Unlike aclose(), which marks the completion as cut short, this lets a cached
+    stream_completion store what was read. Streams without athrow are just closed.
+    """
+    athrow = getattr(stream, "athrow", None)
+    if athrow is not None:
+        with suppress(StopAsyncIteration, StreamComplete):
+            await athrow(StreamComplete())
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
 # class LLMResponse:
 #     def __init__(
 #         self, 
@@ -23,26 +51,281 @@ T = TypeVar('T', bound=BaseModel)
 class LLMProvider(ABC, Generic[T]):
     def __init__(self, model_config: BaseLLMConfig) -> None:
         self.model_config = model_config
+        # Async SDK client (and its connection pool), created on the I/O loop (utils.llm.io_loop)
+        self._async_client: Any = None
+
+    @property
+    def async_client(self) -> Any:
+        """Async SDK client; provider I/O runs on the I/O loop, so this is only used there"""
+        if asyncio.get_running_loop() is not get_io_loop():
+            raise RuntimeError("Provider clients are only used on the LLM I/O loop")
+        if self._async_client is None:
+            self._async_client = self._create_async_client()
+        return self._async_client
 
     @abstractmethod
+    def _create_async_client(self) -> Any:
+        """Create the async SDK client used for streaming"""
+        pass
+
+    async def aclose(self) -> None:
+        """Close the SDK client and release its pooled connections"""
+        await run_on_io_loop(self._close_async_client())
+
+    def close_soon(self) -> None:
+        """Close the SDK client in the background, from sync code"""
+        submit(self._close_async_client())
+
+    async def _close_async_client(self) -> None:
+        client, self._async_client = self._async_client, None
+        if client is not None and hasattr(client, "close"):
+            await client.close()
+
     async def stream_completion(
         self,
         messages: List[Dict[str, str]],
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        cache: bool = False,
+        stage: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncGenerator[str, None]:
+        """Stream chat response.
+
+        With cache=True an identical earlier completion (same provider, model, messages
+        and temperature) is replayed instantly from the completion cache; otherwise the
+        fresh stream is stored once fully read. A stream closed early (rerun, consumer
+        error, abandoned hedge) is never stored; a consumer that stops early because it
+        has the whole answer signals it with complete_stream() so the text read is stored.
+
+        Tokens, time to first token, throughput, latency and cost are recorded in
+        utils.metrics for every call, tagged with the pipeline stage.
+
+        Calls are admitted through the deployment's utils.llm.scheduler (concurrency
+        bound, plus its rate_limit quota if configured) at the given priority;
+        background work should pass Priority.BACKGROUND so chat turns go first.
+        """
+        start = time.perf_counter()
+        usage = TokenUsage()
+        ttft: Optional[float] = None
+        output_chars = 0
+        status = "error"
+
+        key = cached = None
+        if cache:
+            completion_cache = get_completion_cache()
+            key = completion_cache_key(self.model_config, messages, temperature)
+            cached = completion_cache.get(key)
+        source = (
+            _replay(decode_chunks(cached)) if cached is not None
+            else self._scheduled_stream(messages, temperature, usage, priority)
+        )
+
+        chunks: List[str] = []
+        complete = False
+        try:
+            async for chunk in source:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                output_chars += len(chunk)
+                if key is not None and cached is None:
+                    chunks.append(chunk)
+                yield chunk
+            status = "ok"
+        except StreamComplete:
+            status = "closed"
+            complete = True
+        except GeneratorExit:
+            status = "closed"
+            raise
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            await source.aclose()
+            if key is not None and cached is None and (status == "ok" or complete):
+                completion_cache.set(key, encode_chunks(chunks))
+            self._record_metrics(
+                stage, messages, usage, output_chars, time.perf_counter() - start, ttft,
+                cache_hit=cached is not None, status=status,
+            )
+
+    async def _scheduled_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        usage: TokenUsage,
+        priority: Priority,
+    ) -> AsyncGenerator[str, None]:
+        """Provider stream admitted by the deployment's scheduler, retrying 429s that arrive before any token"""
+        scheduler = get_scheduler(self.model_config)
+        max_retries = scheduler.limits.max_retries
+        estimated = estimate_tokens("".join(m["content"] for m in messages))
+        for attempt in range(max_retries + 1):
+            # A rejected attempt may have reported usage; charge and record only this one
+            usage.reset()
+            await scheduler.acquire(priority, estimated)
+            stream = stream_on_io_loop(self._stream_completion(messages, temperature, usage))
+            output_chars = 0
+            try:
+                async for chunk in stream:
+                    output_chars += len(chunk)
+                    yield chunk
+                return
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if output_chars or retry_after is None or attempt == max_retries:
+                    raise
+                logger.warning("%s rate limited, retrying in %.1fs", self.model_config.provider, retry_after)
+                scheduler.backoff(retry_after)
+            finally:
+                await stream.aclose()
+                # Charge what the call actually used beyond the input estimate taken at admission
+                used = (usage.input_tokens or estimated) + (usage.output_tokens or output_chars // 4)
+                scheduler.release(max(0, used - estimated))
+
+    def _record_metrics(
+        self,
+        stage: Optional[str],
+        messages: List[Dict[str, str]],
+        usage: TokenUsage,
+        output_chars: int,
+        latency: float,
+        ttft: Optional[float],
+        cache_hit: bool,
+        status: str,
+    ) -> None:
+        if cache_hit:
+            input_tokens = output_tokens = 0
+            estimated = False
+        else:
+            estimated = usage.input_tokens is None or usage.output_tokens is None
+            input_tokens = usage.input_tokens
+            if input_tokens is None:
+                input_tokens = estimate_tokens("".join(m["content"] for m in messages))
+            output_tokens = usage.output_tokens
+            if output_tokens is None:
+                output_tokens = max(1, output_chars // 4) if output_chars else 0
+
+        generation_time = latency - (ttft or 0.0)
+        try:
+            record_call(
+                kind="llm",
+                stage=stage,
+                provider=self.model_config.provider,
+                model=self.model_config.name,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_input_tokens=None if cache_hit else usage.cached_input_tokens,
+                usage_estimated=int(estimated),
+                ttft=ttft,
+                latency=latency,
+                tokens_per_sec=output_tokens / generation_time if output_tokens and generation_time > 0 and not cache_hit else None,
+                cost=self.get_token_cost(input_tokens, output_tokens),
+                cache_hit=int(cache_hit),
+                status=status,
+            )
+        except Exception:
+            # Metrics must never fail the call they describe
+            logger.exception("Failed to record LLM call metrics")
+
+    @abstractmethod
+    async def _stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> AsyncGenerator[str, None]:
-        """Stream chat response"""
+        """Stream chat response from the provider, filling usage when the provider reports it"""
         pass
         
+    async def generate_structured_output(
+        self,
+        messages: List[Dict[str, str]],
+        response_model: type[T],
+        temperature: float = 0.0,
+        stage: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> T:
+        """Generate output constrained to response_model's JSON schema.
+
+        Providers use their native JSON-schema / JSON mode; near-valid JSON is
+        repaired before validation (utils.json_repair) rather than regenerated.
+        Admitted through the scheduler and recorded in utils.metrics like
+        stream_completion.
+        """
+        start = time.perf_counter()
+        usage = TokenUsage()
+        output_chars = 0
+        status = "error"
+        scheduler = get_scheduler(self.model_config)
+        estimated = estimate_tokens("".join(m["content"] for m in messages))
+        try:
+            for attempt in range(scheduler.limits.max_retries + 1):
+                usage.reset()
+                await scheduler.acquire(priority, estimated)
+                try:
+                    result = await run_on_io_loop(
+                        self._generate_structured_output(messages, response_model, temperature, usage)
+                    )
+                    break
+                except Exception as e:
+                    retry_after = rate_limit_retry_after(e)
+                    if retry_after is None or attempt == scheduler.limits.max_retries:
+                        raise
+                    logger.warning("%s rate limited, retrying in %.1fs", self.model_config.provider, retry_after)
+                    scheduler.backoff(retry_after)
+                finally:
+                    used = (usage.input_tokens or estimated) + (usage.output_tokens or 0)
+                    scheduler.release(max(0, used - estimated))
+            output_chars = len(result.model_dump_json())
+            status = "ok"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            self._record_metrics(
+                stage, messages, usage, output_chars, time.perf_counter() - start, None,
+                cache_hit=False, status=status,
+            )
+
     @abstractmethod
-    def generate_structured_output(
+    async def _generate_structured_output(
         self,
         messages: List[Dict[str, str]],
         response_model: type[T],
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> T:
-        """Generate structured output"""
+        """Generate structured output from the provider, filling usage when the provider reports it"""
         pass
 
+    @staticmethod
+    def _json_schema_format(response_model: type[T]) -> Dict[str, Any]:
+        """OpenAI-style response_format constraining decoding to response_model's schema
+
+        Strict mode (decoding guaranteed to match) is used when the schema allows it;
+        models with free-form fields (e.g. Dict arguments) or optional fields fall back
+        to best-effort json_schema.
+        """
+        schema = response_model.model_json_schema()
+        strict_schema = _strict_schema(schema)
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": response_model.__name__,
+                "schema": strict_schema if strict_schema is not None else schema,
+                "strict": strict_schema is not None,
+            },
+        }
+
+    @staticmethod
+    def _with_schema_instruction(messages: List[Dict[str, str]], response_model: type[T]) -> List[Dict[str, str]]:
+        """Prepend the JSON schema for providers that only offer an unconstrained JSON mode"""
+        schema = json.dumps(response_model.model_json_schema())
+        instruction = f"Respond only with a JSON object matching this JSON schema:\n{schema}"
+        return [{"role": "system", "content": instruction}] + messages
+
     def get_token_cost(self, input_tokens: int, output_tokens: int) -> float:
         """Calculate cost in USD per 1M tokens"""
         cost = self.model_config.cost
@@ -50,3 +333,41 @@ class LLMProvider(ABC, Generic[T]):
             (input_tokens * cost.input + output_tokens * cost.output) 
             / 1_000_000
         ) * settings.DOLLAR_TO_INR
+
+def _strict_schema(schema: Any) -> Optional[Any]:
+    """Copy of a JSON schema with additionalProperties closed on every object, or None
+    when strict mode can't express it (free-form objects or properties that aren't required)"""
+    if isinstance(schema, list):
+        items = [_strict_schema(item) for item in schema]
+        return None if any(item is None for item in items) else items
+    if not isinstance(schema, dict):
+        return schema
+    if schema.get("type") == "object":
+        properties = schema.get("properties")
+        if not properties or schema.get("additionalProperties", False) is not False:
+            return None
+        if set(schema.get("required", [])) != set(properties):
+            return None
+    strict = {}
+    for key, value in schema.items():
+        if key in ("properties", "$defs"):
+            converted = {name: _strict_schema(sub) for name, sub in value.items()}
+            if any(sub is None for sub in converted.values()):
+                return None
+            strict[key] = converted
+        elif key == "oneOf":
+            return None
+        elif key in ("items", "anyOf", "allOf"):
+            converted = _strict_schema(value)
+            if converted is None:
+                return None
+            strict[key] = converted
+        else:
+            strict[key] = value
+    if schema.get("type") == "object":
+        strict["additionalProperties"] = False
+    return strict
+
+async def _replay(chunks: List[str]) -> AsyncGenerator[str, None]:
+    for chunk in chunks:
+        yield chunk
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional
+from config import BaseLLMConfig, get_settings
+from utils.disk_cache import DiskLRUCache
+
+settings = get_settings()
+
+_cache: Optional[DiskLRUCache] = None
+_cache_lock = threading.Lock()
+
+def get_completion_cache() -> DiskLRUCache:
+    """Process-wide completion cache, opened lazily on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskLRUCache(
+                settings.LLM_CACHE_PATH,
+                max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                ttl=settings.LLM_CACHE_TTL_SECONDS,
+            )
+    return _cache
+
+def completion_cache_key(
+    model_config: BaseLLMConfig,
+    messages: List[Dict[str, str]],
+    temperature: float,
+) -> str:
+    """Cache key for a completion: provider, model, messages and temperature"""
+    payload = json.dumps(
+        {
+            "provider": model_config.provider.lower(),
+            "model": model_config.name,
+            "messages": messages,
+            "temperature": temperature,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def encode_chunks(chunks: List[str]) -> bytes:
+    return json.dumps(chunks, ensure_ascii=False).encode("utf-8")
+
+def decode_chunks(value: bytes) -> List[str]:
+    return json.loads(value.decode("utf-8"))
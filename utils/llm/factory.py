@@ -1,6 +1,7 @@
-from typing import Dict, Any
+import threading
+from typing import Dict, Optional, Tuple
 from .base import LLMProvider
-from .openai import OpenAIProvider 
+from .openai import OpenAIProvider
 from .groq import GroqProvider
 from .together_ai import TogetherAIProvider
 from .sambanova import SambaNovaProvider
@@ -8,8 +9,18 @@ from .gemini import GeminiProvider
 from config import BaseLLMConfig
 
 class LLMFactory:
+    # Long-lived providers keyed by (provider, model, api_key). Module state survives
+    # Streamlit reruns and provider I/O runs on one long-lived loop (utils.llm.io_loop),
+    # so clients and their keep-alive pools are reused across turns.
+    _providers: Dict[Tuple[str, str, str], LLMProvider] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _registry_key(model_config: BaseLLMConfig) -> Tuple[str, str, str]:
+        return (model_config.provider.lower(), model_config.name, model_config.api_key)
+
     @staticmethod
-    def create_provider(model_config: BaseLLMConfig) -> LLMProvider:
+    def _build_provider(model_config: BaseLLMConfig) -> LLMProvider:
         provider = model_config.provider.lower()
         if provider == 'openai':
             return OpenAIProvider(model_config)
@@ -23,3 +34,41 @@ class LLMFactory:
             return GeminiProvider(model_config)
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
+
+    @classmethod
+    def create_provider(cls, model_config: BaseLLMConfig) -> LLMProvider:
+        """Return the pooled provider for this config, creating it on first use"""
+        key = cls._registry_key(model_config)
+        with cls._lock:
+            provider = cls._providers.get(key)
+            if provider is None:
+                provider = cls._build_provider(model_config)
+                cls._providers[key] = provider
+        return provider
+
+    @classmethod
+    def refresh(cls, model_config: Optional[BaseLLMConfig] = None) -> None:
+        """Drop pooled providers so the next call builds fresh clients.
+
+        Use after rotating API keys or changing pool settings. Refreshes a single
+        provider when model_config is given, otherwise all of them. Dropped providers'
+        clients are closed in the background, failing any call still using them.
+        """
+        with cls._lock:
+            if model_config is None:
+                dropped = list(cls._providers.values())
+                cls._providers.clear()
+            else:
+                provider = cls._providers.pop(cls._registry_key(model_config), None)
+                dropped = [provider] if provider is not None else []
+        for provider in dropped:
+            provider.close_soon()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close every pooled provider's clients and empty the registry"""
+        with cls._lock:
+            providers = list(cls._providers.values())
+            cls._providers.clear()
+        for provider in providers:
+            await provider.aclose()
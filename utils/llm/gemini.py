@@ -1,43 +1,57 @@
 import openai
-from typing import Any, AsyncGenerator, Dict, List
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from .base import LLMProvider, T
-from config import BaseLLMConfig
+from utils.metrics import TokenUsage
+from utils.json_repair import parse_json_model
+from utils.http_pool import create_async_http_client
 
 class GeminiProvider(LLMProvider[T]):
-    def __init__(self, model_config: BaseLLMConfig) -> None:
-        super().__init__(model_config)
-        self.client = openai.OpenAI(
-            api_key=model_config.api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+    def _create_async_client(self) -> openai.AsyncOpenAI:
+        return openai.AsyncOpenAI(
+            api_key=self.model_config.api_key,
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            http_client=create_async_http_client(),
         )
 
-    async def stream_completion(
+    async def _stream_completion(
         self,
         messages: List[Dict[str, str]],
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        usage: Optional[TokenUsage] = None,
     ) -> AsyncGenerator[str, None]:
-        stream = self.client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_config.name,
             messages=messages,
             temperature=temperature,
             stream=True
         )
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
+        async for chunk in stream:
+            if chunk.usage and usage is not None:
+                usage.input_tokens = chunk.usage.prompt_tokens
+                usage.output_tokens = chunk.usage.completion_tokens
+                # tokens served from the automatic prompt cache
+                details = chunk.usage.prompt_tokens_details
+                usage.cached_input_tokens = details.cached_tokens if details else None
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
 
-    def generate_structured_output(
+    async def _generate_structured_output(
         self,
         messages: List[Dict[str, str]],
         response_model: type[T],
-        temperature: float = 0.7
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> T:
-        response = self.client.chat.completions.create(
+        response = await self.async_client.chat.completions.create(
             model=self.model_config.name,
             messages=messages,
             temperature=temperature,
-            # TODO: fix this.
-            response_format={"type": "json_object"},
-            response_model=response_model
+            response_format=self._json_schema_format(response_model),
         )
-        return response.choices[0].message.parsed
+        if response.usage and usage is not None:
+            usage.input_tokens = response.usage.prompt_tokens
+            usage.output_tokens = response.usage.completion_tokens
+            # tokens served from the automatic prompt cache
+            details = response.usage.prompt_tokens_details
+            usage.cached_input_tokens = details.cached_tokens if details else None
+        return parse_json_model(response.choices[0].message.content or "", response_model)
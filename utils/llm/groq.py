@@ -1,43 +1,53 @@
-import instructor
-from groq import Groq
-from typing import Any, AsyncGenerator, Dict, List
+from groq import AsyncGroq
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from .base import LLMProvider, T
-from config import BaseLLMConfig
+from utils.metrics import TokenUsage
+from utils.json_repair import parse_json_model
+from utils.http_pool import create_async_http_client
 
 class GroqProvider(LLMProvider[T]):
-    def __init__(self, model_config: BaseLLMConfig) -> None:
-        super().__init__(model_config)
-        self.raw_client = Groq(api_key=model_config.api_key)
-        self.structured_client = instructor.from_groq(
-            self.raw_client,
-            mode=instructor.Mode.JSON
+    def _create_async_client(self) -> AsyncGroq:
+        return AsyncGroq(
+            api_key=self.model_config.api_key,
+            http_client=create_async_http_client(),
         )
 
-    async def stream_completion(
+    async def _stream_completion(
         self,
         messages: List[Dict[str, str]],
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> AsyncGenerator[str, None]:
-        stream = self.raw_client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_config.name,
             messages=messages,
             temperature=temperature,
             stream=True
         )
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
+        async for chunk in stream:
+            # Groq reports usage on the final chunk under x_groq
+            chunk_usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None)
+            if chunk_usage and usage is not None:
+                usage.input_tokens = chunk_usage.prompt_tokens
+                usage.output_tokens = chunk_usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
 
-    def generate_structured_output(
+    async def _generate_structured_output(
         self,
         messages: List[Dict[str, str]],
         response_model: type[T],
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> T:
-        response = self.structured_client.chat.completions.create(
+        # Groq's JSON mode doesn't take a schema, so it goes in the prompt
+        response = await self.async_client.chat.completions.create(
             model=self.model_config.name,
-            messages=messages,
-            response_model=response_model,
-            temperature=temperature
+            messages=self._with_schema_instruction(messages, response_model),
+            temperature=temperature,
+            response_format={"type": "json_object"},
         )
-        return response
+        if response.usage and usage is not None:
+            usage.input_tokens = response.usage.prompt_tokens
+            usage.output_tokens = response.usage.completion_tokens
+        return parse_json_model(response.choices[0].message.content or "", response_model)
@@ -0,0 +1,91 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Optional, TypeVar
+
+R = TypeVar("R")
+
+# Provider I/O runs on one event loop in a daemon thread. Each Streamlit rerun calls
+# asyncio.run, and async HTTP connections are bound to the loop that opened them,
+# so keep-alive pools only survive reruns on a loop that outlives them.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+def get_io_loop() -> asyncio.AbstractEventLoop:
+    """The long-lived event loop provider clients live on, started on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-io-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+def _on_io_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is get_io_loop()
+    except RuntimeError:
+        return False
+
+def submit(coro: Awaitable[R]) -> "concurrent.futures.Future[R]":
+    """Schedule coro on the I/O loop from any thread, without waiting for it"""
+    return asyncio.run_coroutine_threadsafe(coro, get_io_loop())
+
+async def run_on_io_loop(coro: Awaitable[R]) -> R:
+    """Await coro on the I/O loop from another event loop; cancelling the caller cancels it"""
+    if _on_io_loop():
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
+
+async def stream_on_io_loop(stream: AsyncIterator[R]) -> AsyncGenerator[R, None]:
+    """
+    Iterate an async generator on the I/O loop, yielding its items on the calling loop
+
+    Closing (or cancelling) the returned generator cancels the source and waits until
+    it has closed, so whatever it fills in (e.g. usage) is final afterwards.
+    """
+    if _on_io_loop():
+        async for item in stream:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    io_loop = get_io_loop()
+    queue: "asyncio.Queue" = asyncio.Queue()
+    closed = asyncio.Event()
+    done = object()
+
+    async def produce() -> None:
+        try:
+            async for item in stream:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            loop.call_soon_threadsafe(queue.put_nowait, (None, done))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    # The task is created here rather than by run_coroutine_threadsafe so its done
+    # callback fires even when it is cancelled before it starts
+    started: "concurrent.futures.Future[asyncio.Task]" = concurrent.futures.Future()
+
+    def start() -> None:
+        task = io_loop.create_task(produce())
+        task.add_done_callback(lambda _: loop.call_soon_threadsafe(closed.set))
+        started.set_result(task)
+
+    io_loop.call_soon_threadsafe(start)
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is done:
+                return
+            if error is not None:
+                raise error
+            yield item
+    finally:
+        task = await asyncio.wrap_future(started)
+        io_loop.call_soon_threadsafe(task.cancel)
+        await closed.wait()
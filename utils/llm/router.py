@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import suppress
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+from config import BaseLLMConfig, get_settings
+from utils.metrics import ttft_percentile
+from .base import LLMProvider, StreamComplete, complete_stream
+from .factory import LLMFactory
+from .scheduler import Priority
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE = {
+    # hedge once the primary has not streamed a token by this percentile of its recent TTFT
+    "percentile": 0.95,
+    # below this many recorded calls the percentile is too noisy, use default_deadline
+    "min_samples": 20,
+    "default_deadline": 4.0,
+    "min_deadline": 0.5,
+    "max_deadline": 15.0,
+    # how long a computed deadline is reused before the metrics store is read again
+    "refresh_seconds": 60.0,
+}
+
+class CircuitBreaker:
+    """Stops routing to a provider after repeated failures.
+
+    Opens after failure_threshold consecutive failures; once cooldown seconds have
+    passed a single trial request is let through (half-open), which closes the
+    breaker on success or re-opens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; claims the trial slot when half-open"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a trial slot whose request was abandoned without an outcome"""
+        with self._lock:
+            self._trial_in_flight = False
+
+class LLMRouter:
+    """Routes a stage's completions across equivalent deployments of the same model.
+
+    The primary is tried first. If it has not streamed a token within the hedge
+    deadline (a percentile of its recent time to first token, read from
+    utils.metrics) a duplicate request goes to the next healthy fallback and
+    whichever streams first wins; the other request is cancelled. A provider
+    that errors before its first token is failed over immediately. Providers
+    whose circuit breaker is open are skipped.
+
+    Exposes the same stream_completion signature as LLMProvider.
+
+    Example:
+        >>> router = LLMRouter.from_stage_config(DEFAULT_CONFIGS["decision"])
+        >>> async for chunk in router.stream_completion(messages, 0.2, stage="decision"):
+        ...     print(chunk, end="")
+    """
+    # Breakers are shared by every router using the same deployment
+    _breakers: Dict[Tuple[str, str, str], CircuitBreaker] = {}
+    _breakers_lock = threading.Lock()
+
+    def __init__(
+        self,
+        model_configs: List[BaseLLMConfig],
+        hedge: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if not model_configs:
+            raise ValueError("LLMRouter needs at least one model config")
+        self.model_configs = model_configs
+        self.hedge = {**DEFAULT_HEDGE, **(hedge or {})}
+        self._deadlines: Dict[Tuple[str, str, Optional[str]], Tuple[float, float]] = {}
+
+    @classmethod
+    def from_stage_config(cls, stage_config: Dict[str, Any]) -> "LLMRouter":
+        """Build a router from a DEFAULT_CONFIGS entry and its optional "fallbacks" / "hedge" keys"""
+        model_configs = [settings.get_llm_config(stage_config["model"])]
+        for fallback in stage_config.get("fallbacks", []):
+            try:
+                model_configs.append(settings.get_llm_config(fallback["model"]))
+            except ValueError:
+                logger.warning("Fallback model %s is not configured, skipping it", fallback["model"])
+        return cls(model_configs, stage_config.get("hedge"))
+
+    @property
+    def model_config(self) -> BaseLLMConfig:
+        return self.model_configs[0]
+
+    @classmethod
+    def get_breaker(cls, model_config: BaseLLMConfig) -> CircuitBreaker:
+        key = LLMFactory._registry_key(model_config)
+        with cls._breakers_lock:
+            breaker = cls._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker()
+                cls._breakers[key] = breaker
+        return breaker
+
+    def hedge_deadline(self, model_config: BaseLLMConfig, stage: Optional[str] = None) -> float:
+        """Seconds to wait for a first token from model_config before hedging"""
+        key = (model_config.provider, model_config.name, stage)
+        now = time.monotonic()
+        cached = self._deadlines.get(key)
+        if cached is not None and now - cached[1] < self.hedge["refresh_seconds"]:
+            return cached[0]
+
+        deadline = self.hedge["default_deadline"]
+        try:
+            value, samples = ttft_percentile(model_config.provider, model_config.name, self.hedge["percentile"], stage)
+            if value is not None and samples >= self.hedge["min_samples"]:
+                deadline = value
+        except Exception:
+            logger.exception("Failed to read TTFT percentile, using the default hedge deadline")
+        deadline = min(max(deadline, self.hedge["min_deadline"]), self.hedge["max_deadline"])
+        self._deadlines[key] = (deadline, now)
+        return deadline
+
+    def _candidates(self) -> List[BaseLLMConfig]:
+        """Model configs whose breaker lets a request through, in priority order"""
+        candidates = [config for config in self.model_configs if self.get_breaker(config).allow()]
+        if not candidates:
+            # Everything is tripped: try the deployment that tripped longest ago rather than failing outright
+            candidates = [min(self.model_configs, key=lambda config: self.get_breaker(config).opened_at or 0.0)]
+        return candidates
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        cache: bool = False,
+        stage: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncGenerator[str, None]:
+        """Stream chat response from whichever healthy deployment produces a token first"""
+        pending = self._candidates()
+        # in-flight attempts: first-chunk task -> (config, stream)
+        attempts: Dict["asyncio.Task[str]", Tuple[BaseLLMConfig, AsyncIterator[str]]] = {}
+        winner: Optional[Tuple[BaseLLMConfig, AsyncIterator[str]]] = None
+        first_chunk: Optional[str] = None
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            config = pending.pop(0)
+            stream = LLMFactory.create_provider(config).stream_completion(
+                messages, temperature, cache=cache, stage=stage, priority=priority
+            )
+            attempts[asyncio.ensure_future(stream.__anext__())] = (config, stream)
+
+        try:
+            launch()
+            while attempts:
+                timeout = self.hedge_deadline(self._primary_of(attempts), stage) if pending else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("No first token within the hedge deadline, hedging to %s", pending[0].provider)
+                    launch()
+                    continue
+
+                for task in done:
+                    config, stream = attempts.pop(task)
+                    if task.exception() is None:
+                        winner, first_chunk = (config, stream), task.result()
+                        break
+                    if isinstance(task.exception(), StopAsyncIteration):
+                        # Empty but successful response
+                        winner = (config, stream)
+                        break
+                    last_error = task.exception()
+                    self.get_breaker(config).record_failure()
+                    logger.warning("%s failed before its first token: %r", config.provider, last_error)
+                if winner is not None:
+                    break
+                if not attempts and pending:
+                    launch()
+        finally:
+            await self._abandon(attempts)
+            for config in pending:
+                # never launched: hand back any half-open trial slot claimed in _candidates
+                self.get_breaker(config).release()
+
+        if winner is None:
+            raise last_error or RuntimeError("No LLM provider available")
+
+        config, stream = winner
+        breaker = self.get_breaker(config)
+        # A first token (or an empty response) counts as a success right away: consumers
+        # usually stop reading before the end, so waiting for it would never close the breaker
+        breaker.record_success()
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+        except StreamComplete:
+            # Pass the consumer's "answer complete" on, so the winner caches what it streamed
+            await complete_stream(stream)
+        except Exception:
+            breaker.record_failure()
+            raise
+        finally:
+            await stream.aclose()
+
+    def _primary_of(self, attempts: Dict[Any, Tuple[BaseLLMConfig, AsyncIterator[str]]]) -> BaseLLMConfig:
+        """Config of the most recently launched attempt, whose deadline governs the next hedge"""
+        return list(attempts.values())[-1][0]
+
+    async def _abandon(self, attempts: Dict["asyncio.Task[str]", Tuple[BaseLLMConfig, AsyncIterator[str]]]) -> None:
+        """Cancel losing attempts and close their streams"""
+        for task, (config, stream) in attempts.items():
+            task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+            with suppress(Exception):
+                await stream.aclose()
+            self.get_breaker(config).release()
+        attempts.clear()
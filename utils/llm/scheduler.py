@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+from config import BaseLLMConfig, RateLimitConfig
+
+class Priority(IntEnum):
+    """Scheduling class of an LLM call; lower values are admitted first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+class TokenBucket:
+    """Continuously refilling bucket of `capacity` units per minute"""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (requests larger than capacity wait for a full bucket)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def consume(self, amount: float, now: float) -> None:
+        """Take amount out of the bucket; may go negative when charging actual usage afterwards"""
+        self._refill(now)
+        self.level -= amount
+
+class ProviderScheduler:
+    """Admission control for one provider deployment.
+
+    Calls wait for a concurrency slot, a request token (requests/min) and their
+    estimated tokens (tokens/min) before being sent. Waiters are admitted by
+    priority, then arrival, so interactive calls always go ahead of queued
+    background calls, and background calls can never occupy the
+    reserved_interactive slots. A 429 pauses the whole deployment for its
+    retry-after.
+
+    State is guarded by a thread lock and waiters are woken on their own event
+    loop, so one scheduler is shared across Streamlit reruns.
+    """
+
+    def __init__(self, limits: RateLimitConfig) -> None:
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self.tokens = TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters: List[List] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _slots(self, priority: Priority) -> int:
+        if priority == Priority.INTERACTIVE:
+            return self.limits.max_concurrency
+        return max(1, self.limits.max_concurrency - self.limits.reserved_interactive)
+
+    def _admission_delay(self, priority: Priority, tokens: int, now: float) -> Optional[float]:
+        """0 if the call can start now, seconds to wait for quota, or None when waiting on a slot"""
+        if self.in_flight >= self._slots(priority):
+            return None
+        delay = max(0.0, self.blocked_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+
+    async def acquire(self, priority: Priority, tokens: int) -> None:
+        """Wait until the call may be sent, then take its slot and quota"""
+        loop = asyncio.get_running_loop()
+        # [priority, arrival, wake-up future]; only the head of the queue may be admitted
+        entry: List = [int(priority), next(self._counter), None]
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    delay = self._admission_delay(priority, tokens, now) if self._waiters[0] is entry else None
+                    if delay == 0.0:
+                        heapq.heappop(self._waiters)
+                        self.in_flight += 1
+                        if self.requests is not None:
+                            self.requests.consume(1, now)
+                        if self.tokens is not None:
+                            self.tokens.consume(tokens, now)
+                        self._wake_head()
+                        return
+                    entry[2] = loop.create_future()
+                # Sleep until quota refills, or until woken by a release / a new head of queue
+                try:
+                    await asyncio.wait_for(entry[2], timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._wake_head()
+            raise
+
+    def release(self, extra_tokens: int = 0) -> None:
+        """Free the call's slot, charging tokens used beyond the estimate taken at acquire"""
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens is not None and extra_tokens:
+                self.tokens.consume(extra_tokens, time.monotonic())
+            self._wake_head()
+
+    def backoff(self, retry_after: float) -> None:
+        """Pause admissions for the whole deployment after a 429"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def _wake_head(self) -> None:
+        if not self._waiters:
+            return
+        future = self._waiters[0][2]
+        if future is not None and not future.done():
+            future.get_loop().call_soon_threadsafe(_resolve, future)
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+_schedulers: Dict[Tuple[str, str, str], ProviderScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(model_config: BaseLLMConfig) -> ProviderScheduler:
+    """Shared scheduler for a deployment; without a rate_limit in its config only the default concurrency bound applies"""
+    key = (model_config.provider.lower(), model_config.name, model_config.api_key)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = ProviderScheduler(model_config.rate_limit or RateLimitConfig())
+            _schedulers[key] = scheduler
+    return scheduler
+
+def rate_limit_retry_after(exc: BaseException, default: float = 5.0) -> Optional[float]:
+    """Seconds to wait if exc is a provider 429, else None"""
+    status = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+    if status != 429:
+        return None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+    for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return float(str(value).rstrip("s"))
+        except ValueError:
+            continue
+    return default
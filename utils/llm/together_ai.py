@@ -1,42 +1,50 @@
-from together import Together
-from typing import Any, AsyncGenerator, Dict, List
+from together import AsyncTogether
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from .base import LLMProvider, T
-from config import BaseLLMConfig
+from utils.metrics import TokenUsage
+from utils.json_repair import parse_json_model
 
 class TogetherAIProvider(LLMProvider[T]):
-    def __init__(self, model_config: BaseLLMConfig) -> None:
-        super().__init__(model_config)
-        self.client = Together(
-            api_key=model_config.api_key,
+    def _create_async_client(self) -> AsyncTogether:
+        # Together's SDK manages its own aiohttp sessions and takes no pool settings
+        return AsyncTogether(
+            api_key=self.model_config.api_key,
         )
 
-    async def stream_completion(
+    async def _stream_completion(
         self,
         messages: List[Dict[str, str]],
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        usage: Optional[TokenUsage] = None,
     ) -> AsyncGenerator[str, None]:
-        stream = self.client.chat.completions.create(
+        stream = await self.async_client.chat.completions.create(
             model=self.model_config.name,
             messages=messages,
             temperature=temperature,
             stream=True
         )
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
+        async for chunk in stream:
+            if chunk.usage and usage is not None:
+                usage.input_tokens = chunk.usage.prompt_tokens
+                usage.output_tokens = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
                 yield chunk.choices[0].delta.content
 
-    def generate_structured_output(
+    async def _generate_structured_output(
         self,
         messages: List[Dict[str, str]],
         response_model: type[T],
-        temperature: float = 0.7
+        temperature: float = 0.0,
+        usage: Optional[TokenUsage] = None,
     ) -> T:
-        response = self.client.chat.completions.create(
+        # Together's JSON mode constrains decoding to the schema passed alongside it
+        response = await self.async_client.chat.completions.create(
             model=self.model_config.name,
-            messages=messages,
+            messages=self._with_schema_instruction(messages, response_model),
             temperature=temperature,
-            # TODO: fix this.
-            response_format={"type": "json_object"},
-            response_model=response_model
+            response_format={"type": "json_object", "schema": response_model.model_json_schema()},
         )
-        return response.choices[0].message.parsed
+        if response.usage and usage is not None:
+            usage.input_tokens = response.usage.prompt_tokens
+            usage.output_tokens = response.usage.completion_tokens
+        return parse_json_model(response.choices[0].message.content or "", response_model)
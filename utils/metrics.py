@@ -0,0 +1,181 @@
+"""Local store for per-call LLM and embedding metrics.
+
+Every stream_completion / get_embeddings call records tokens, latency and cost,
+tagged with the pipeline stage that made it.
+
+Usage:
+    poetry run python -m utils.metrics --by stage --since-hours 24
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from config import get_settings
+
+settings = get_settings()
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+COLUMNS = [
+    ("ts", "REAL NOT NULL"),
+    ("kind", "TEXT NOT NULL"),            # 'llm' or 'embedding'
+    ("stage", "TEXT"),
+    ("provider", "TEXT NOT NULL"),
+    ("model", "TEXT NOT NULL"),
+    ("input_tokens", "INTEGER"),
+    ("output_tokens", "INTEGER"),
+    ("cached_input_tokens", "INTEGER"),   # input tokens served from the provider's prompt cache, NULL if not reported
+    ("usage_estimated", "INTEGER NOT NULL DEFAULT 0"),
+    ("ttft", "REAL"),                     # seconds to first streamed chunk
+    ("latency", "REAL NOT NULL"),         # seconds for the whole call
+    ("tokens_per_sec", "REAL"),           # output tokens / generation time after first chunk
+    ("cost", "REAL"),                     # INR, see LLMProvider.get_token_cost
+    ("cache_hit", "INTEGER NOT NULL DEFAULT 0"),
+    ("status", "TEXT NOT NULL"),          # 'ok', 'closed' (consumer stopped early), 'cancelled', 'error'
+]
+
+class TokenUsage(BaseModel):
+    """Token counts for one call, filled in by the provider when it reports them"""
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None
+
+    def reset(self) -> None:
+        """Forget counts reported by an earlier attempt of a retried call"""
+        self.input_tokens = self.output_tokens = self.cached_input_tokens = None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for providers that don't report usage"""
+    return max(1, len(text) // 4) if text else 0
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(settings.METRICS_DB_PATH) or ".", exist_ok=True)
+        _conn = sqlite3.connect(settings.METRICS_DB_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(f"CREATE TABLE IF NOT EXISTS calls ({', '.join(f'{name} {kind}' for name, kind in COLUMNS)})")
+        _conn.execute("CREATE INDEX IF NOT EXISTS ix_calls_ts ON calls (ts)")
+        # Databases created before a column was added get it on open
+        existing = {row[1] for row in _conn.execute("PRAGMA table_info(calls)")}
+        for name, kind in COLUMNS:
+            if name not in existing:
+                _conn.execute(f"ALTER TABLE calls ADD COLUMN {name} {kind}")
+    return _conn
+
+def record_call(**fields: Any) -> None:
+    """Persist one call's metrics; unknown fields are rejected, missing ones take the column default"""
+    unknown = set(fields) - {name for name, _ in COLUMNS}
+    if unknown:
+        raise ValueError(f"Unknown metric fields: {sorted(unknown)}")
+    fields.setdefault("ts", time.time())
+    names = list(fields)
+    placeholders = ", ".join("?" for _ in names)
+    with _lock:
+        _get_conn().execute(
+            f"INSERT INTO calls ({', '.join(names)}) VALUES ({placeholders})",
+            [fields[name] for name in names],
+        )
+
+def query(where: str = "1 = 1", params: tuple = ()) -> List[Dict[str, Any]]:
+    """Return raw call rows matching an SQL where clause"""
+    with _lock:
+        cursor = _get_conn().execute(f"SELECT * FROM calls WHERE {where} ORDER BY ts", params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def ttft_percentile(
+    provider: str,
+    model: str,
+    q: float = 0.95,
+    stage: Optional[str] = None,
+    window: int = 200,
+) -> Tuple[Optional[float], int]:
+    """Percentile of time to first token over the most recent successful uncached calls.
+
+    Returns (percentile, samples); percentile is None when nothing has been recorded.
+    """
+    where = "kind = 'llm' AND provider = ? AND model = ? AND cache_hit = 0 AND ttft IS NOT NULL AND status != 'error'"
+    params: List[Any] = [provider, model]
+    if stage is not None:
+        where += " AND stage = ?"
+        params.append(stage)
+    with _lock:
+        rows = _get_conn().execute(
+            f"SELECT ttft FROM calls WHERE {where} ORDER BY ts DESC LIMIT ?", (*params, window)
+        ).fetchall()
+    ttfts = [row[0] for row in rows]
+    return _percentile(ttfts, q), len(ttfts)
+
+def summarize(by: str = "stage", since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Aggregate calls per stage / model / provider / kind, slowest total latency first"""
+    if by not in ("stage", "model", "provider", "kind"):
+        raise ValueError(f"Cannot group metrics by {by}")
+    rows = query("ts >= ?", (since or 0,))
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(row[by], []).append(row)
+
+    summary = []
+    for key, calls in groups.items():
+        latencies = [c["latency"] for c in calls]
+        ttfts = [c["ttft"] for c in calls if c["ttft"] is not None]
+        speeds = [c["tokens_per_sec"] for c in calls if c["tokens_per_sec"]]
+        # only calls whose provider reports prompt caching count towards the hit rate
+        cache_reported = [c for c in calls if c["cached_input_tokens"] is not None and c["input_tokens"]]
+        summary.append({
+            by: key,
+            "calls": len(calls),
+            "cache_hits": sum(c["cache_hit"] for c in calls),
+            "errors": sum(c["status"] == "error" for c in calls),
+            "input_tokens": sum(c["input_tokens"] or 0 for c in calls),
+            "output_tokens": sum(c["output_tokens"] or 0 for c in calls),
+            "cost": sum(c["cost"] or 0 for c in calls),
+            "total_latency": sum(latencies),
+            "latency_p50": _percentile(latencies, 0.5),
+            "latency_p95": _percentile(latencies, 0.95),
+            "ttft_p50": _percentile(ttfts, 0.5),
+            "ttft_p95": _percentile(ttfts, 0.95),
+            "tokens_per_sec_p50": _percentile(speeds, 0.5),
+            "prefix_cache_hit_rate": (
+                sum(c["cached_input_tokens"] for c in cache_reported) / sum(c["input_tokens"] for c in cache_reported)
+                if cache_reported else None
+            ),
+        })
+    return sorted(summary, key=lambda s: s["total_latency"], reverse=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--by", default="stage", choices=["stage", "model", "provider", "kind"])
+    parser.add_argument("--since-hours", type=float, default=None)
+    args = parser.parse_args()
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    summary = summarize(args.by, since)
+    if not summary:
+        print("No calls recorded")
+        return
+
+    def fmt(value: Any) -> str:
+        if value is None:
+            return "-"
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    headers = list(summary[0].keys())
+    table = [headers] + [[fmt(row[h]) for h in headers] for row in summary]
+    widths = [max(len(row[i]) for row in table) for i in range(len(headers))]
+    for row in table:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from pymilvus import connections
 from config import get_settings
-from .migrations import create_collection_if_not_exists
+from .migrations import create_collection_if_not_exists, get_vector_format
+from .index_manager import IndexManager
+from .write_buffer import WriteBuffer
 
 settings = get_settings()
 
@@ -13,3 +15,13 @@ connections.connect(
 
 # Run migrations and get collection
 collection = create_collection_if_not_exists()
+
+# Storage format of the collection in use (may predate the current MILVUS_VECTOR_TYPE)
+vector_type, vector_dim, metric_type = get_vector_format(collection)
+
+# Keeps the index type and search params matched to the collection size. Not checked here:
+# a rebuild makes the collection unsearchable, so it only starts from the periodic check on writes
+index_manager = IndexManager(collection, vector_type, metric_type, settings.MILVUS_TARGET_RECALL)
+
+# Inserts / upserts are batched; searches sync it first and read with Session consistency
+write_buffer = WriteBuffer(collection, settings.MILVUS_WRITE_BUFFER_ROWS, settings.MILVUS_WRITE_BUFFER_SECONDS)
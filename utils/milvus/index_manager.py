@@ -0,0 +1,222 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from pymilvus import Collection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_POLICY = {
+    # exact search is cheapest below this many entities
+    "flat_max": 20_000,
+    # graph index from this many entities (float32 / float16 only)
+    "hnsw_min": 1_000_000,
+    # switch back down only once the count is this fraction below a threshold
+    "hysteresis": 0.2,
+    # rebuild an IVF index once the ideal nlist is this many times off the built one
+    "nlist_factor": 4,
+    "hnsw_m": 16,
+    "hnsw_ef_construction": 200,
+    # how often the entity count is re-read to decide on a rebuild
+    "check_interval": 300.0,
+    # how long a search waits for a rebuild to finish before failing with IndexRebuildingError
+    "search_timeout": 5.0,
+}
+
+# Share of IVF lists probed / HNSW ef per target recall (first row whose recall is >= target)
+RECALL_TUNING = [
+    (0.90, {"probe_fraction": 0.02, "ef": 64}),
+    (0.95, {"probe_fraction": 0.05, "ef": 128}),
+    (0.99, {"probe_fraction": 0.12, "ef": 256}),
+    (1.00, {"probe_fraction": 1.00, "ef": 512}),
+]
+
+def plan_index(
+    entity_count: int,
+    vector_type: str,
+    metric_type: str,
+    current_type: Optional[str] = None,
+    policy: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Index params suited to a collection of entity_count vectors
+
+    FLAT (exact) for small collections, IVF with nlist ~ 4 * sqrt(n) in between and
+    HNSW for large float collections. int8 collections always use IVF_SQ8 (their
+    quantization lives in the index) and binary ones BIN_FLAT / BIN_IVF_FLAT.
+    Thresholds come with hysteresis around current_type so a collection near a
+    boundary doesn't flip back and forth.
+    """
+    policy = {**DEFAULT_INDEX_POLICY, **(policy or {})}
+    lower = 1.0 - policy["hysteresis"]
+    flat_max = policy["flat_max"] * (lower if current_type not in (None, "FLAT", "BIN_FLAT") else 1.0)
+    hnsw_min = policy["hnsw_min"] * (lower if current_type == "HNSW" else 1.0)
+    nlist = int(min(65536, max(16, 2 ** round(math.log2(4 * math.sqrt(max(entity_count, 1)))))))
+
+    if vector_type == "int8":
+        return {"metric_type": metric_type, "index_type": "IVF_SQ8", "params": {"nlist": nlist}}
+    if vector_type == "binary":
+        if entity_count <= flat_max:
+            return {"metric_type": metric_type, "index_type": "BIN_FLAT", "params": {}}
+        return {"metric_type": metric_type, "index_type": "BIN_IVF_FLAT", "params": {"nlist": nlist}}
+    if entity_count <= flat_max:
+        return {"metric_type": metric_type, "index_type": "FLAT", "params": {}}
+    if entity_count >= hnsw_min:
+        return {
+            "metric_type": metric_type,
+            "index_type": "HNSW",
+            "params": {"M": policy["hnsw_m"], "efConstruction": policy["hnsw_ef_construction"]},
+        }
+    return {"metric_type": metric_type, "index_type": "IVF_FLAT", "params": {"nlist": nlist}}
+
+def search_params_for(index: Dict[str, Any], target_recall: float, limit: int) -> Dict[str, Any]:
+    """nprobe / ef giving roughly target_recall on the given index"""
+    tuning = next(values for recall, values in RECALL_TUNING if recall >= min(target_recall, 1.0))
+    if "nlist" in index["params"]:
+        nlist = index["params"]["nlist"]
+        return {"nprobe": max(1, min(nlist, math.ceil(nlist * tuning["probe_fraction"])))}
+    if index["index_type"] == "HNSW":
+        # ef below the number of requested hits is rejected
+        return {"ef": max(limit, tuning["ef"])}
+    return {}
+
+class IndexRebuildingError(TimeoutError):
+    """A search gave up waiting for an index rebuild to finish"""
+
+class IndexManager:
+    """Keeps a collection's vector index matched to its size.
+
+    The entity count is re-read at most every check_interval seconds; when
+    plan_index picks a different index, or an IVF nlist is far off, the index is
+    rebuilt on a background thread. Searches take search_params() for the index
+    currently built and run inside searching().
+
+    The collection is unsearchable for the whole rebuild: it is released and the
+    new index is built before it is loaded again, which takes minutes for a large
+    HNSW index. Rebuilds are rare (only when the size crosses a threshold), and
+    searches during one wait at most search_timeout seconds, then raise
+    IndexRebuildingError instead of hanging the caller.
+
+    Example:
+        >>> manager = IndexManager(collection, "float32", "IP", target_recall=0.95)
+        >>> with manager.searching():
+        ...     collection.search(data, "embedding", {"metric_type": "IP", "params": manager.search_params(10)}, 10)
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        vector_type: str,
+        metric_type: str,
+        target_recall: float = 0.95,
+        policy: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.collection = collection
+        self.vector_type = vector_type
+        self.metric_type = metric_type
+        self.target_recall = target_recall
+        self.policy = {**DEFAULT_INDEX_POLICY, **(policy or {})}
+        self.index = self._built_index()
+        self._checked_at = 0.0
+        self._rebuilding = False
+        self._state_lock = threading.Lock()
+        # held by searches (shared) and by a rebuild while the index is unavailable (exclusive)
+        self._readers = 0
+        self._readers_done = threading.Condition(self._state_lock)
+        self._swap = threading.Lock()
+
+    def _built_index(self) -> Dict[str, Any]:
+        if not self.collection.indexes:
+            return {"metric_type": self.metric_type, "index_type": "FLAT", "params": {}}
+        info = self.collection.indexes[0].params
+        # Build params come nested under "params" or, from some servers, flattened
+        build = info.get("params") or {key: info[key] for key in ("nlist", "M", "efConstruction") if key in info}
+        return {
+            "metric_type": info.get("metric_type", self.metric_type),
+            "index_type": info["index_type"],
+            "params": {key: int(value) for key, value in build.items()},
+        }
+
+    def search_params(self, limit: int) -> Dict[str, Any]:
+        """Search-time params (nprobe / ef) for the current index"""
+        return search_params_for(self.index, self.target_recall, limit)
+
+    @contextmanager
+    def searching(self) -> Iterator[None]:
+        if not self._swap.acquire(timeout=self.policy["search_timeout"]):
+            raise IndexRebuildingError(
+                f"Milvus index rebuild still running after waiting {self.policy['search_timeout']}s"
+            )
+        try:
+            with self._state_lock:
+                self._readers += 1
+        finally:
+            self._swap.release()
+        try:
+            yield
+        finally:
+            with self._state_lock:
+                self._readers -= 1
+                self._readers_done.notify_all()
+
+    def maybe_rebuild(self, force: bool = False) -> bool:
+        """Start a background rebuild if the collection outgrew its index; returns whether one started"""
+        now = time.monotonic()
+        with self._state_lock:
+            if self._rebuilding or (not force and now - self._checked_at < self.policy["check_interval"]):
+                return False
+            self._checked_at = now
+
+        # num_entities only covers flushed segments, and nothing flushes on writes any more
+        with self.searching():
+            rows = self.collection.query(expr="", output_fields=["count(*)"], consistency_level="Session")
+        count = rows[0]["count(*)"]
+        plan = plan_index(count, self.vector_type, self.metric_type, self.index["index_type"], self.policy)
+        if not self._needs_rebuild(plan):
+            return False
+
+        with self._state_lock:
+            if self._rebuilding:
+                return False
+            self._rebuilding = True
+        logger.info(
+            "Rebuilding Milvus index %s -> %s %s at %d entities",
+            self.index["index_type"], plan["index_type"], plan["params"], count,
+        )
+        threading.Thread(target=self._rebuild, args=(plan,), name="milvus-index-rebuild", daemon=True).start()
+        return True
+
+    def _needs_rebuild(self, plan: Dict[str, Any]) -> bool:
+        if plan["index_type"] != self.index["index_type"]:
+            return True
+        built, wanted = self.index["params"].get("nlist"), plan["params"].get("nlist")
+        if built and wanted:
+            return max(built, wanted) / min(built, wanted) >= self.policy["nlist_factor"]
+        return False
+
+    def _rebuild(self, plan: Dict[str, Any]) -> None:
+        try:
+            # Block new searches and wait for running ones before the index goes away
+            with self._swap:
+                with self._state_lock:
+                    while self._readers:
+                        self._readers_done.wait()
+                self.collection.release()
+                self.collection.drop_index()
+                self.collection.create_index(field_name="embedding", index_params=plan)
+                self.collection.load()
+                self.index = plan
+        except Exception:
+            logger.exception("Milvus index rebuild failed, keeping %s", self.index["index_type"])
+            # The old index may be gone: make sure the collection is searchable again
+            try:
+                if not self.collection.indexes:
+                    self.collection.create_index(field_name="embedding", index_params=self.index)
+                self.collection.load()
+            except Exception:
+                logger.exception("Failed to restore the Milvus index")
+        finally:
+            with self._state_lock:
+                self._rebuilding = False
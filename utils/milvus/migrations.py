@@ -1,8 +1,21 @@
 from pymilvus import Collection, CollectionSchema, FieldSchema, DataType, MilvusClient
 from config import get_settings
+from utils.vector_quantization import check_vector_type
+from .index_manager import plan_index
 
 settings = get_settings()
 
+# Per storage format (see utils.vector_quantization.VECTOR_TYPES): field type and metric.
+# Vectors are normalised before insert, so inner product is cosine similarity without
+# the extra normalisation COSINE does at search time. The index itself follows the
+# collection size (see index_manager.plan_index).
+VECTOR_FIELDS = {
+    "float32": (DataType.FLOAT_VECTOR, "IP"),
+    "float16": (DataType.FLOAT16_VECTOR, "IP"),
+    "int8": (DataType.FLOAT_VECTOR, "IP"),
+    "binary": (DataType.BINARY_VECTOR, "HAMMING"),
+}
+
 def create_collection_if_not_exists() -> Collection:
     """Create Milvus collection and index if they don't exist.
 
@@ -10,13 +23,20 @@ def create_collection_if_not_exists() -> Collection:
         | Field      | Type           | Description                      |
         |------------|----------------|----------------------------------|
         | node_id    | str            | Unique identifier for each node  |
-        | embedding  | float[emd_dim] | Vector representation of content |
+        | embedding  | vector[n_dim]  | Vector representation of content |
+
+    The vector type and index follow MILVUS_VECTOR_TYPE. An existing collection
+    keeps the format it was created with.
     """
+    vector_type = settings.MILVUS_VECTOR_TYPE
+    n_dim = settings.embedding_model.n_dim
+    check_vector_type(vector_type, n_dim)
+    dtype, metric_type = VECTOR_FIELDS[vector_type]
 
     # Define collection schema
     fields = [
         FieldSchema(name="node_id", dtype=DataType.VARCHAR, max_length=200, is_primary=True),
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.embedding_model.n_dim)
+        FieldSchema(name="embedding", dtype=dtype, dim=n_dim)
     ]
 
     schema = CollectionSchema(
@@ -32,21 +52,31 @@ def create_collection_if_not_exists() -> Collection:
         collection = Collection(
             name=settings.MILVUS_COLLECTION,
             schema=schema,
-            using='default'
+            using='default',
+            # Other clients may lag slightly; this process reads its own writes with Session
+            consistency_level='Bounded'
         )
 
-        # Create index for vector field
-        index_params = {
-            "metric_type": "COSINE",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 1024}
-        }
+        # Create index for vector field (an empty collection starts on the small-collection index)
         collection.create_index(
             field_name="embedding",
-            index_params=index_params
+            index_params=plan_index(0, vector_type, metric_type)
         )
 
         collection.load()
         return collection
 
     return Collection(settings.MILVUS_COLLECTION)
+
+def get_vector_format(collection: Collection) -> tuple:
+    """(vector type, dimension, metric) the collection was actually created with"""
+    field = next(field for field in collection.schema.fields if field.name == "embedding")
+    dim = field.params["dim"]
+    metric = collection.indexes[0].params["metric_type"] if collection.indexes else "COSINE"
+    if field.dtype == DataType.BINARY_VECTOR:
+        return "binary", dim, metric
+    if field.dtype == DataType.FLOAT16_VECTOR:
+        return "float16", dim, metric
+    if collection.indexes and collection.indexes[0].params.get("index_type") == "IVF_SQ8":
+        return "int8", dim, metric
+    return "float32", dim, metric
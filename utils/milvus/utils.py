@@ -1,5 +1,12 @@
-from typing import Dict, List
-from .base import collection
+import json
+from typing import Dict, List, Optional, Tuple
+from config import get_settings
+from .base import collection, index_manager, write_buffer, vector_type, vector_dim, metric_type
+from utils.vector_quantization import (
+    decode, encode, hamming_to_similarity, normalize, rerank_similarity, similarity_to_hamming,
+)
+
+settings = get_settings()
 
 def search_relevent_nodes_by_embeddings(
     embeddings: List[List[float]], 
@@ -10,7 +17,11 @@ def search_relevent_nodes_by_embeddings(
     """Search for relevant nodes by embeddings using cosine similarity.
 
     This function searches through a vector database to find the most similar nodes
-    based on the input embeddings vector.
+    based on the input embeddings vector. Vectors are normalised and converted to
+    the collection's storage format. The threshold is applied by Milvus as a range
+    search and only node IDs are transferred; a plain top-k search runs only when
+    fewer than min_top_k nodes pass it. With MILVUS_RERANK_CANDIDATES set, the top
+    candidates are re-scored at full precision before the threshold is applied.
 
     Args:
         embeddings (List[List[float]]): Input embeddings vector to search against
@@ -35,41 +46,156 @@ def search_relevent_nodes_by_embeddings(
         {'node_123': 0.8, 'node_456': 0.7, 'node_789': 0.6}
     """
 
-    # Search parameters
-    search_params = {
-        "metric_type": "COSINE",
-        "params": {"nprobe": 10},
-    }
-
-    # Search collection
-    results = collection.search(
-        data=embeddings,
-        anns_field="embedding",
-        param=search_params,
-        # limit=max_top_k,
-        limit=1000,
-        expr=None,
-        output_fields=["node_id"]
-    )
+    # Read-your-writes: send pending inserts / upserts before searching
+    write_buffer.sync()
+    data = encode(embeddings, vector_type)
+    rerank_candidates = settings.MILVUS_RERANK_CANDIDATES
+
+    if rerank_candidates > 0:
+        # Approximate scores don't match the threshold scale: fetch a fixed
+        # candidate pool and threshold the re-ranked scores instead
+        hits = _search(data, limit=max(rerank_candidates, min_top_k))
+        scored = _rerank(embeddings[0], [hit.id for hit in hits])
+    else:
+        scored = _range_search(data, threshold)
+        if len(scored) < min_top_k:
+            # Too few nodes above the threshold: take the nearest ones regardless
+            hits = _search(data, limit=min_top_k)
+            scored += [(hit.id, _similarity(hit.distance)) for hit in hits]
 
     # Filter by threshold and return node IDs with scores
     matches = {}
-    for hit in results[0]:
+    for node_id, score in scored:
         # Add to matches if similarity score exceeds threshold
-        if hit.score >= threshold:
-            matches[hit.entity.get("node_id")] = hit.score
+        if score >= threshold:
+            matches[node_id] = score
         # if max_top_k != -1 and len(matches) >= max_top_k:
         #     break
 
     # Ensure minimum results
     if len(matches) < min_top_k:
-        for hit in results[0][:min_top_k]:
-            node_id = hit.entity.get("node_id")
-            if node_id not in matches:
-                matches[node_id] = hit.score
+        for node_id, score in sorted(scored, key=lambda item: item[1], reverse=True):
+            if len(matches) >= min_top_k:
+                break
+            matches.setdefault(node_id, score)
 
     return matches
 
+def search_nodes_multi_query(
+    embeddings: List[List[float]],
+    top_k: int = 20,
+) -> List[List[Tuple[str, float]]]:
+    """Search several query vectors in a single Milvus request (nq > 1).
+
+    Args:
+        embeddings (List[List[float]]): One vector per query
+        top_k (int, optional): Hits kept per query. Defaults to 20.
+
+    Returns:
+        List[List[Tuple[str, float]]]: For each query, in input order, its
+            (node ID, similarity) hits ordered by decreasing similarity.
+
+    Example:
+        >>> search_nodes_multi_query([[0.1, 0.2], [0.3, 0.1]], top_k=2)
+        [[('node_123', 0.8), ('node_456', 0.7)], [('node_456', 0.9), ('node_789', 0.6)]]
+    """
+    if not embeddings:
+        return []
+    write_buffer.sync()
+    with index_manager.searching():
+        results = collection.search(
+            data=encode(embeddings, vector_type),
+            anns_field="embedding",
+            param={"metric_type": metric_type, "params": index_manager.search_params(top_k)},
+            limit=top_k,
+            expr=None,
+            output_fields=[],
+            consistency_level="Session",
+        )
+    return [[(hit.id, _similarity(hit.distance)) for hit in hits] for hits in results]
+
+# Upper bound on hits returned by one range search (the old fixed search limit)
+MAX_RANGE_LIMIT = 1000
+# Range search limit to start from; grows to the largest result size seen so far
+_range_limit = 32
+
+def _search(data: List, limit: int, params: Optional[Dict] = None):
+    """Top-`limit` hits for one query vector; only primary keys come back (`hit.id`)"""
+    with index_manager.searching():
+        results = collection.search(
+            data=data,
+            anns_field="embedding",
+            param={
+                "metric_type": metric_type,
+                "params": {**index_manager.search_params(limit), **(params or {})},
+            },
+            limit=limit,
+            expr=None,
+            output_fields=[],
+            consistency_level="Session",
+        )
+    return results[0]
+
+def _range_search(data: List, threshold: float) -> List[Tuple[str, float]]:
+    """Nodes scoring at least threshold, filtered by Milvus (radius / range_filter)
+
+    The limit starts at the size of the largest result seen so far and is
+    doubled only when a search comes back full, up to MAX_RANGE_LIMIT.
+    """
+    global _range_limit
+    if metric_type == "HAMMING":
+        # Distances, smaller is closer: keep range_filter <= distance < radius
+        params = {"radius": _hamming_radius(threshold), "range_filter": 0}
+    else:
+        # Similarities: keep radius < score <= range_filter
+        params = {"radius": threshold - 1e-6, "range_filter": 1.0 + 1e-6}
+
+    limit = _range_limit
+    while True:
+        hits = _search(data, limit, params)
+        if len(hits) < limit or limit >= MAX_RANGE_LIMIT:
+            break
+        limit = min(limit * 2, MAX_RANGE_LIMIT)
+    _range_limit = max(_range_limit, limit)
+    return [(hit.id, _similarity(hit.distance)) for hit in hits]
+
+def _hamming_radius(threshold: float) -> int:
+    """Exclusive Hamming distance bound equivalent to a similarity threshold"""
+    return int(similarity_to_hamming(threshold, vector_dim)) + 1
+
+def _similarity(score: float) -> float:
+    """Search score as a similarity, higher is closer"""
+    if metric_type == "HAMMING":
+        return hamming_to_similarity(score, vector_dim)
+    return score
+
+def _rerank(embedding: List[float], node_ids: List[str]) -> List[Tuple[str, float]]:
+    """Re-score candidates against their stored vectors, best first
+
+    The query keeps full precision. int8 collections store the raw float32 vector
+    next to the SQ8 index, so their re-rank is exact; float16 is within about 1e-3
+    of it. Binary scores the query against the sign vector, which sits below the
+    true cosine by a near-constant factor; rerank_similarity scales it back, so the
+    same thresholds apply to every format (binary scores stay estimates).
+    """
+    if not node_ids:
+        return []
+    with index_manager.searching():
+        rows = collection.query(
+            expr=f"node_id in {json.dumps(node_ids)}",
+            output_fields=["node_id", "embedding"],
+            consistency_level="Session",
+        )
+    if not rows:
+        return []
+    vectors = decode([row["embedding"] for row in rows], vector_type, vector_dim)
+    scores = rerank_similarity(vectors @ normalize([embedding])[0], vector_type)
+    return sorted(
+        ((row["node_id"], float(score)) for row, score in zip(rows, scores)),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
 def insert_node(node_id: str, embeddings: List[List[float]]) -> None:
     """Insert a node into the database.
 
@@ -87,19 +213,41 @@ def insert_node(node_id: str, embeddings: List[List[float]]) -> None:
         >>> embeddings = [0.1, 0.2, 0.3, 0.4]
         >>> insert_node(node_id, embeddings)
     """
-    # Insert node into collection
-    collection.insert([
-        {
-            "node_id": node_id,
-            "embedding": embeddings[0]
-        }
+    # Queue the insert, it's sent with the next batch
+    write_buffer.insert({
+        "node_id": node_id,
+        "embedding": encode(embeddings, vector_type)[0]
+    })
+    # Growing past a size threshold switches the index in the background
+    index_manager.maybe_rebuild()
+
+def insert_nodes(node_ids: List[str], embeddings: List[List[float]]) -> None:
+    """Insert several nodes into the database in one request.
+
+    Args:
+        node_ids (List[str]): Unique identifiers of the nodes.
+        embeddings (List[List[float]]): One vector per node, in the order of node_ids.
+
+    Returns:
+        None
+
+    Example:
+        >>> insert_nodes(['node_123', 'node_456'], [[0.1, 0.2], [0.3, 0.4]])
+    """
+    if not node_ids:
+        return
+    vectors = encode(embeddings, vector_type)
+    write_buffer.insert_many([
+        {"node_id": node_id, "embedding": vector}
+        for node_id, vector in zip(node_ids, vectors)
     ])
+    index_manager.maybe_rebuild()
 
 def update_embeddings(node_id: str, embeddings: List[List[float]]) -> None:
     """Update a node's embeddings in the database.
 
-    This function updates the embeddings of an existing node in the vector database
-    and ensures the index is properly updated.
+    This function updates the embeddings of an existing node in the vector database.
+    The write is buffered (see WriteBuffer) and visible to the next search.
 
     Args:
         node_id (str): Unique identifier for the node.
@@ -113,17 +261,11 @@ def update_embeddings(node_id: str, embeddings: List[List[float]]) -> None:
     #     {"node_id": node_id},
     #     {"embedding": embeddings}
     # )
-    collection.upsert(
-        [
-            {
-                "node_id": node_id,
-                "embedding": embeddings[0]
-            }
-        ]
-    )
-    
-    # Ensure changes are persisted and index is updated
-    refresh_collection()
+    # Queued like inserts: no flush / reload per update, searches sync the buffer first
+    write_buffer.upsert({
+        "node_id": node_id,
+        "embedding": encode(embeddings, vector_type)[0]
+    })
 
 def clear_all_nodes() -> None:
     """Clear all nodes from the database.
@@ -137,6 +279,7 @@ def clear_all_nodes() -> None:
         >>> clear_all_nodes()
     """
     try:
+        write_buffer.discard()
         # Delete all entries where node_id exists (all entries)
         collection.delete("node_id != ''")
         # Ensure changes are persisted
@@ -146,11 +289,13 @@ def clear_all_nodes() -> None:
         raise
 
 def get_node_count() -> int:
-    """Get total number of nodes in Milvus"""
-    refresh_collection()
-    return collection.num_entities
+    """Get total number of nodes in Milvus, including unflushed writes, without flushing"""
+    write_buffer.sync()
+    with index_manager.searching():
+        rows = collection.query(expr="", output_fields=["count(*)"], consistency_level="Session")
+    return rows[0]["count(*)"]
 
 def refresh_collection() -> None:
-    """Refresh collection to apply changes"""
+    """Send buffered writes and seal them into segments (only needed for durability, not visibility)"""
+    write_buffer.sync()
     collection.flush()
-    collection.load()
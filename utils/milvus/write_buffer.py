@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from pymilvus import Collection
+
+logger = logging.getLogger(__name__)
+
+class WriteBuffer:
+    """Batches inserts and upserts to a Milvus collection.
+
+    Rows are held in memory and sent in one insert / upsert request once
+    max_rows are pending, max_seconds after the first pending row, or on an
+    explicit sync(). Later writes to the same node replace earlier pending ones.
+    Nothing here flushes (seals) segments or reloads the collection: sent rows
+    are readable straight away by searches run with Session consistency.
+
+    Call sync() before reading so the reader sees its own writes.
+
+    Example:
+        >>> buffer = WriteBuffer(collection, max_rows=256, max_seconds=1.0)
+        >>> buffer.upsert({"node_id": "node_123", "embedding": [0.1, 0.2]})
+        >>> buffer.sync()
+    """
+
+    def __init__(self, collection: Collection, max_rows: int = 256, max_seconds: float = 1.0) -> None:
+        self.collection = collection
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        # node_id -> ("insert" | "upsert", row)
+        self._pending: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # one send at a time, so writes reach Milvus in order
+        self._send_lock = threading.Lock()
+        atexit.register(self.sync)
+
+    def insert(self, row: Dict[str, Any]) -> None:
+        self._add("insert", [row])
+
+    def insert_many(self, rows: List[Dict[str, Any]]) -> None:
+        """Queue several inserts at once; they go out in the same request"""
+        self._add("insert", rows)
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        self._add("upsert", [row])
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _add(self, op: str, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for row in rows:
+                previous = self._pending.get(row["node_id"])
+                # Not sent yet, so still a new node
+                row_op = "insert" if previous is not None and previous[0] == "insert" else op
+                self._pending[row["node_id"]] = (row_op, row)
+            full = len(self._pending) >= self.max_rows
+            if not full:
+                self._arm_timer()
+        if full:
+            self.sync()
+
+    def _arm_timer(self) -> None:
+        """Schedule a background sync max_seconds from now, unless one is already due (caller holds _lock)"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_seconds, self._sync_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def sync(self) -> None:
+        """Send every pending write to Milvus now"""
+        with self._send_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+
+            for op in ("insert", "upsert"):
+                batch = {node_id: write for node_id, write in pending.items() if write[0] == op}
+                if not batch:
+                    continue
+                try:
+                    getattr(self.collection, op)([row for _, row in batch.values()])
+                except Exception:
+                    with self._lock:
+                        # Put back only what wasn't accepted yet, behind anything written since:
+                        # re-sending an accepted insert would duplicate the node (no primary key dedupe)
+                        for node_id, write in pending.items():
+                            self._pending.setdefault(node_id, write)
+                    raise
+                for node_id in batch:
+                    del pending[node_id]
+
+    def discard(self) -> None:
+        """Drop pending writes without sending them"""
+        with self._lock:
+            self._pending.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _sync_in_background(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.sync()
+        except Exception:
+            logger.exception("Failed to send buffered Milvus writes, retrying in %.1fs", self.max_seconds)
+            with self._lock:
+                if self._pending:
+                    self._arm_timer()
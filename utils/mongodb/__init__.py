@@ -1,6 +1,7 @@
 from .utils import (
     get_n_hop_neighbors,
     make_edge,
+    make_edges,
     get_adjacency_list,
     delete_adjacency_list,
 )
@@ -8,6 +9,7 @@ from .utils import (
 __all__ = [
     "get_n_hop_neighbors",
     "make_edge",
+    "make_edges",
     "get_adjacency_list",
     "delete_adjacency_list"
 ]
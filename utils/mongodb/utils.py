@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from .base import collection
 
 DOC_ID = "32f7543c-cf51-49f1-8163-93652e26a695"
@@ -38,6 +38,44 @@ def make_edge(
         upsert=True  # Create document if it doesn't exist
     )
 
+def make_edges(
+    edges: List[Tuple[str, str]],
+    doc_id: str = DOC_ID,
+) -> None:
+    """Add several undirected edges to the adjacency list in a single update.
+
+    All edges live in the same adjacency list document, so they are merged into
+    one `$addToSet` / `$each` per node and written in one round trip.
+
+    Args:
+        edges (List[Tuple[str, str]]): (node1_id, node2_id) pairs.
+        doc_id (str): ID of the document.
+
+    Returns:
+        None
+
+    Example:
+        >>> make_edges([('node_123', 'node_456'), ('node_123', 'node_789')])
+    """
+    neighbors: Dict[str, List[str]] = {}
+    for node1_id, node2_id in edges:
+        neighbors.setdefault(node1_id, []).append(node2_id)
+        neighbors.setdefault(node2_id, []).append(node1_id)
+    if not neighbors:
+        return
+
+    collection.update_one(
+        {"_id": doc_id},
+        {
+            "$set": {"_id": doc_id},  # Ensures document exists
+            "$addToSet": {
+                f"adjacency_list.{node_id}": {"$each": list(dict.fromkeys(ids))}
+                for node_id, ids in neighbors.items()
+            }
+        },
+        upsert=True  # Create document if it doesn't exist
+    )
+
 # def delete_edge(
 #     doc_id: str,
 #     node1_id: str,
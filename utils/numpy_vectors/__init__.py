@@ -0,0 +1,19 @@
+from .utils import (
+    search_relevent_nodes_by_embeddings,
+    search_nodes_multi_query,
+    insert_node,
+    insert_nodes,
+    clear_all_nodes,
+    get_node_count,
+    update_embeddings
+)
+
+__all__ = [
+    "search_relevent_nodes_by_embeddings",
+    "search_nodes_multi_query",
+    "insert_node",
+    "insert_nodes",
+    "clear_all_nodes",
+    "get_node_count",
+    "update_embeddings"
+]
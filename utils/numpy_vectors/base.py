@@ -0,0 +1,11 @@
+from config import get_settings
+from .store import NumpyVectorStore
+
+settings = get_settings()
+
+# Memory-mapped vector matrix, searched in process
+store = NumpyVectorStore(
+    settings.NUMPY_VECTORS_PATH,
+    settings.embedding_model.n_dim,
+    settings.NUMPY_VECTORS_DTYPE,
+)
@@ -0,0 +1,236 @@
+import atexit
+import os
+import threading
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from numpy.lib.format import open_memmap
+from utils.vector_quantization import normalize
+
+# Storage formats of the vector matrix (normalised on write, scored in float32)
+DTYPES = ("float32", "float16")
+
+class NumpyVectorStore:
+    """Brute-force vector search over a memory-mapped matrix, in process.
+
+    Vectors are L2-normalised on write and kept, one row per node, in
+    `<path>/vectors.npy` (float32 or float16) with a parallel `alive.npy` mask and
+    the node ids in `ids.txt` (line i is row i). Appends go to the end of the
+    matrix, which doubles in capacity when full; updates overwrite the row in
+    place; deletes only clear the alive flag (a tombstone) and the matrix is
+    compacted once tombstones make up more than compact_fraction of the rows.
+    Search is one matrix-vector product followed by argpartition for the top k.
+
+    Thread safe within one process. Only one process should write to a path.
+
+    Example:
+        >>> store = NumpyVectorStore("data/vectors", dim=768, dtype="float16")
+        >>> store.add(["node_123"], [[0.1] * 768])
+        >>> store.search([[0.1] * 768], k=5)
+        [[('node_123', 1.0)]]
+    """
+
+    # Rows converted to float32 at a time when scoring a float16 matrix
+    SCORE_CHUNK = 4096
+
+    def __init__(
+        self,
+        path: str,
+        dim: int,
+        dtype: str = "float32",
+        initial_capacity: int = 1024,
+        compact_fraction: float = 0.25,
+    ) -> None:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r}, expected one of {', '.join(DTYPES)}")
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.initial_capacity = initial_capacity
+        self.compact_fraction = compact_fraction
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        atexit.register(self.flush)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.npy")
+
+    @property
+    def _alive_path(self) -> str:
+        return os.path.join(self.path, "alive.npy")
+
+    @property
+    def _ids_path(self) -> str:
+        return os.path.join(self.path, "ids.txt")
+
+    def _load(self) -> None:
+        if not os.path.exists(self._vectors_path):
+            self._create(self.initial_capacity)
+            return
+        self._vectors = open_memmap(self._vectors_path, mode="r+")
+        if self._vectors.shape[1] != self.dim or self._vectors.dtype != self.dtype:
+            raise ValueError(
+                f"Vector store at {self.path} holds {self._vectors.dtype} vectors of dimension "
+                f"{self._vectors.shape[1]}, expected {self.dtype} of dimension {self.dim}"
+            )
+        self._alive = open_memmap(self._alive_path, mode="r+")
+        with open(self._ids_path, "r", encoding="utf-8") as f:
+            self._ids: List[str] = f.read().splitlines()
+        # A row is only written once its id is on disk; rows past the last id are ignored
+        self._alive[len(self._ids):] = False
+        self._rows: Dict[str, int] = {
+            node_id: row for row, node_id in enumerate(self._ids) if self._alive[row]
+        }
+        self._ids_file = open(self._ids_path, "a", encoding="utf-8")
+
+    def _create(self, capacity: int) -> None:
+        self._vectors = open_memmap(self._vectors_path, mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+        self._alive = open_memmap(self._alive_path, mode="w+", dtype=np.bool_, shape=(capacity,))
+        self._ids = []
+        self._rows = {}
+        self._ids_file = open(self._ids_path, "w", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._ids) - len(self._rows)
+
+    def add(self, node_ids: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """Insert nodes, or overwrite the vectors of ids already stored"""
+        if not len(node_ids):
+            return
+        vectors = normalize(embeddings).astype(self.dtype)
+        with self._lock:
+            appended: Dict[str, np.ndarray] = {}
+            for node_id, vector in zip(node_ids, vectors):
+                row = self._rows.get(node_id)
+                if row is None:
+                    # An id repeated within the batch keeps its last vector
+                    appended[node_id] = vector
+                else:
+                    self._vectors[row] = vector
+            if not appended:
+                return
+            new_ids = list(appended.items())
+
+            start = len(self._ids)
+            self._reserve(start + len(new_ids))
+            self._vectors[start:start + len(new_ids)] = np.stack([vector for _, vector in new_ids])
+            self._ids_file.write("".join(f"{node_id}\n" for node_id, _ in new_ids))
+            self._ids_file.flush()
+            for offset, (node_id, _) in enumerate(new_ids):
+                self._ids.append(node_id)
+                self._rows[node_id] = start + offset
+            self._alive[start:start + len(new_ids)] = True
+
+    def delete(self, node_ids: Sequence[str]) -> None:
+        """Tombstone nodes; their rows are reclaimed by the next compaction"""
+        with self._lock:
+            for node_id in node_ids:
+                row = self._rows.pop(node_id, None)
+                if row is not None:
+                    self._alive[row] = False
+            if self._ids and self.tombstones > self.compact_fraction * len(self._ids):
+                self.compact()
+
+    def clear(self) -> None:
+        """Remove every node and shrink the files back to the initial capacity"""
+        with self._lock:
+            self._close()
+            self._create(self.initial_capacity)
+
+    def search(self, embeddings: Sequence[Sequence[float]], k: int) -> List[List[Tuple[str, float]]]:
+        """Top-k (node ID, cosine similarity) per query, best first"""
+        with self._lock:
+            scores = self._scores(embeddings)
+            k = min(k, len(self._rows))
+            if k <= 0:
+                return [[] for _ in range(len(scores))]
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            return [self._ranked(row_scores, rows) for row_scores, rows in zip(scores, top)]
+
+    def search_threshold(
+        self, embedding: Sequence[float], threshold: float, min_k: int = 0
+    ) -> List[Tuple[str, float]]:
+        """Every node scoring at least threshold, and at least the min_k best, best first"""
+        with self._lock:
+            scores = self._scores([embedding])[0]
+            rows = np.flatnonzero(scores >= threshold)
+            k = min(min_k, len(self._rows))
+            if len(rows) < k:
+                rows = np.argpartition(-scores, k - 1)[:k]
+            return self._ranked(scores, rows)
+
+    def _scores(self, embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        """(n_queries, n_rows) cosine similarities, -inf for tombstoned rows"""
+        queries = normalize(embeddings)
+        n = len(self._ids)
+        scores = np.empty((len(queries), n), dtype=np.float32)
+        if self.dtype == np.float32:
+            np.matmul(queries, self._vectors[:n].T, out=scores)
+        else:
+            # No BLAS for float16: upcast a chunk of rows at a time
+            for start in range(0, n, self.SCORE_CHUNK):
+                chunk = self._vectors[start:min(start + self.SCORE_CHUNK, n)].astype(np.float32)
+                scores[:, start:start + len(chunk)] = queries @ chunk.T
+        scores[:, ~self._alive[:n]] = -np.inf
+        return scores
+
+    def _ranked(self, scores: np.ndarray, rows: np.ndarray) -> List[Tuple[str, float]]:
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [(self._ids[row], float(scores[row])) for row in rows if np.isfinite(scores[row])]
+
+    def _reserve(self, size: int) -> None:
+        """Grow the matrix (doubling) so it holds at least size rows"""
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        self._rewrite(np.arange(len(self._ids)), capacity)
+
+    def compact(self) -> None:
+        """Rewrite the files without tombstoned rows"""
+        with self._lock:
+            live = np.flatnonzero(self._alive[:len(self._ids)])
+            capacity = self.initial_capacity
+            while capacity < len(live):
+                capacity *= 2
+            self._rewrite(live, capacity)
+
+    def _rewrite(self, rows: np.ndarray, capacity: int) -> None:
+        """Copy rows into new files of the given capacity and swap them in"""
+        vectors = open_memmap(self._vectors_path + ".tmp", mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+        alive = open_memmap(self._alive_path + ".tmp", mode="w+", dtype=np.bool_, shape=(capacity,))
+        vectors[:len(rows)] = self._vectors[rows]
+        alive[:len(rows)] = self._alive[rows]
+        ids = [self._ids[row] for row in rows]
+        with open(self._ids_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("".join(f"{node_id}\n" for node_id in ids))
+        vectors.flush()
+        alive.flush()
+
+        self._close()
+        # Not atomic across the three files: a crash here can leave them out of step
+        os.replace(self._vectors_path + ".tmp", self._vectors_path)
+        os.replace(self._alive_path + ".tmp", self._alive_path)
+        os.replace(self._ids_path + ".tmp", self._ids_path)
+        self._vectors, self._alive = vectors, alive
+        self._ids = ids
+        self._rows = {node_id: row for row, node_id in enumerate(ids) if alive[row]}
+        self._ids_file = open(self._ids_path, "a", encoding="utf-8")
+
+    def flush(self) -> None:
+        """Write dirty pages of the memory maps back to disk"""
+        with self._lock:
+            self._vectors.flush()
+            self._alive.flush()
+
+    def _close(self) -> None:
+        self.flush()
+        self._ids_file.close()
+        # Drop the maps so the files can be replaced
+        del self._vectors, self._alive
@@ -0,0 +1,90 @@
+from typing import Dict, List, Tuple
+from .base import store
+
+def search_relevent_nodes_by_embeddings(
+    embeddings: List[List[float]],
+    min_top_k: int = 5,
+    threshold: float = 0.75
+) -> Dict[str, float]:
+    """Search for relevant nodes by embeddings using cosine similarity.
+
+    Same contract as utils.milvus: every node scoring at least threshold, and at
+    least the min_top_k nearest ones, ordered by decreasing similarity. Scores are
+    exact (brute force over all stored vectors).
+
+    Args:
+        embeddings (List[List[float]]): Input embeddings vector to search against
+        min_top_k (int, optional): Minimum number of results to return. Defaults to 5.
+        threshold (float, optional): Similarity threshold to filter results. Defaults to 0.75.
+
+    Returns:
+        Dict[str, float]: Node IDs with their similarity scores.
+
+    Example:
+        >>> search_relevent_nodes_by_embeddings([[0.1, 0.2, 0.3, 0.4]])
+        {'node_123': 0.8, 'node_456': 0.7, 'node_789': 0.6}
+    """
+    return dict(store.search_threshold(embeddings[0], threshold, min_top_k))
+
+def search_nodes_multi_query(
+    embeddings: List[List[float]],
+    top_k: int = 20,
+) -> List[List[Tuple[str, float]]]:
+    """Search several query vectors in one matrix product.
+
+    Args:
+        embeddings (List[List[float]]): One vector per query
+        top_k (int, optional): Hits kept per query. Defaults to 20.
+
+    Returns:
+        List[List[Tuple[str, float]]]: For each query, in input order, its
+            (node ID, similarity) hits ordered by decreasing similarity.
+    """
+    if not embeddings:
+        return []
+    return store.search(embeddings, top_k)
+
+def insert_node(node_id: str, embeddings: List[List[float]]) -> None:
+    """Insert a node into the vector store.
+
+    Args:
+        node_id (str): Unique identifier for the node.
+        embeddings (List[List[float]]): Vector representation of the node content.
+
+    Example:
+        >>> insert_node('node_123', [[0.1, 0.2, 0.3, 0.4]])
+    """
+    store.add([node_id], embeddings[:1])
+
+def insert_nodes(node_ids: List[str], embeddings: List[List[float]]) -> None:
+    """Insert several nodes into the vector store at once.
+
+    Args:
+        node_ids (List[str]): Unique identifiers of the nodes.
+        embeddings (List[List[float]]): One vector per node, in the order of node_ids.
+
+    Example:
+        >>> insert_nodes(['node_123', 'node_456'], [[0.1, 0.2], [0.3, 0.4]])
+    """
+    store.add(node_ids, embeddings)
+
+def update_embeddings(node_id: str, embeddings: List[List[float]]) -> None:
+    """Overwrite a node's vector in place.
+
+    Args:
+        node_id (str): Unique identifier for the node.
+        embeddings (List[List[float]]): New vector representation of the node content.
+    """
+    store.add([node_id], embeddings[:1])
+
+def clear_all_nodes() -> None:
+    """Clear all nodes from the vector store.
+
+    Example:
+        >>> clear_all_nodes()
+    """
+    store.clear()
+
+def get_node_count() -> int:
+    """Get the number of live (not tombstoned) nodes"""
+    return len(store)
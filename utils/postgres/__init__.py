@@ -1,17 +1,25 @@
 from .utils import (
     get_memory_details,
+    get_memories_by_ids,
     insert_memory,
+    insert_memories,
     clear_all_nodes,
     get_node_count,
     update_memory,
-    get_all_nodes
+    get_all_nodes,
+    n_gram_search,
+    keyword_search
 )
 
 __all__ = [
     "get_memory_details",
+    "get_memories_by_ids",
     "insert_memory",
+    "insert_memories",
     "clear_all_nodes",
     "get_node_count",
     "update_memory",
-    "get_all_nodes"
+    "get_all_nodes",
+    "n_gram_search",
+    "keyword_search"
 ]
@@ -5,7 +5,10 @@ from sqlalchemy import (
     UniqueConstraint,
     ForeignKeyConstraint,
     DateTime,
+    Computed,
+    Index,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 # from sqlalchemy.orm import relationship
 from .base import DatabaseBase
 
@@ -25,12 +28,16 @@ class NodesDb(DatabaseBase):
     id = Column(String, index=True)
     text = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), nullable=False)
+    # Generated by Postgres from text, for full-text keyword search
+    text_tsv = Column(TSVECTOR, Computed("to_tsvector('english', text)", persisted=True))
 
     # tags = relationship("TagsDb", secondary='nodes_tags')
 
     __table_args__ = (
         PrimaryKeyConstraint('id'),
         UniqueConstraint('text'),
+        Index('ix_nodes_text_tsv', 'text_tsv', postgresql_using='gin'),
+        Index('ix_nodes_text_trgm', 'text', postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'}),
     )
 
 class NodesTagsDb(DatabaseBase):
@@ -1,4 +1,6 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text as sql_text, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from .base import get_db
 from .schemas import NodesDb, TagsDb, NodesTagsDb
@@ -49,6 +51,40 @@ def get_memory_details(
         created_at=str(node.created_at)
     )
 
+def get_memories_by_ids(
+    node_ids: List[str],
+) -> List[Memory]:
+    """Get the details of several memories in a single query.
+    
+    Args:
+        node_ids (List[str]): IDs of the memories.
+    
+    Returns:
+        List[Memory]: Memories in the order of node_ids, skipping IDs that don't exist.
+    
+    Example:
+        >>> get_memories_by_ids(['node_123', 'node_456'])
+    """
+    if not node_ids:
+        return []
+    db: Session = next(get_db())
+    
+    nodes = (
+        db.query(NodesDb)
+        .filter(NodesDb.id.in_(node_ids))
+        .all()
+    )
+    by_id = {node.id: node for node in nodes}
+    return [
+        Memory(
+            id=by_id[node_id].id,
+            content=by_id[node_id].text,
+            created_at=str(by_id[node_id].created_at)
+        )
+        for node_id in node_ids
+        if node_id in by_id
+    ]
+
 def insert_memory(
     text: str,
 ) -> str:
@@ -86,6 +122,58 @@ def insert_memory(
 
     return node.id
 
+def insert_memories(
+    texts: List[str],
+    updates: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Insert several memory nodes in a single statement.
+    
+    Texts already stored (the text column is unique) are skipped instead of
+    failing the whole batch, as are repeats within texts. Updates to existing
+    memories are applied first, in the same transaction, so a run's inserts
+    and updates are committed or rolled back together.
+    
+    Args:
+        texts (List[str]): Texts of the memories.
+        updates (Dict[str, str], optional): New text of existing memory nodes, by ID.
+    
+    Returns:
+        Dict[str, str]: ID of each newly inserted memory node, by text, in the order of texts.
+    
+    Example:
+        >>> insert_memories(['User likes tea.', 'User lives in Pune.'], {'node_123': 'User likes coffee.'})
+        {'User likes tea.': '8b1f...', 'User lives in Pune.': '2c0e...'}
+    """
+    texts = list(dict.fromkeys(texts))
+    if not texts and not updates:
+        return {}
+    # Get database session
+    db: Session = next(get_db())
+    
+    created_at = datetime.now(timezone.utc)
+    try:
+        if updates:
+            # One executemany UPDATE by primary key
+            db.execute(update(NodesDb), [{"id": node_id, "text": text} for node_id, text in updates.items()])
+        inserted = {}
+        if texts:
+            statement = (
+                insert(NodesDb)
+                .values([
+                    {"id": str(uuid.uuid4()), "text": text, "created_at": created_at}
+                    for text in texts
+                ])
+                .on_conflict_do_nothing(index_elements=["text"])
+                .returning(NodesDb.id, NodesDb.text)
+            )
+            inserted = {row.text: row.id for row in db.execute(statement)}
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    return {text: inserted[text] for text in texts if text in inserted}
+
 def clear_all_nodes() -> None:
     """Clear all nodes from the database.
     
@@ -171,12 +259,64 @@ def n_gram_search(
     
     return [
         Memory(
+            id=memory.id,
             content=memory.text,
-            created_at=memory.created_at
+            created_at=str(memory.created_at)
         )
         for memory in memories
     ]
 
+def keyword_search(
+    keywords: List[str],
+    limit: int = 20,
+    fuzzy_weight: float = 0.5,
+) -> List[Tuple[str, float]]:
+    """Search memories by keywords in a single indexed query.
+    
+    Memories matching any keyword through full-text search (the GIN-indexed
+    `text_tsv` column) or fuzzy trigram word similarity (the pg_trgm index,
+    which catches misspelt names) are ranked by ts_rank_cd with document
+    length normalisation, plus fuzzy_weight times the best word similarity.
+    
+    Args:
+        keywords (List[str]): Keywords or short phrases, e.g. the generator's bm25_keywords.
+        limit (int): Maximum number of results.
+        fuzzy_weight (float): Weight of the trigram similarity in the score.
+    
+    Returns:
+        List[Tuple[str, float]]: (memory ID, score) pairs, best first.
+    
+    Example:
+        >>> keyword_search(['sister', 'birthday'])
+        [('node_123', 0.83), ('node_456', 0.31)]
+    """
+    keywords = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip()))
+    if not keywords:
+        return []
+
+    params = {
+        # Each keyword is a quoted phrase, any of them may match
+        "query": " OR ".join(f'"{keyword.replace(chr(34), " ")}"' for keyword in keywords),
+        "limit": limit,
+        "fuzzy_weight": fuzzy_weight,
+    }
+    params.update({f"keyword_{i}": keyword for i, keyword in enumerate(keywords)})
+    fuzzy_match = " OR ".join(f":keyword_{i} <% text" for i in range(len(keywords)))
+    fuzzy_score = ", ".join(f"word_similarity(:keyword_{i}, text)" for i in range(len(keywords)))
+
+    db: Session = next(get_db())
+    rows = db.execute(
+        sql_text(f"""
+            SELECT id, ts_rank_cd(text_tsv, query, 1) + :fuzzy_weight * GREATEST({fuzzy_score}) AS score
+            FROM nodes, websearch_to_tsquery('english', :query) AS query
+            WHERE text_tsv @@ query OR {fuzzy_match}
+            ORDER BY score DESC
+            LIMIT :limit
+        """),
+        params,
+    ).all()
+    return [(row.id, float(row.score)) for row in rows]
+
 def get_all_nodes() -> List[NodesDb]:
     """Get all nodes from PostgreSQL database.
     
@@ -1,24 +1,100 @@
+import functools
 import os
 import re
-from jinja2 import Environment, FileSystemLoader
-
-def process_prompt_md(file_path: str, **kwargs) -> str:
-    # Set up Jinja environment using directory of markdown file
-    template_dir = os.path.dirname(file_path)
-    env = Environment(loader=FileSystemLoader(template_dir))
-    
-    # Get template name from file path
-    template_name = os.path.basename(file_path)
-    
-    # Load and render template with variables
-    template = env.get_template(template_name)
-    content = template.render(**kwargs)
-    
+import threading
+from typing import Dict, Iterable, List
+from jinja2 import Environment, FileSystemLoader, Template
+
+# Template variables that change on every call. A template whose layout allows it can
+# pass these as volatile_keys (or its caller wrap the values with volatile()) to have
+# the lines rendering them moved to the end of the prompt, so the static text (and the
+# memories after it) form a stable prefix that providers can serve from their prompt cache.
+VOLATILE_KEYS = ("day", "date", "time")
+
+# Private-use characters marking volatile values in the rendered text
+_VOLATILE_START = "\ue000"
+_VOLATILE_END = "\ue001"
+_VOLATILE_VALUE = re.compile(f"{_VOLATILE_START}(.*?){_VOLATILE_END}", flags=re.DOTALL)
+
+_COMMENT = re.compile(r'<!--(.*?)-->\n', flags=re.DOTALL)
+_EXTRA_NEWLINES = re.compile(r'\n{3,}')
+
+_environments: Dict[str, Environment] = {}
+_templates: Dict[str, Template] = {}
+_lock = threading.Lock()
+
+def get_template(file_path: str) -> Template:
+    """
+    Compile a markdown prompt template once and reuse it for the life of the process
+
+    Templates are not reloaded when the file changes.
+    """
+    file_path = os.path.abspath(file_path)
+    template = _templates.get(file_path)
+    if template is not None:
+        return template
+
+    with _lock:
+        template = _templates.get(file_path)
+        if template is None:
+            # One environment per prompt directory, so {% include %} keeps working
+            template_dir = os.path.dirname(file_path)
+            env = _environments.get(template_dir)
+            if env is None:
+                env = Environment(loader=FileSystemLoader(template_dir), auto_reload=False)
+                _environments[template_dir] = env
+
+            template = env.get_template(os.path.basename(file_path))
+            _templates[file_path] = template
+    return template
+
+def volatile(value: object) -> str:
+    """Mark a template value as changing on every call (see process_prompt_md)"""
+    return f"{_VOLATILE_START}{value}{_VOLATILE_END}"
+
+def _move_volatile_to_tail(content: str) -> str:
+    if _VOLATILE_START not in content:
+        return content
+    static_lines, volatile_lines = [], []
+    for line in content.split("\n"):
+        (volatile_lines if _VOLATILE_START in line else static_lines).append(line)
+    return "\n".join(static_lines).rstrip() + "\n\n" + "\n".join(volatile_lines)
+
+@functools.lru_cache(maxsize=256)
+def _postprocess(content: str) -> str:
     # Remove commented out code
-    content = re.sub(r'<!--(.*?)-->\n', '', content, flags=re.DOTALL)
-    
-    # Replace multiple newlines
-    while '\n\n\n' in content:
-        content = content.replace('\n\n\n', '\n\n')
-        
-    return content.strip()
+    content = _COMMENT.sub("", content)
+    content = _move_volatile_to_tail(content)
+    return _EXTRA_NEWLINES.sub("\n\n", content).strip()
+
+def process_prompt_md(file_path: str, volatile_keys: Iterable[str] = (), **kwargs) -> str:
+    """
+    Render a markdown prompt template
+
+    By default the template's own order is kept. A template laid out for provider
+    prefix caching can pass volatile_keys (e.g. VOLATILE_KEYS), or its caller wrap
+    values with volatile(): lines that render any of them are moved, in order, to the
+    end of the prompt, giving static text -> semi-static content such as memories ->
+    volatile tail. Only opt in when those lines stand on their own (no heading or
+    label above them) and the values are rendered as-is, as they are wrapped in
+    marker characters before rendering.
+
+    Comment stripping and newline collapsing run once per distinct text around the
+    volatile values, so a prompt whose other inputs repeat is only post-processed once.
+    """
+    for key in set(volatile_keys) & kwargs.keys():
+        kwargs[key] = volatile(kwargs[key])
+
+    content = get_template(file_path).render(**kwargs)
+
+    # Swap volatile values for numbered placeholders so the text to post-process repeats
+    values: List[str] = []
+
+    def hold(match: "re.Match[str]") -> str:
+        values.append(match.group(1))
+        return volatile(len(values) - 1)
+
+    content = _postprocess(_VOLATILE_VALUE.sub(hold, content))
+    if not values:
+        return content
+    return _VOLATILE_VALUE.sub(lambda match: values[int(match.group(1))], content)
@@ -0,0 +1,65 @@
+import logging
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple
+from utils.metrics import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Used for models tiktoken doesn't know (non-OpenAI models count within a few percent of it)
+DEFAULT_ENCODING = "o200k_base"
+
+@lru_cache(maxsize=32)
+def _get_encoder(model: Optional[str]) -> Optional[Callable[[str], list]]:
+    try:
+        import tiktoken
+    except ImportError:
+        # Cached, so this is logged once per model
+        logger.warning(
+            "tiktoken is not installed, token budgets fall back to a ~4 characters per token estimate"
+        )
+        return None
+    try:
+        encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except KeyError:
+        encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    return encoding.encode_ordinary
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Number of tokens text takes for model
+
+    Uses tiktoken (a project dependency). If it is missing from the environment a
+    warning is logged and the ~4 characters per token estimate is used instead.
+    """
+    if not text:
+        return 0
+    encode = _get_encoder(model)
+    if encode is None:
+        return estimate_tokens(text)
+    return len(encode(text))
+
+def fit_to_budget(
+    texts: Iterable[str],
+    budget_tokens: int,
+    model: Optional[str] = None,
+    separator_tokens: int = 2,
+) -> Tuple[List[str], int]:
+    """
+    Greedily keep texts, in the given (best first) order, while they fit in budget_tokens
+
+    A text too long for what is left is skipped and shorter ones after it are still
+    considered. separator_tokens accounts for the bullet / newline each text gets in
+    the prompt. Returns the kept texts and the tokens they use.
+
+    Example:
+        >>> fit_to_budget(["User lives in Pune.", "User likes tea."], budget_tokens=8)
+        (['User lives in Pune.'], 6)  # with the fallback estimate
+    """
+    kept, used = [], 0
+    for text in texts:
+        tokens = count_tokens(text, model) + separator_tokens
+        if used + tokens > budget_tokens:
+            continue
+        kept.append(text)
+        used += tokens
+    return kept, used
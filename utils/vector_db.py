@@ -0,0 +1,24 @@
+"""Vector backend selected by VECTOR_BACKEND.
+
+    milvus  utils.milvus, a Milvus server (ANN indexes, scales to millions of vectors)
+    numpy   utils.numpy_vectors, brute force over a memory-mapped matrix in process
+            (no network round trip, exact scores; suited to up to ~100k vectors)
+
+Both expose the same functions, so callers use `from utils import vector_db`.
+"""
+from config import get_settings
+
+settings = get_settings()
+
+VECTOR_BACKENDS = ("milvus", "numpy")
+
+if settings.VECTOR_BACKEND == "milvus":
+    from utils.milvus import *
+    from utils.milvus import __all__
+elif settings.VECTOR_BACKEND == "numpy":
+    from utils.numpy_vectors import *
+    from utils.numpy_vectors import __all__
+else:
+    raise ValueError(
+        f"Unknown VECTOR_BACKEND {settings.VECTOR_BACKEND!r}, expected one of {', '.join(VECTOR_BACKENDS)}"
+    )
@@ -0,0 +1,81 @@
+import math
+from typing import Any, List, Sequence
+import numpy as np
+
+# Vector storage formats selectable with MILVUS_VECTOR_TYPE:
+#   float32 - FLOAT_VECTOR                        4 bytes / dim
+#   float16 - FLOAT16_VECTOR                      2 bytes / dim
+#   int8    - FLOAT_VECTOR, IVF_SQ8 index         1 byte / dim in the loaded index,
+#             raw float32 kept on disk (and used for the re-rank)
+#   binary  - BINARY_VECTOR (sign bits), HAMMING  1 bit / dim
+VECTOR_TYPES = ("float32", "float16", "int8", "binary")
+
+# For unit vectors with roughly Gaussian coordinates, q . sign(x) / sqrt(dim) averages
+# sqrt(2 / pi) * cos(q, x); scaling by the inverse puts binary re-rank scores on the cosine scale
+_SIGN_SCORE_SCALE = math.sqrt(math.pi / 2)
+
+def check_vector_type(vector_type: str, dim: int) -> None:
+    if vector_type not in VECTOR_TYPES:
+        raise ValueError(f"Unknown vector type {vector_type!r}, expected one of {', '.join(VECTOR_TYPES)}")
+    if vector_type == "binary" and dim % 8:
+        raise ValueError(f"Binary vectors need a dimension divisible by 8, got {dim}")
+
+def normalize(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """L2-normalise rows so inner product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def encode(vectors: Sequence[Sequence[float]], vector_type: str) -> List[Any]:
+    """Normalise vectors and convert them to what Milvus expects for the storage format"""
+    vectors = normalize(vectors)
+    if vector_type == "float16":
+        return list(vectors.astype(np.float16))
+    if vector_type == "binary":
+        return [row.tobytes() for row in np.packbits(vectors > 0, axis=1)]
+    # float32 and int8 (the SQ8 index quantizes server side)
+    return vectors.tolist()
+
+def decode(values: Sequence[Any], vector_type: str, dim: int) -> np.ndarray:
+    """Stored vectors (as returned by a Milvus query) back to float32 unit vectors"""
+    if vector_type == "binary":
+        packed = np.stack([np.frombuffer(_as_bytes(value), dtype=np.uint8) for value in values])
+        signs = np.unpackbits(packed, axis=1)[:, :dim].astype(np.float32) * 2 - 1
+        # Scaled to unit length, so a re-rank score is the cosine to the sign vector
+        # (see rerank_similarity for putting it back on the cosine scale)
+        return signs / np.sqrt(dim)
+    if vector_type == "float16":
+        return np.stack([
+            value if isinstance(value, np.ndarray) else np.frombuffer(_as_bytes(value), dtype=np.float16)
+            for value in values
+        ]).astype(np.float32)
+    return np.asarray(values, dtype=np.float32)
+
+def hamming_to_similarity(distance: float, dim: int) -> float:
+    """Estimate the cosine similarity of two vectors from the Hamming distance of their sign vectors
+
+    The share of differing signs estimates angle / pi, so this is on the same scale as
+    the float formats' scores and the same similarity thresholds apply.
+    """
+    return math.cos(math.pi * distance / dim)
+
+def similarity_to_hamming(similarity: float, dim: int) -> float:
+    """Hamming distance at which hamming_to_similarity gives similarity"""
+    return dim * math.acos(min(1.0, max(-1.0, similarity))) / math.pi
+
+def rerank_similarity(scores: np.ndarray, vector_type: str) -> np.ndarray:
+    """Re-rank scores against decoded stored vectors, as cosine similarity estimates"""
+    if vector_type == "binary":
+        return np.clip(scores * _SIGN_SCORE_SCALE, -1.0, 1.0)
+    return scores
+
+def bytes_per_vector(vector_type: str, dim: int) -> int:
+    """Size of one vector in the loaded index"""
+    if vector_type == "binary":
+        return dim // 8
+    return dim * {"float32": 4, "float16": 2, "int8": 1}[vector_type]
+
+def _as_bytes(value: Any) -> bytes:
+    # pymilvus returns FLOAT16 / BINARY vectors as bytes, or a one-element list of bytes
+    if isinstance(value, list):
+        value = value[0]
+    return bytes(value)